@@ -0,0 +1,197 @@
+"""
+Content-addressed cache for derived media artifacts.
+
+Thumbnails and renditions are stored under a key derived from the content
+hash of the source file, the operation and its parameters, so the same video
+downloaded again (under any name) reuses earlier work, and two reels
+processed at the same time never write to the same file. Files downloaded
+from Drive are identified by Drive's checksum, so they are never re-read
+just to be hashed.
+
+Entries live in the cache storage area (see storage.py): they are written
+atomically, and least recently used entries are evicted when the area grows
+past its size cap.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from storage import StorageArea, atomic_write_bytes, atomic_write_text
+
+
+class ArtifactCache:
+    """Read-through cache of files derived from source media."""
+    
+    def __init__(self, area: StorageArea):
+        """
+        Args:
+            area: Storage area the artifacts are kept in
+        """
+        self.area = area
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+    
+    def source_hash(self, path: str) -> str:
+        """
+        Return the content hash of a file.
+        
+        A checksum recorded with remember_checksum() (e.g. Drive's MD5 of a
+        downloaded file) is used as it is. Otherwise the file is hashed with
+        SHA-256, once per (path, size, modification time): concurrent callers
+        wait for the first one instead of reading the file again.
+        """
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if memo_key in self._hashes:
+                return self._hashes[memo_key]
+        
+        with self.lock(f"hash:{memo_key[0]}"):
+            with self._lock:
+                if memo_key in self._hashes:
+                    return self._hashes[memo_key]
+            
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            
+            with self._lock:
+                self._hashes[memo_key] = digest.hexdigest()
+            return digest.hexdigest()
+    
+    def remember_checksum(self, path: str, checksum: Optional[str], algorithm: str = 'md5'):
+        """
+        Record a known checksum of a file so source_hash() does not read it.
+        
+        Args:
+            path: Local file the checksum belongs to (as it is now)
+            checksum: Checksum of its contents; ignored if empty
+            algorithm: Name of the checksum algorithm, part of the hash so
+                different algorithms never collide
+        """
+        if not checksum:
+            return
+        self.remember_hash(path, f"{algorithm}:{checksum}")
+    
+    def remember_hash(self, path: str, source_hash: str):
+        """
+        Record the source_hash() of a file as it is now, e.g. one an earlier
+        run computed for a file left unchanged since.
+        """
+        stat = os.stat(path)
+        with self._lock:
+            self._hashes[(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)] = source_hash
+    
+    def key(self, source: str, operation: str, params: Optional[Dict[str, Any]] = None,
+            source_hash: Optional[str] = None) -> str:
+        """
+        Return the cache key of an operation applied to a source file.
+        
+        source_hash, if given, is used instead of source_hash(source), e.g.
+        "md5:<Drive checksum>" for a file read remotely.
+        """
+        description = json.dumps(
+            [source_hash or self.source_hash(source), operation, params or {}],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(description.encode()).hexdigest()
+    
+    def path(self, key: str, suffix: str = '') -> str:
+        """Return the location of an entry (whether or not it exists)."""
+        return self.area.path_for(key[:2], f"{key}{suffix}")
+    
+    def lock(self, key: str) -> threading.Lock:
+        """
+        Return the lock for a key.
+        
+        Hold it while producing an entry so concurrent workers in this process
+        compute it once. Other processes may still compute the same entry;
+        atomic writes make the last one win with an identical result.
+        """
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+    
+    def lookup(self, key: str, suffix: str = '') -> Optional[str]:
+        """Return the path of an existing entry, marking it recently used."""
+        path = self.path(key, suffix)
+        if not os.path.exists(path):
+            return None
+        StorageArea.touch(path)
+        return path
+    
+    def put_bytes(self, key: str, data: bytes, suffix: str = '') -> str:
+        """Store an entry and return its path."""
+        path = self.path(key, suffix)
+        atomic_write_bytes(path, data)
+        return path
+    
+    def put_file(self, key: str, path: str, suffix: str = '') -> str:
+        """
+        Move a finished file into the cache and return its new path.
+        
+        For large artifacts written by another program (e.g. ffmpeg). The
+        file should be in the same directory as the entry (see path()), so
+        the move is an atomic rename.
+        """
+        destination = self.path(key, suffix)
+        os.replace(path, destination)
+        return destination
+    
+    def get_or_create(self, source: str, operation: str, params: Optional[Dict[str, Any]],
+                      produce: Callable[[], bytes], suffix: str = '') -> str:
+        """
+        Return the path of a cached artifact, producing it on a miss.
+        
+        Args:
+            source: Path of the source file
+            operation: Name of the operation (e.g. 'thumbnail')
+            params: Parameters that change the output
+            produce: Called on a miss; returns the artifact bytes
+            suffix: File name suffix (e.g. '.jpg')
+        
+        Returns:
+            Path of the artifact in the cache
+        """
+        key = self.key(source, operation, params)
+        with self.lock(key):
+            path = self.lookup(key, suffix)
+            if path is None:
+                path = self.put_bytes(key, produce(), suffix)
+            return path
+    
+    def get_json(self, source: str, operation: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """Return a cached JSON result, or None on a miss."""
+        path = self.lookup(self.key(source, operation, params), '.json')
+        if path is None:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # Evicted or unreadable: treat as a miss
+    
+    def put_json(self, source: str, operation: str, params: Optional[Dict[str, Any]], value: Any):
+        """Store a JSON result."""
+        path = self.path(self.key(source, operation, params), '.json')
+        atomic_write_text(path, json.dumps(value, sort_keys=True))
+
+
+# Singleton instance
+_cache: Optional[ArtifactCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """Get or create the artifact cache in the configured cache area."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config import get_config
+            _cache = ArtifactCache(get_config().cache)
+        return _cache
@@ -0,0 +1,47 @@
+"""
+Lazily imported constructors for the Google and Instagram clients.
+
+The client modules pull in gspread, googleapiclient and instagrapi, which
+take a noticeable part of a second to import. The entry points only import
+them through these functions, from the pipeline stage that needs the client.
+Each one also starts HTTP call metrics (see http_metrics.py) for the
+transports its client has just imported.
+"""
+
+from typing import TYPE_CHECKING
+
+import http_metrics
+
+if TYPE_CHECKING:
+    from metadata_manager import MetadataManager
+    from google_drive_handler import GoogleDriveHandler
+    from youtube_uploader import YouTubeUploader
+    from instagram_uploader import InstagramUploader
+
+
+def connect_sheets() -> 'MetadataManager':
+    """Open the Google Sheet."""
+    from metadata_manager import MetadataManager
+    http_metrics.install()
+    return MetadataManager()
+
+
+def connect_drive() -> 'GoogleDriveHandler':
+    """Authenticate with Google Drive."""
+    from google_drive_handler import GoogleDriveHandler
+    http_metrics.install()
+    return GoogleDriveHandler()
+
+
+def connect_youtube() -> 'YouTubeUploader':
+    """Authenticate with YouTube."""
+    from youtube_uploader import YouTubeUploader
+    http_metrics.install()
+    return YouTubeUploader()
+
+
+def connect_instagram() -> 'InstagramUploader':
+    """Log in to Instagram and validate the session."""
+    from instagram_uploader import InstagramUploader
+    http_metrics.install()
+    return InstagramUploader()
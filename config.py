@@ -7,6 +7,7 @@ import os
 import json
 from typing import Optional
 from dotenv import load_dotenv
+from storage import StorageArea
 
 # Load .env file if it exists (for local testing)
 load_dotenv()
@@ -47,6 +48,19 @@ class Config:
         self.tiktok_client_key = os.getenv('TIKTOK_CLIENT_KEY')
         self.tiktok_client_secret = os.getenv('TIKTOK_CLIENT_SECRET')
         
+        # TikTok Content Posting API (see tiktok_uploader.py). The refresh
+        # token, client key and secret are needed to renew the access token.
+        self.tiktok_access_token = os.getenv('TIKTOK_ACCESS_TOKEN')
+        self.tiktok_refresh_token = os.getenv('TIKTOK_REFRESH_TOKEN')
+        self.tiktok_api_url = os.getenv('TIKTOK_API_URL', 'https://open.tiktokapis.com')
+        # "direct" posts the video, "inbox" sends it to the TikTok app as a draft
+        self.tiktok_post_mode = os.getenv('TIKTOK_POST_MODE', 'direct').lower()
+        self.tiktok_privacy_level = os.getenv('TIKTOK_PRIVACY_LEVEL', 'PUBLIC_TO_EVERYONE')
+        self.tiktok_chunk_size = _megabytes(os.getenv('TIKTOK_CHUNK_MB', '10'))
+        # Chunks sent at the same time (TikTok expects chunks in order, so
+        # only raise this for an endpoint that accepts them out of order)
+        self.tiktok_upload_workers = max(1, int(os.getenv('TIKTOK_UPLOAD_WORKERS', '1')))
+        
         # Platform character limits
         self.youtube_title_max = 100
         self.youtube_description_max = 5000
@@ -55,9 +69,62 @@ class Config:
         # Timezone (default to UTC, adjust as needed)
         self.timezone = os.getenv('TIMEZONE', 'America/New_York')
         
-        # Temp directory for downloads
-        self.temp_dir = os.path.join(os.getcwd(), 'temp')
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # Maximum number of platform uploads running at the same time
+        self.upload_workers = max(1, int(os.getenv('UPLOAD_WORKERS', '2')))
+        
+        # Maximum number of pipeline stages running at the same time
+        self.pipeline_workers = max(1, int(os.getenv('PIPELINE_WORKERS', '4')))
+        
+        # Maximum number of reels processed at the same time in batch mode
+        self.batch_workers = max(1, int(os.getenv('BATCH_WORKERS', '2')))
+        
+        # Remux videos with the moov box at the end before uploading (see
+        # transcoder.remux_faststart)
+        self.faststart_remux = os.getenv('FASTSTART_REMUX', 'true').lower() not in ('0', 'false', 'no')
+        
+        # Local storage areas (see storage.py). Login state and indexes are
+        # never evicted, the cache is size-bounded, and scratch is emptied
+        # after every run.
+        base_dir = os.getenv('AUTOMATION_HOME', os.getcwd())
+        self.state = StorageArea('state', os.path.join(base_dir, 'state'))
+        # Run journals (see run_journal.py) are only needed to resume recent
+        # runs, so their subdirectory alone is bounded
+        self.journal = StorageArea(
+            'journal',
+            os.path.join(self.state.path, 'journal'),
+            max_bytes=_megabytes(os.getenv('JOURNAL_MAX_MB', '50')),
+            max_age_days=float(os.getenv('JOURNAL_RETENTION_DAYS', '60'))
+        )
+        self.cache = StorageArea(
+            'cache',
+            os.path.join(base_dir, 'cache'),
+            max_bytes=_megabytes(os.getenv('CACHE_MAX_MB', '2048')),
+            max_age_days=float(os.getenv('CACHE_RETENTION_DAYS', '30'))
+        )
+        self.scratch = StorageArea(
+            'scratch',
+            os.path.join(base_dir, 'temp'),
+            max_bytes=_megabytes(os.getenv('SCRATCH_MAX_MB', '20480')),
+            max_age_days=float(os.getenv('SCRATCH_RETENTION_DAYS', '2'))
+        )
+        self.state_dir = self.state.path
+        self.cache_dir = self.cache.path
+        
+        # Temp directory for downloads (the scratch area)
+        self.temp_dir = self.scratch.path
+    
+    def state_file(self, name: str) -> str:
+        """
+        Path of a file in the state area.
+        
+        Files that older versions kept in temp/ are moved over the first time
+        they are asked for, so existing logins keep working.
+        """
+        path = self.state.path_for(name)
+        legacy_path = os.path.join(self.temp_dir, name)
+        if not os.path.exists(path) and os.path.exists(legacy_path):
+            os.replace(legacy_path, path)
+        return path
     
     def get_google_credentials(self) -> dict:
         """Parse and return Google credentials as a dictionary."""
@@ -90,6 +157,11 @@ class Config:
         return caption[:self.instagram_caption_max]
 
 
+def _megabytes(value: str) -> int:
+    """Convert a size in megabytes (from the environment) to bytes."""
+    return int(float(value) * 1024 * 1024)
+
+
 # Singleton instance
 _config: Optional[Config] = None
 
@@ -0,0 +1,304 @@
+"""
+Perceptual fingerprints of posted videos, for catching reposts.
+
+A video's fingerprint is the 64-bit difference hash (dHash) of frames sampled
+evenly over its duration. A dHash only records whether each pixel of a tiny
+grayscale copy is brighter than its neighbour, so it survives re-encoding,
+resizing and small colour changes: the same clip uploaded again under another
+file name, caption or bitrate gets nearly the same fingerprint.
+
+Every successful upload is added to an index in the state area, which
+cleanup never trims, so a repost is caught however long ago the original
+went up. Before a video is uploaded, its fingerprint is compared with every earlier post to the
+same platform by Hamming distance, for the whole index at once with NumPy.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+
+# Frames sampled per video, evenly spread over its duration
+FINGERPRINT_FRAMES = 16
+# Width frames are decoded at; the hash only needs a 9x8 thumbnail
+FRAME_WIDTH = 160
+HASH_SIZE = 8
+
+# Frames with less contrast than this (black frames, fades) are not hashed,
+# since every flat frame has the same hash
+MIN_FRAME_CONTRAST = 4.0
+# A video needs this many hashed frames to be checked at all
+MIN_FRAMES = 4
+
+# Two frames match if their hashes differ in at most this many of 64 bits
+MAX_DISTANCE = 10
+# A video is a repost if this share of its frames match frames of one post
+MATCH_FRACTION = 0.75
+
+# Number of set bits in every byte value, for NumPy without bitwise_count
+_BIT_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class DuplicateVideoError(Exception):
+    """Raised when a video was already posted to a platform."""
+
+
+def dhash_frames(frames: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Return the 64-bit difference hash of each frame.
+    
+    Args:
+        frames: BGR or grayscale frames (any size)
+    
+    Returns:
+        uint64 array with one hash per frame
+    """
+    if not frames:
+        return np.zeros(0, dtype=np.uint64)
+    small = np.stack([
+        cv2.resize(_gray(frame), (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+        for frame in frames
+    ]).astype(np.int16)
+    
+    # Bit set where a pixel is brighter than its left neighbour, packed
+    # row-major into one big-endian 64-bit integer per frame
+    bits = small[:, :, 1:] > small[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(frames), -1), axis=1)
+    return packed.view('>u8').ravel().astype(np.uint64)
+
+
+def compute_fingerprint(video_path: str, info: Optional[dict] = None) -> np.ndarray:
+    """
+    Fingerprint a video from frames sampled over its whole duration.
+    
+    Args:
+        video_path: Path to the video file
+        info: Probe result, if already known
+    
+    Returns:
+        uint64 array of frame hashes (empty if no usable frame was decoded)
+    """
+    from thumbnail_extractor import ThumbnailExtractor
+    
+    started = time.monotonic()
+    info = info or ThumbnailExtractor.probe_video(video_path)
+    if not info or info['duration'] <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    
+    duration = info['duration']
+    timestamps = [duration * (i + 0.5) / FINGERPRINT_FRAMES for i in range(FINGERPRINT_FRAMES)]
+    frames = ThumbnailExtractor.grab_frames(video_path, timestamps, max_width=FRAME_WIDTH)
+    frames = [frame for frame in frames if frame is not None and _gray(frame).std() >= MIN_FRAME_CONTRAST]
+    
+    hashes = dhash_frames(frames)
+    print(f"Fingerprinted {len(hashes)} frames in {time.monotonic() - started:.2f}s")
+    return hashes
+
+
+class FingerprintIndex:
+    """Append-only index of posted videos' fingerprints with Hamming-distance search."""
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: JSONL file the index is kept in (created on the first post)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+        # One row per post, padded to FINGERPRINT_FRAMES; _valid marks real hashes
+        self._hashes = np.zeros((0, FINGERPRINT_FRAMES), dtype=np.uint64)
+        self._valid = np.zeros((0, FINGERPRINT_FRAMES), dtype=bool)
+        self._platforms = np.zeros(0, dtype=object)
+        self._load()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _load(self):
+        """Read the index file, skipping lines left partial by an interrupted run."""
+        entries = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(entry, dict) and entry.get('hashes'):
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        self._append_rows(entries)
+    
+    def _append_rows(self, entries: List[Dict]):
+        """Add entries to the in-memory arrays. Caller holds the lock (or is __init__)."""
+        if not entries:
+            return
+        hashes = np.zeros((len(entries), FINGERPRINT_FRAMES), dtype=np.uint64)
+        valid = np.zeros((len(entries), FINGERPRINT_FRAMES), dtype=bool)
+        for row, entry in enumerate(entries):
+            values = [int(h, 16) for h in entry['hashes'][:FINGERPRINT_FRAMES]]
+            hashes[row, :len(values)] = values
+            valid[row, :len(values)] = True
+        
+        self._entries.extend(entries)
+        self._hashes = np.concatenate([self._hashes, hashes])
+        self._valid = np.concatenate([self._valid, valid])
+        self._platforms = np.concatenate([self._platforms, np.array([e.get('platform') for e in entries], dtype=object)])
+    
+    def find_matches(self, fingerprint: np.ndarray, platform: Optional[str] = None) -> List[Dict]:
+        """
+        Find earlier posts of the same video.
+        
+        Each frame of the new video is matched against the closest frame of
+        every post, so trimmed or slightly shifted copies still match.
+        
+        Args:
+            fingerprint: Frame hashes from compute_fingerprint()
+            platform: Only compare with posts to this platform
+        
+        Returns:
+            Matching index entries with a 'similarity' (share of matching
+            frames), most similar first
+        """
+        fingerprint = np.asarray(fingerprint, dtype=np.uint64)
+        if len(fingerprint) < MIN_FRAMES:
+            return []
+        
+        with self._lock:
+            rows = np.arange(len(self._entries))
+            if platform is not None:
+                rows = rows[self._platforms == platform]
+            if not len(rows):
+                return []
+            hashes, valid = self._hashes[rows], self._valid[rows]
+            entries = [self._entries[i] for i in rows]
+        
+        # Distance from every new frame to every frame of every post: (posts, new, old)
+        distances = _popcount(hashes[:, None, :] ^ fingerprint[None, :, None])
+        distances = np.where(valid[:, None, :], distances, 64 + 1)
+        similarity = (distances.min(axis=2) <= MAX_DISTANCE).mean(axis=1)
+        
+        matches = np.nonzero(similarity >= MATCH_FRACTION)[0]
+        matches = matches[np.argsort(-similarity[matches], kind='stable')]
+        return [dict(entries[i], similarity=round(float(similarity[i]), 2)) for i in matches]
+    
+    def add(self, fingerprint: np.ndarray, platform: str, post_id: Optional[str] = None,
+            label: Optional[str] = None):
+        """
+        Record a post and flush it to disk before returning.
+        
+        Args:
+            fingerprint: Frame hashes of the posted video
+            platform: Platform it was posted to
+            post_id: Video ID, media ID or URL of the post
+            label: Human-readable description (e.g. folder and reel)
+        """
+        if not len(fingerprint):
+            return
+        entry = {
+            'platform': platform,
+            'post_id': post_id,
+            'label': label,
+            'posted_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'hashes': [f"{int(h):016x}" for h in fingerprint],
+        }
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._append_rows([entry])
+    
+    def check_not_posted(self, fingerprint: Optional[np.ndarray], platform: str):
+        """
+        Raise if a video was already posted to a platform.
+        
+        Args:
+            fingerprint: Frame hashes, or None if fingerprinting failed (the
+                check is skipped with a warning)
+            platform: Platform about to be uploaded to
+        
+        Raises:
+            DuplicateVideoError: If an earlier post matches
+        """
+        if fingerprint is None or len(fingerprint) < MIN_FRAMES:
+            print(f"⚠ Warning: Could not fingerprint the video, skipping the {platform} repost check")
+            return
+        
+        started = time.monotonic()
+        matches = self.find_matches(fingerprint, platform)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        if not matches:
+            print(f"✓ No earlier {platform} post looks like this video "
+                  f"(index of {len(self)} posts searched in {elapsed_ms:.1f} ms)")
+            return
+        
+        match = matches[0]
+        raise DuplicateVideoError(
+            f"This video looks like an earlier {platform} post ({match['similarity']:.0%} of frames match): "
+            f"{match.get('label') or 'unlabelled'}, {match.get('post_id') or 'unknown id'}, "
+            f"posted {match.get('posted_at')}"
+        )
+
+
+def upload_once(fingerprint: Optional[np.ndarray], platform: str, upload: Callable[[], Any],
+                label: Optional[str] = None, allow_duplicate: bool = False) -> Any:
+    """
+    Run an upload unless the video was already posted to the platform.
+    
+    Args:
+        fingerprint: Frame hashes of the video (None skips the check)
+        platform: Platform the upload goes to
+        upload: Performs the upload; returns a post ID/URL, or a falsy value
+            if it failed
+        label: Description stored with the post
+        allow_duplicate: Upload even if an earlier post matches
+    
+    Returns:
+        The upload's result
+    
+    Raises:
+        DuplicateVideoError: If an earlier post matches (nothing is uploaded)
+    """
+    index = get_fingerprint_index()
+    if not allow_duplicate:
+        index.check_not_posted(fingerprint, platform)
+    
+    result = upload()
+    if result and fingerprint is not None:
+        index.add(fingerprint, platform, result if isinstance(result, str) else None, label)
+    return result
+
+
+def _gray(frame: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Number of set bits of each uint64."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values)
+    return _BIT_COUNTS[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+# Singleton instance
+_index: Optional[FingerprintIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_fingerprint_index() -> FingerprintIndex:
+    """Get or create the fingerprint index in the state area."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            from config import get_config
+            _index = FingerprintIndex(get_config().state_file('fingerprints.jsonl'))
+        return _index
@@ -4,11 +4,28 @@ Google Drive handler for downloading videos and cover images.
 
 import os
 import io
-from typing import Optional, Tuple
+import re
+import threading
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 from google.oauth2 import service_account
 from config import get_config
+import media_probe
+from remote_file import RemoteFile
+from retry_policy import DRIVE_HOST, call_with_retries
+from run_log import Progress
+
+if TYPE_CHECKING:
+    from media_probe import MediaInfo
+
+
+DRIVE_FILES_URL = 'https://www.googleapis.com/drive/v3/files'
+
+# Connections kept open for range reads, shared by every thread (ffmpeg
+# opens several connections to the local HTTP server while seeking)
+RANGE_POOL_SIZE = 8
+RANGE_TIMEOUT = 60
 
 
 class GoogleDriveHandler:
@@ -16,16 +33,66 @@ class GoogleDriveHandler:
     
     def __init__(self):
         self.config = get_config()
-        self.service = self._authenticate()
+        self.credentials = self._authenticate()
+        self._local = threading.local()
+        self._session = None
+        self._session_lock = threading.Lock()
     
     def _authenticate(self):
         """Authenticate with Google Drive API using service account."""
         credentials_info = self.config.get_google_credentials()
-        credentials = service_account.Credentials.from_service_account_info(
+        return service_account.Credentials.from_service_account_info(
             credentials_info,
             scopes=['https://www.googleapis.com/auth/drive.readonly']
         )
-        return build('drive', 'v3', credentials=credentials)
+    
+    @property
+    def service(self):
+        """
+        Drive API service for the calling thread.
+        
+        The underlying httplib2 transport is not thread-safe, so each thread
+        gets its own service object built on the shared credentials.
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+    
+    def _media_session(self):
+        """
+        Authorized HTTP session for range reads, shared by all threads.
+        
+        Building a Drive service per thread means a discovery build and a new
+        TLS connection for every ffmpeg connection; this pooled requests
+        session reuses its connections. Expired credentials are refreshed
+        under a lock so concurrent reads don't refresh them at the same time.
+        """
+        from google.auth.transport.requests import AuthorizedSession, Request
+        from requests.adapters import HTTPAdapter
+        
+        with self._session_lock:
+            if self._session is None:
+                session = AuthorizedSession(self.credentials)
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=RANGE_POOL_SIZE))
+                self._session = session
+            if not self.credentials.valid:
+                self.credentials.refresh(Request(self._session))
+            return self._session
+    
+    def execute(self, request, description: str):
+        """
+        Execute a Drive API request, retrying transient failures (see retry_policy.py).
+        
+        Args:
+            request: googleapiclient request (e.g. service.files().list(...))
+            description: What the request does, for log lines
+        
+        Returns:
+            The response
+        """
+        return call_with_retries(DRIVE_HOST, request.execute, description)
     
     def find_folder_by_name(self, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
         """
@@ -37,27 +104,61 @@ class GoogleDriveHandler:
         
         Returns:
             Folder ID if found, None otherwise
+        
+        Raises:
+            Exception: If Drive keeps failing, so a failed lookup is not
+                mistaken for a missing folder
         """
         if parent_id is None:
             parent_id = self.config.drive_folder_id
         
         query = f"name='{folder_name}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
         
-        try:
-            results = self.service.files().list(
+        results = self.execute(self.service.files().list(
+            q=query,
+            spaces='drive',
+            fields='files(id, name)',
+            pageSize=10
+        ), f"find Drive folder '{folder_name}'")
+        
+        files = results.get('files', [])
+        if files:
+            return files[0]['id']
+        return None
+    
+    def list_folders(self, parent_id: Optional[str] = None, name_contains: Optional[str] = None) -> List[dict]:
+        """
+        List the subfolders of a folder.
+        
+        Args:
+            parent_id: Parent folder ID (uses root folder from config if None)
+            name_contains: Optional text the folder names must contain
+        
+        Returns:
+            List of dicts with folder info (id, name), sorted by name
+        """
+        if parent_id is None:
+            parent_id = self.config.drive_folder_id
+        
+        query = f"'{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        if name_contains:
+            query += f" and name contains '{name_contains}'"
+        
+        folders = []
+        page_token = None
+        while True:
+            results = self.execute(self.service.files().list(
                 q=query,
                 spaces='drive',
-                fields='files(id, name)',
-                pageSize=10
-            ).execute()
-            
-            files = results.get('files', [])
-            if files:
-                return files[0]['id']
-            return None
-        except Exception as e:
-            print(f"Error finding folder '{folder_name}': {e}")
-            return None
+                fields='nextPageToken, files(id, name)',
+                pageSize=100,
+                pageToken=page_token
+            ), "list Drive folders")
+            folders.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return sorted(folders, key=lambda f: f['name'])
     
     def find_file_in_folder(self, folder_id: str, file_pattern: Optional[str] = None) -> Optional[dict]:
         """
@@ -69,51 +170,52 @@ class GoogleDriveHandler:
         
         Returns:
             Dict with file info (id, name) if found, None otherwise
+        
+        Raises:
+            Exception: If Drive keeps failing
         """
         query = f"'{folder_id}' in parents and trashed=false and mimeType!='application/vnd.google-apps.folder'"
         
-        try:
-            results = self.service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name, mimeType)',
-                pageSize=50
-            ).execute()
-            
-            files = results.get('files', [])
+        results = self.execute(self.service.files().list(
+            q=query,
+            spaces='drive',
+            fields='files(id, name, mimeType, size, md5Checksum)',
+            pageSize=50
+        ), "list files in Drive folder")
+        
+        files = results.get('files', [])
+        
+        if file_pattern:
+            # Filter files matching the pattern
+            matching_files = [f for f in files if file_pattern in f['name']]
+            if matching_files:
+                return matching_files[0]
+            return None
+        else:
+            # Return video file, preferring ones with "_captions" or "_caption" in the name
+            video_extensions = ['.mp4', '.mov', '.avi', '.mkv']
+            video_files = [f for f in files if any(f['name'].lower().endswith(ext) for ext in video_extensions)]
             
-            if file_pattern:
-                # Filter files matching the pattern
-                matching_files = [f for f in files if file_pattern in f['name']]
-                if matching_files:
-                    return matching_files[0]
+            if not video_files:
                 return None
-            else:
-                # Return video file, preferring ones with "_captions" or "_caption" in the name
-                video_extensions = ['.mp4', '.mov', '.avi', '.mkv']
-                video_files = [f for f in files if any(f['name'].lower().endswith(ext) for ext in video_extensions)]
-                
-                if not video_files:
-                    return None
-                
-                # Prefer files with "caption" in the name
-                caption_files = [f for f in video_files if 'caption' in f['name'].lower()]
-                if caption_files:
-                    return caption_files[0]
-                
-                # Otherwise return first video file
-                return video_files[0]
-        except Exception as e:
-            print(f"Error finding file in folder: {e}")
-            return None
+            
+            # Prefer files with "caption" in the name
+            caption_files = [f for f in video_files if 'caption' in f['name'].lower()]
+            if caption_files:
+                return caption_files[0]
+            
+            # Otherwise return first video file
+            return video_files[0]
     
-    def download_file(self, file_id: str, destination_path: str) -> bool:
+    def download_file(self, file_id: str, destination_path: str, md5_checksum: Optional[str] = None) -> bool:
         """
         Download a file from Google Drive.
         
         Args:
             file_id: Google Drive file ID
             destination_path: Local path to save the file
+            md5_checksum: Drive's md5Checksum of the file, if listed. The
+                artifact cache uses it instead of hashing the download.
         
         Returns:
             True if successful, False otherwise
@@ -121,20 +223,104 @@ class GoogleDriveHandler:
         try:
             request = self.service.files().get_media(fileId=file_id)
             
+            progress = Progress("Download progress")
             with io.FileIO(destination_path, 'wb') as fh:
                 downloader = MediaIoBaseDownload(fh, request)
                 done = False
                 while not done:
-                    status, done = downloader.next_chunk()
+                    # A retried chunk continues from the last byte written
+                    status, done = call_with_retries(DRIVE_HOST, downloader.next_chunk, "download from Drive")
                     if status:
-                        print(f"Download progress: {int(status.progress() * 100)}%")
+                        progress.update(status.resumable_progress, status.total_size)
             
             print(f"Downloaded file to: {destination_path}")
+            if md5_checksum:
+                from artifact_cache import get_artifact_cache
+                get_artifact_cache().remember_checksum(destination_path, md5_checksum)
             return True
         except Exception as e:
             print(f"Error downloading file: {e}")
             return False
     
+    def get_file_size(self, file_id: str) -> int:
+        """Return the size of a Drive file in bytes."""
+        metadata = self.execute(self.service.files().get(fileId=file_id, fields='size'), "get Drive file size")
+        return int(metadata['size'])
+    
+    def read_range(self, file_id: str, offset: int, length: int) -> bytes:
+        """
+        Read part of a Drive file with an HTTP Range request.
+        
+        Args:
+            file_id: Google Drive file ID
+            offset: First byte to read
+            length: Number of bytes to read
+        
+        Returns:
+            The bytes read (fewer than length at the end of the file)
+        
+        Raises:
+            IOError: If Drive keeps answering with an error status
+        """
+        from requests import HTTPError
+        
+        def read() -> bytes:
+            response = self._media_session().get(
+                f"{DRIVE_FILES_URL}/{file_id}",
+                params={'alt': 'media'},
+                headers={'Range': f"bytes={offset}-{offset + length - 1}"},
+                timeout=RANGE_TIMEOUT
+            )
+            if response.status_code == 206:
+                return response.content
+            if response.status_code == 200:
+                # Range ignored (e.g. a small file): the whole file was sent
+                return response.content[offset:offset + length]
+            raise HTTPError(f"Range read of {file_id} failed with HTTP {response.status_code}: "
+                            f"{response.text[:200]}", response=response)
+        
+        return call_with_retries(DRIVE_HOST, read, "range read from Drive")
+    
+    def open_file(self, file_id: str, name: Optional[str] = None) -> RemoteFile:
+        """
+        Open a Drive file for random access without downloading it.
+        
+        Reads are served from a block cache filled with range requests. Use
+        remote_file.serve_http() to hand the file to ffmpeg.
+        
+        Args:
+            file_id: Google Drive file ID
+            name: File name to expose (keep the extension); defaults to the ID
+        
+        Returns:
+            Seekable, read-only file object
+        """
+        return RemoteFile(
+            lambda offset, length: self.read_range(file_id, offset, length),
+            self.get_file_size(file_id),
+            name=name or file_id
+        )
+    
+    def probe_file(self, file_id: str) -> Optional['MediaInfo']:
+        """
+        Probe an MP4/MOV file on Drive without downloading it.
+        
+        Only the top-level box headers and the moov box are fetched, with
+        range requests.
+        
+        Args:
+            file_id: Google Drive file ID
+        
+        Returns:
+            MediaInfo, or None if the file is not a readable MP4/MOV file
+        """
+        try:
+            remote = self.open_file(file_id)
+            return media_probe.probe_reader(remote.read_at, remote.size)
+        except Exception as e:
+            print(f"Error probing file: {e}")
+            return None
+    
     def get_video_and_cover(
         self, 
         folder_name: str, 
@@ -179,20 +365,24 @@ class GoogleDriveHandler:
         # Find cover image (optional)
         cover_file = self.find_file_in_folder(reel_folder_id, file_pattern='_cover')
         
+        # Prefix local files with the folder name so reels downloaded in the
+        # same run don't overwrite each other
+        prefix = re.sub(r'[^A-Za-z0-9_-]+', '_', folder_name)
+        
         # Download video
         video_ext = os.path.splitext(video_file['name'])[1]
-        video_path = os.path.join(self.config.temp_dir, f"video_{reel_number}{video_ext}")
+        video_path = os.path.join(self.config.temp_dir, f"{prefix}_video_{reel_number}{video_ext}")
         
-        if not self.download_file(video_file['id'], video_path):
+        if not self.download_file(video_file['id'], video_path, video_file.get('md5Checksum')):
             return None, None
         
         # Download cover if exists
         cover_path = None
         if cover_file:
             cover_ext = os.path.splitext(cover_file['name'])[1]
-            cover_path = os.path.join(self.config.temp_dir, f"cover_{reel_number}{cover_ext}")
+            cover_path = os.path.join(self.config.temp_dir, f"{prefix}_cover_{reel_number}{cover_ext}")
             
-            if not self.download_file(cover_file['id'], cover_path):
+            if not self.download_file(cover_file['id'], cover_path, cover_file.get('md5Checksum')):
                 print(f"Warning: Failed to download cover image, will extract from video")
                 cover_path = None
         else:
@@ -0,0 +1,299 @@
+"""
+Per-endpoint metrics for every HTTP call the API clients make.
+
+install() wraps the two transports the clients are built on:
+httplib2.Http.request (googleapiclient: Drive, YouTube) and requests'
+HTTPAdapter.send (gspread, google-auth sessions, instagrapi, TikTok). Each call
+is recorded under its method, host and path, with IDs in the path replaced by
+{id}: call count, status codes, bytes sent and received, a latency histogram,
+errors and retries. A retry is a call to the same endpoint from the same
+thread right after a call there failed.
+
+Recording takes a lock and a few additions per call. The totals can be read
+at any time with get_http_metrics().snapshot() or printed with report().
+"""
+
+import functools
+import re
+import threading
+import time
+from collections import Counter
+from importlib.util import find_spec
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from run_log import get_logger, log_path
+from run_profile import record_span
+
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+# Path segments that are IDs: numbers, and long tokens with digits (Drive
+# file IDs, Sheet IDs, Instagram media IDs, TikTok publish IDs)
+_ID_SEGMENT = re.compile(r'^(\d+|(?=[^/]*\d)[A-Za-z0-9_\-.]{16,})$')
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Method, host and path of a URL, with IDs replaced by {id}."""
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.hostname or ''}{_endpoint_path(parts.path)}"
+
+
+@functools.lru_cache(maxsize=4096)
+def _endpoint_path(path: str) -> str:
+    return '/'.join('{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+
+class EndpointStats:
+    """Totals for one endpoint."""
+    
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.statuses: Counter = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+    
+    def percentile(self, fraction: float) -> float:
+        """Latency below which this fraction of calls finished (bucket upper bound)."""
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= target and count:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+    
+    def as_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'seconds': round(self.seconds, 3),
+            'max_seconds': round(self.max_seconds, 3),
+            'statuses': dict(self.statuses),
+            'latency_buckets': dict(zip((str(b) for b in LATENCY_BUCKETS), self.buckets)),
+        }
+
+
+class HttpMetrics:
+    """Thread-safe per-endpoint HTTP call totals."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._failed = threading.local()
+    
+    def record(self, method: str, url: str, status: Optional[int], seconds: float,
+               bytes_out: int = 0, bytes_in: int = 0, error: Optional[str] = None):
+        """
+        Record one HTTP call.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            status: Response status code (None if the call raised)
+            seconds: Time until the response (or error)
+            bytes_out: Request body size
+            bytes_in: Response body size
+            error: Exception type name if the call raised
+        """
+        name = endpoint_name(method, url)
+        failed = error is not None or status == 429 or (status or 0) >= 500
+        failed_before = getattr(self._failed, 'endpoints', None)
+        if failed_before is None:
+            failed_before = self._failed.endpoints = set()
+        retry = name in failed_before
+        if failed:
+            failed_before.add(name)
+        else:
+            failed_before.discard(name)
+        
+        bucket = next(i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound)
+        with self._lock:
+            stats = self._endpoints.get(name)
+            if stats is None:
+                stats = self._endpoints[name] = EndpointStats()
+            stats.calls += 1
+            stats.retries += retry
+            stats.errors += failed
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.statuses[error or status] += 1
+            stats.buckets[bucket] += 1
+        
+        now = time.perf_counter()
+        record_span(name, 'http', now - seconds, now, {'status': error or status, 'retry': retry})
+    
+    def snapshot(self) -> Dict[str, dict]:
+        """Totals per endpoint, as plain dictionaries."""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._endpoints.items())}
+    
+    def totals(self) -> dict:
+        """Totals over every endpoint."""
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+        return {
+            'endpoints': len(endpoints),
+            'calls': sum(s.calls for s in endpoints),
+            'errors': sum(s.errors for s in endpoints),
+            'retries': sum(s.retries for s in endpoints),
+            'bytes_out': sum(s.bytes_out for s in endpoints),
+            'bytes_in': sum(s.bytes_in for s in endpoints),
+            'seconds': round(sum(s.seconds for s in endpoints), 3),
+        }
+    
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+    
+    def report(self) -> str:
+        """Return a table of calls, latency and bytes per endpoint."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items(), key=lambda item: -item[1].seconds)
+        if not endpoints:
+            return "HTTP calls: none recorded"
+        
+        totals = self.totals()
+        lines = [
+            f"HTTP calls ({totals['calls']} calls to {totals['endpoints']} endpoints, "
+            f"{totals['bytes_in'] / 1024 / 1024:.1f} MB in, {totals['bytes_out'] / 1024 / 1024:.1f} MB out):",
+            f"  {'endpoint':<56} {'calls':>5} {'retry':>5} {'err':>4} {'p50':>7} {'p95':>7} {'max':>7} "
+            f"{'MB in':>7} {'MB out':>7}  statuses",
+        ]
+        for name, s in endpoints:
+            statuses = ' '.join(f"{status}x{count}" for status, count in sorted(s.statuses.items(), key=str))
+            lines.append(
+                f"  {name[:56]:<56} {s.calls:>5} {s.retries:>5} {s.errors:>4} {s.percentile(0.5):>6.2f}s "
+                f"{s.percentile(0.95):>6.2f}s {s.max_seconds:>6.2f}s {s.bytes_in / 1024 / 1024:>7.1f} "
+                f"{s.bytes_out / 1024 / 1024:>7.1f}  {statuses}"
+            )
+        return "\n".join(lines)
+
+
+def log_report():
+    """
+    Print the per-endpoint table at the end of a run. The run's JSON log
+    also gets the totals per endpoint as structured fields.
+    """
+    metrics = get_http_metrics()
+    if log_path() is None:
+        print(metrics.report())
+        return
+    get_logger('http').info(metrics.report(), extra={'fields': {
+        'http_totals': metrics.totals(), 'http_endpoints': metrics.snapshot(),
+    }})
+
+
+def _body_size(body, headers) -> int:
+    """Size of a request body, from the body itself or Content-Length."""
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    for key, value in (headers or {}).items():
+        if key.lower() == 'content-length':
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+    return 0
+
+
+def _instrument_httplib2(metrics: HttpMetrics):
+    import httplib2
+    
+    original = httplib2.Http.request
+    if getattr(original, '_http_metrics', False):
+        return
+    
+    @functools.wraps(original)
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response, content = original(self, uri, method, body, headers, *args, **kwargs)
+        except Exception as e:
+            metrics.record(method, uri, None, time.perf_counter() - started, _body_size(body, headers),
+                           error=type(e).__name__)
+            raise
+        metrics.record(method, uri, response.status, time.perf_counter() - started,
+                       _body_size(body, headers), len(content or b''))
+        return response, content
+    
+    request._http_metrics = True
+    httplib2.Http.request = request
+
+
+def _instrument_requests(metrics: HttpMetrics):
+    from requests.adapters import HTTPAdapter
+    
+    original = HTTPAdapter.send
+    if getattr(original, '_http_metrics', False):
+        return
+    
+    @functools.wraps(original)
+    def send(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = original(self, request, *args, **kwargs)
+        except Exception as e:
+            metrics.record(request.method, request.url, None, time.perf_counter() - started,
+                           _body_size(request.body, request.headers), error=type(e).__name__)
+            raise
+        # The body is not read yet (it may be streamed), so its size comes
+        # from Content-Length
+        try:
+            bytes_in = int(response.headers.get('Content-Length') or 0)
+        except ValueError:
+            bytes_in = 0
+        metrics.record(request.method, request.url, response.status_code, time.perf_counter() - started,
+                       _body_size(request.body, request.headers), bytes_in)
+        return response
+    
+    send._http_metrics = True
+    HTTPAdapter.send = send
+
+
+def install() -> List[str]:
+    """
+    Start recording calls of every installed HTTP transport.
+    
+    Safe to call repeatedly; the clients call it when they connect, so the
+    transports are only imported once a client needs them anyway.
+    
+    Returns:
+        Names of the instrumented transports
+    """
+    metrics = get_http_metrics()
+    installed = []
+    for module, instrument in (('httplib2', _instrument_httplib2), ('requests', _instrument_requests)):
+        if find_spec(module) is not None:
+            with _install_lock:
+                instrument(metrics)
+            installed.append(module)
+    return installed
+
+
+# Singleton instance
+_metrics: Optional[HttpMetrics] = None
+_metrics_lock = threading.Lock()
+_install_lock = threading.Lock()
+
+
+def get_http_metrics() -> HttpMetrics:
+    """Get or create the process-wide HTTP metrics."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = HttpMetrics()
+        return _metrics
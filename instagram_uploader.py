@@ -3,11 +3,19 @@ Instagram uploader for uploading Reels with captions and cover images.
 """
 
 import os
+import json
 import time
+import hashlib
+import threading
 from typing import Optional
 from instagrapi import Client
 from instagrapi.exceptions import LoginRequired, ChallengeRequired, FeedbackRequired
 from config import get_config
+from storage import atomic_write_text
+
+
+# Results of upload_reel() that mean this call did not post anything
+NOT_POSTED = ("already_attempted", "locked")
 
 
 class InstagramUploader:
@@ -16,8 +24,9 @@ class InstagramUploader:
     def __init__(self):
         self.config = get_config()
         self.client = Client()
-        self.session_file = os.path.join(self.config.temp_dir, 'instagram_session.json')
-        self._upload_attempted = False  # Prevent multiple uploads
+        self.session_file = self.config.state_file('instagram_session.json')
+        self._attempted_uploads = set()  # Upload keys already attempted by this instance
+        self._upload_lock = threading.Lock()  # instagrapi's Client is not thread-safe
         self._login()
     
     def _login(self):
@@ -48,7 +57,7 @@ class InstagramUploader:
             )
             
             # Save session for future use
-            self.client.dump_settings(self.session_file)
+            atomic_write_text(self.session_file, json.dumps(self.client.get_settings(), indent=4))
             print("Instagram login successful")
             
         except ChallengeRequired as e:
@@ -74,8 +83,14 @@ class InstagramUploader:
         """
         Upload a video as an Instagram Reel.
         
-        CRITICAL: This function will ONLY upload ONCE per instance.
-        If upload was already attempted, it will immediately return success.
+        CRITICAL: This function will ONLY upload ONCE per caption and video per
+        instance. If upload was already attempted, it returns "already_attempted"
+        without posting (see NOT_POSTED).
+        
+        The instance can be shared by concurrent uploads (batch mode); reels
+        are posted one at a time through the single logged-in client. Reels
+        of the same sheet row share a caption, so the video is part of the
+        duplicate check.
         
         Args:
             video_path: Path to the video file
@@ -83,20 +98,42 @@ class InstagramUploader:
             cover_path: Optional path to cover image
         
         Returns:
-            Media ID if successful, None otherwise
+            Media ID if successful, a NOT_POSTED value if blocked as a
+            duplicate, None otherwise
         """
+        with self._upload_lock:
+            return self._upload_reel_once(video_path, caption, cover_path)
+    
+    @staticmethod
+    def upload_key(caption: str, video_path: str) -> str:
+        """Short hash of a caption and video file name, used for lock files and duplicate checks."""
+        return hashlib.md5(f"{caption}\0{os.path.basename(video_path)}".encode()).hexdigest()[:8]
+    
+    @staticmethod
+    def lock_file(temp_dir: str, caption: str, video_path: str) -> str:
+        """Path of the lock file that blocks a second upload of a reel."""
+        return os.path.join(temp_dir, f"instagram_upload_{InstagramUploader.upload_key(caption, video_path)}.lock")
+    
+    def _upload_reel_once(
+        self,
+        video_path: str,
+        caption: str,
+        cover_path: Optional[str] = None
+    ) -> Optional[str]:
+        """Upload a Reel unless this caption and video were already attempted. Caller holds the upload lock."""
+        upload_key = self.upload_key(caption, video_path)
+        
         # ABSOLUTE PREVENTION: If upload was already attempted, return immediately
-        if self._upload_attempted:
+        if upload_key in self._attempted_uploads:
             print("ERROR: Upload already attempted in this session. Preventing duplicate post.")
             return "already_attempted"
         
         # Create lock file to prevent multiple simultaneous uploads
-        import hashlib
-        lock_file = os.path.join(self.config.temp_dir, f"instagram_upload_{hashlib.md5(caption.encode()).hexdigest()[:8]}.lock")
+        lock_file = self.lock_file(self.config.temp_dir, caption, video_path)
         
         if os.path.exists(lock_file):
             print(f"ERROR: Lock file exists: {lock_file}")
-            print("Another upload with this caption may be in progress or was recently completed.")
+            print("Another upload of this reel may be in progress or was recently completed.")
             print("To prevent duplicates, this upload is blocked.")
             return "locked"
         
@@ -108,7 +145,7 @@ class InstagramUploader:
             print(f"Warning: Could not create lock file: {e}")
         
         # Mark upload as attempted IMMEDIATELY to prevent any retries
-        self._upload_attempted = True
+        self._attempted_uploads.add(upload_key)
         
         try:
             if not os.path.exists(video_path):
@@ -203,10 +240,11 @@ class InstagramUploader:
             retry_delay: IGNORED
         
         Returns:
-            Media ID if successful, None otherwise
+            Media ID if successful, a NOT_POSTED value if blocked as a
+            duplicate, None otherwise
         """
         # CRITICAL: Check if upload was already attempted
-        if self._upload_attempted:
+        if self.upload_key(caption, video_path) in self._attempted_uploads:
             print("ERROR: Upload already attempted. This function will NOT post again.")
             return "already_attempted"
         
@@ -220,7 +258,7 @@ class InstagramUploader:
         
         # Regardless of result, mark as attempted and return
         # upload_reel already marked it, but be extra safe
-        self._upload_attempted = True
+        self._attempted_uploads.add(self.upload_key(caption, video_path))
         
         return result
     
@@ -3,31 +3,415 @@ Main orchestrator for automated video uploads to YouTube and Instagram.
 Runs every Tuesday and Thursday at 11 AM via GitHub Actions.
 """
 
-import os
+import argparse
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
 from config import get_config
-from metadata_manager import MetadataManager
-from google_drive_handler import GoogleDriveHandler
-from thumbnail_extractor import ThumbnailExtractor
-from youtube_uploader import YouTubeUploader
-from instagram_uploader import InstagramUploader
+from http_metrics import log_report
+from clients import connect_drive, connect_instagram, connect_sheets, connect_youtube
+from pipeline import Pipeline, PipelineRun
+from run_journal import get_journal
+from run_log import setup_logging
+from run_metrics import export_run_metrics
+from retry_policy import set_run_deadline
+from run_profile import finish_profiling, start_profiling
+
+# Platform and media modules pull in gspread, googleapiclient, instagrapi,
+# cv2 and PIL, so they are imported by the stage that needs them
+if TYPE_CHECKING:
+    from metadata_manager import MetadataManager
+    from google_drive_handler import GoogleDriveHandler
+    from youtube_uploader import YouTubeUploader
+    from instagram_uploader import InstagramUploader
+
+
+PLATFORM_NAMES = {
+    'youtube': 'YouTube',
+    'instagram': 'Instagram',
+}
+
+# Per-stage timeouts in seconds
+AUTH_TIMEOUT = 600        # Allows for an interactive YouTube OAuth consent
+SHEETS_TIMEOUT = 120
+DOWNLOAD_TIMEOUT = 1800
+MEDIA_TIMEOUT = 300
+TRANSCODE_TIMEOUT = 1800
 
 
 def cleanup_temp_files(config):
-    """Clean up temporary files."""
+    """
+    Empty the scratch area and apply the cache and journal retention policies.
+    
+    Login state (YouTube token, Instagram session) and cached artifacts are
+    kept, so the next run doesn't need a fresh login or token exchange.
+    """
     try:
-        for file in os.listdir(config.temp_dir):
-            file_path = os.path.join(config.temp_dir, file)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-        print("Cleaned up temporary files")
+        removed = config.scratch.clear()
+        print(f"Cleaned up temporary files ({removed} removed)")
+        config.cache.enforce()
+        config.journal.enforce()
     except Exception as e:
         print(f"Warning: Could not clean up temp files: {e}")
 
 
+def upload_to_youtube(
+    youtube_uploader: 'YouTubeUploader',
+    metadata: dict,
+    video_path: str,
+    thumbnail_path: Optional[str]
+) -> Optional[str]:
+    """Upload the reel to YouTube. Returns the video ID, or None on failure."""
+    return youtube_uploader.upload_video(
+        video_path=video_path,
+        title=metadata['youtube_title'],
+        description=metadata['youtube_description'],
+        thumbnail_path=thumbnail_path,
+        privacy_status="public"
+    )
+
+
+def upload_to_instagram(
+    instagram_uploader: 'InstagramUploader',
+    metadata: dict,
+    video_path: str,
+    thumbnail_path: Optional[str]
+) -> Optional[str]:
+    """Upload the reel to Instagram. Returns the media ID, or None on failure."""
+    from instagram_uploader import NOT_POSTED
+    result = instagram_uploader.upload_reel_with_retry(
+        video_path=video_path,
+        caption=metadata['instagram_caption'],
+        cover_path=thumbnail_path,
+        max_retries=3
+    )
+    if result in NOT_POSTED:
+        # Blocked as a duplicate: nothing was posted by this run
+        print(f"⚠ Instagram upload blocked as a duplicate ({result})")
+        return None
+    return result
+
+
+CLIENTS = {
+    'sheets': connect_sheets,
+    'drive_auth': connect_drive,
+    'youtube_auth': connect_youtube,
+    'instagram_auth': connect_instagram,
+}
+
+UPLOADERS = {
+    'youtube': upload_to_youtube,
+    'instagram': upload_to_instagram,
+}
+
+
+def add_client_stages(pipeline: Pipeline, platforms: List[str]):
+    """Add the sheet, Drive and per-platform authentication stages."""
+    pipeline.add_stage('sheets', CLIENTS['sheets'], timeout=SHEETS_TIMEOUT)
+    pipeline.add_stage('drive_auth', CLIENTS['drive_auth'], timeout=AUTH_TIMEOUT)
+    for platform in platforms:
+        name = f'{platform}_auth'
+        pipeline.add_stage(name, CLIENTS[name], timeout=AUTH_TIMEOUT)
+
+
+def build_pipeline(config, platforms: Optional[List[str]] = None) -> Pipeline:
+    """
+    Build the scheduled upload pipeline.
+    
+    Drive, YouTube and Instagram authentication start as soon as the run
+    begins and overlap with the sheet lookup, the download and thumbnail
+    extraction. A video with its moov box at the end is remuxed to faststart
+    (unless FASTSTART_REMUX is off) before per-platform renditions are made.
+    Platform uploads run concurrently once the media is ready; each one is
+    skipped if the video's fingerprint matches an earlier post to that
+    platform. Sheet status writes happen in a single stage after every upload.
+    
+    The download, thumbnails, uploads and sheet writes are checkpointed in
+    the reel's journal (see run_journal.py), so a rerun after a crash skips
+    the ones an earlier run completed.
+    
+    Args:
+        config: Configuration
+        platforms: Platforms to upload to (default: all of UPLOADERS)
+    """
+    platforms = list(UPLOADERS) if platforms is None else platforms
+    pipeline = Pipeline(
+        'scheduled-upload',
+        max_workers=config.pipeline_workers,
+        limits={'upload': config.upload_workers}
+    )
+    
+    def resolve(sheets: 'MetadataManager') -> dict:
+        metadata = sheets.find_video_metadata()
+        if not metadata:
+            print("❌ No video found for today's date")
+            print("Make sure your Google Sheet has:")
+            print("  - A row with today's date (or Tuesday's date if today is Thursday)")
+            print("  - Type column (B) set to 'Podcast'")
+            print("  - Folder Name column (J) filled in")
+            raise LookupError("No video found for today's date")
+        print("✓ Found video metadata")
+        return metadata
+    
+    def fetch(resolve: dict, drive_auth: 'GoogleDriveHandler') -> dict:
+        def download() -> dict:
+            print(f"Downloading video from: {resolve['folder_name']}_reels/reel_{resolve['reel_number']}/")
+            video_path, cover_path = drive_auth.get_video_and_cover(
+                resolve['folder_name'],
+                resolve['reel_number']
+            )
+            if not video_path:
+                raise RuntimeError("Failed to download video")
+            
+            print(f"✓ Downloaded video: {video_path}")
+            if cover_path:
+                print(f"✓ Downloaded cover: {cover_path}")
+            else:
+                print("ℹ No custom cover found, will extract from video")
+            return {'video_path': video_path, 'cover_path': cover_path}
+        
+        return get_journal(resolve).step(
+            'fetch', download, files=lambda output: [output['video_path'], output['cover_path']]
+        )
+    
+    def probe(fetch: dict) -> Optional[dict]:
+        from thumbnail_extractor import ThumbnailExtractor
+        info = ThumbnailExtractor.probe_video(fetch['video_path'])
+        if info:
+            print(f"✓ Video info: {info['width']}x{info['height']}, "
+                  f"{info['duration']:.2f}s, {info['fps']:.2f} fps")
+            from media_probe import check_eligibility
+            for platform in platforms:
+                for problem in check_eligibility(info, platform):
+                    print(f"⚠ Warning: Not eligible for {PLATFORM_NAMES[platform]} short-form: {problem}")
+        return info
+    
+    def thumbnail(resolve: dict, fetch: dict) -> Dict[str, str]:
+        from artifact_cache import get_artifact_cache
+        from thumbnail_extractor import ThumbnailExtractor
+        
+        def create() -> Dict[str, str]:
+            thumbnails = ThumbnailExtractor.create_thumbnails(
+                fetch['video_path'],
+                fetch['cover_path'],
+                config.temp_dir,
+                get_artifact_cache()
+            )
+            if thumbnails:
+                print(f"✓ Thumbnails ready: {', '.join(sorted(thumbnails))}")
+            else:
+                print("⚠ Warning: Could not create thumbnail")
+            return thumbnails
+        
+        return get_journal(resolve).step('thumbnail', create, files=lambda output: output.values())
+    
+    def faststart(fetch: dict, probe: Optional[dict]) -> str:
+        from artifact_cache import get_artifact_cache
+        from transcoder import remux_faststart
+        return remux_faststart(fetch['video_path'], config.temp_dir, get_artifact_cache(), info=probe)
+    
+    def transcode(fetch: dict, probe: Optional[dict], faststart: Optional[str] = None) -> Dict[str, str]:
+        from artifact_cache import get_artifact_cache
+        from transcoder import create_renditions
+        source = faststart or fetch['video_path']
+        return create_renditions(source, platforms, config.temp_dir, get_artifact_cache(), info=probe)
+    
+    def fingerprint(fetch: dict, probe: Optional[dict]):
+        from fingerprint_index import compute_fingerprint
+        return compute_fingerprint(fetch['video_path'], info=probe)
+    
+    def make_upload(platform: str):
+        def upload(resolve: dict, fetch: dict, thumbnail: Optional[Dict[str, str]],
+                   transcode: Optional[Dict[str, str]], fingerprint=None, faststart: Optional[str] = None,
+                   **clients) -> Optional[str]:
+            from fingerprint_index import upload_once
+            # Without a rendition (transcode failed or not needed) the source is uploaded
+            video_path = (transcode or {}).get(platform) or faststart or fetch['video_path']
+            thumbnail_path = (thumbnail or {}).get(platform)
+            # A rerun after a crash returns the post ID recorded by the run
+            # that uploaded it instead of posting again
+            return get_journal(resolve).step(f'upload_{platform}', lambda: upload_once(
+                fingerprint, platform,
+                lambda: UPLOADERS[platform](clients[f'{platform}_auth'], resolve, video_path, thumbnail_path),
+                label=f"{resolve['folder_name']} reel_{resolve['reel_number']}"
+            ))
+        return upload
+    
+    def record(sheets: 'MetadataManager', resolve: dict, **uploads) -> dict:
+        results = {stage[len('upload_'):]: result for stage, result in uploads.items()}
+        for platform, result in results.items():
+            if result:
+                print(f"✓ {PLATFORM_NAMES[platform]} upload successful!")
+                get_journal(resolve).step(f'sheet_{platform}', lambda: sheets.update_status(
+                    resolve['row_number'], platform, 'UPLOADED', resolve['reel_number']
+                ))
+            else:
+                print(f"❌ {PLATFORM_NAMES[platform]} upload failed")
+        return results
+    
+    add_client_stages(pipeline, platforms)
+    pipeline.add_stage('resolve', resolve, depends_on=['sheets'], timeout=SHEETS_TIMEOUT)
+    pipeline.add_stage('fetch', fetch, depends_on=['resolve', 'drive_auth'], timeout=DOWNLOAD_TIMEOUT)
+    pipeline.add_stage('probe', probe, depends_on=['fetch'], timeout=MEDIA_TIMEOUT)
+    pipeline.add_stage('thumbnail', thumbnail, depends_on=['resolve', 'fetch'], timeout=MEDIA_TIMEOUT)
+    pipeline.add_stage('fingerprint', fingerprint, depends_on=['fetch'], after=['probe'], timeout=MEDIA_TIMEOUT)
+    remux = []
+    if config.faststart_remux:
+        pipeline.add_stage('faststart', faststart, depends_on=['fetch'], after=['probe'], timeout=TRANSCODE_TIMEOUT)
+        remux = ['faststart']
+    pipeline.add_stage('transcode', transcode, depends_on=['fetch'], after=['probe'] + remux, timeout=TRANSCODE_TIMEOUT)
+    
+    upload_stages = []
+    for platform in platforms:
+        name = f'upload_{platform}'
+        pipeline.add_stage(
+            name, make_upload(platform),
+            depends_on=[f'{platform}_auth', 'resolve', 'fetch'],
+            after=['thumbnail', 'transcode', 'fingerprint'] + remux,
+            group='upload'
+        )
+        upload_stages.append(name)
+    
+    # Uploads have no timeout: a timed-out stage keeps running in its thread,
+    # so an upload could still publish after 'record' reported it as failed
+    pipeline.add_stage(
+        'record', record,
+        depends_on=['sheets', 'resolve'], after=upload_stages,
+        timeout=SHEETS_TIMEOUT
+    )
+    return pipeline
+
+
+def report_stage_errors(run: PipelineRun):
+    """Print the error of every stage that failed or timed out."""
+    for name, error in run.errors.items():
+        print(f"❌ Stage '{name}' failed: {error}")
+
+
+def run_batch(config, start_date: datetime, end_date: datetime, types: Optional[List[str]],
+              runs: Optional[List[PipelineRun]] = None) -> bool:
+    """
+    Upload every reel due between two dates in a single run.
+    
+    The sheet, Drive and platform clients are authenticated once and shared
+    by every reel. Reels are processed concurrently (BATCH_WORKERS at a time)
+    and each one runs in its own pipeline, so a failure in one reel does not
+    stop the others.
+    
+    Args:
+        config: Configuration
+        start_date: First due date to include
+        end_date: Last due date to include
+        types: Sheet row types to include (all types if None)
+        runs: If given, every pipeline run of the batch is appended to it
+    
+    Returns:
+        True if every due reel was uploaded to every platform
+    """
+    # Authenticate once for the whole batch
+    auth = Pipeline('authenticate', max_workers=len(CLIENTS))
+    add_client_stages(auth, list(UPLOADERS))
+    clients = auth.run()
+    if runs is not None:
+        runs.append(clients)
+    report_stage_errors(clients)
+    print(clients.timing_report())
+    print()
+    
+    if not clients.succeeded('sheets') or not clients.succeeded('drive_auth'):
+        print("❌ Could not connect to Google Sheets and Drive")
+        return False
+    
+    # Platforms whose login failed are left out instead of retried per reel
+    platforms = [p for p in UPLOADERS if clients.succeeded(f'{p}_auth')]
+    
+    due = clients.output('sheets').find_due_videos(start_date, end_date, types)
+    if not due:
+        print("No reels due in this window")
+        return True
+    
+    def process(metadata: dict) -> PipelineRun:
+        # Platforms the sheet already marks as done for this reel are not posted again
+        pending = [p for p in platforms if p not in metadata['uploaded']]
+        return build_pipeline(config, pending).run(
+            cached={**clients.outputs, 'resolve': metadata}
+        )
+    
+    summary = []
+    with ThreadPoolExecutor(max_workers=config.batch_workers, thread_name_prefix='batch') as executor:
+        futures = [(metadata, executor.submit(process, metadata)) for metadata in due]
+        
+        for metadata, future in futures:
+            label = (f"row {metadata['row_number']} {metadata['folder_name']} "
+                     f"reel_{metadata['reel_number']}")
+            try:
+                run = future.result()
+            except Exception as e:
+                summary.append((label, False, f"error: {e}"))
+                continue
+            if runs is not None:
+                runs.append(run)
+            
+            results = run.output('record') or {}
+            uploaded = metadata['uploaded']
+            ok = run.succeeded('fetch') and all(results.get(p) for p in UPLOADERS if p not in uploaded)
+            if not run.succeeded('fetch'):
+                detail = f"not downloaded: {run.errors.get('fetch')}"
+            else:
+                detail = ", ".join(
+                    f"{PLATFORM_NAMES[p]} "
+                    f"{'already uploaded' if p in uploaded else 'ok' if results.get(p) else 'failed'}"
+                    for p in UPLOADERS
+                )
+            summary.append((label, ok, detail))
+    
+    print()
+    print("=" * 80)
+    print(f"BATCH SUMMARY ({sum(ok for _, ok, _ in summary)}/{len(summary)} reels fully uploaded)")
+    print("=" * 80)
+    for label, ok, detail in summary:
+        print(f"{'✓' if ok else '❌'} {label}: {detail}")
+    
+    return all(ok for _, ok, _ in summary)
+
+
+def parse_types(value: str) -> List[str]:
+    """Split a comma-separated --types value, dropping blanks and padding."""
+    return [t.strip() for t in value.split(',') if t.strip()]
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Scheduled upload of today's reel to YouTube and Instagram")
+    parser.add_argument("--batch", action="store_true",
+                        help="Upload every reel due between --start and --end instead of today's reel")
+    parser.add_argument("--start", help="First due date for --batch (YYYY-MM-DD, default: today)")
+    parser.add_argument("--end", help="Last due date for --batch (YYYY-MM-DD, default: today)")
+    parser.add_argument("--types", type=parse_types,
+                        help="Comma-separated sheet row types for --batch (default: all types)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import/initialization time per module and check the startup budget")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run every pipeline stage under cProfile and write its stats next to the run log")
+    parser.add_argument("--trace", action="store_true",
+                        help="Write a Chrome trace timeline of stages and HTTP calls next to the run log")
+    return parser.parse_args(argv)
+
+
 def main():
     """Main execution function."""
+    args = parse_args()
+    
+    if args.profile_startup:
+        from startup_profile import profile_startup
+        sys.exit(0 if profile_startup('main') else 1)
+    
+    setup_logging('main')
+    start_profiling(profile=args.profile, trace=args.trace)
+    set_run_deadline()
+    started = time.time()
     print("=" * 80)
     print("CINROL Video Automation System")
     print("=" * 80)
@@ -41,117 +425,34 @@ def main():
         print("✓ Configuration loaded")
         print()
         
-        # Initialize metadata manager
-        print("Connecting to Google Sheets...")
-        metadata_manager = MetadataManager()
-        print("✓ Connected to Google Sheets")
-        print()
-        
-        # Get metadata for today's video
-        print("Looking up video metadata...")
-        metadata = metadata_manager.find_video_metadata()
+        if args.batch:
+            today = datetime.now()
+            start_date = datetime.strptime(args.start, '%Y-%m-%d') if args.start else today
+            end_date = datetime.strptime(args.end, '%Y-%m-%d') if args.end else today
+            
+            runs = []
+            success = run_batch(config, start_date, end_date, args.types or None, runs)
+            log_report()
+            export_run_metrics('main', runs, success, started)
+            finish_profiling('main')
+            cleanup_temp_files(config)
+            sys.exit(0 if success else 1)
         
-        if not metadata:
-            print("❌ No video found for today's date")
-            print("Make sure your Google Sheet has:")
-            print("  - A row with today's date (or Tuesday's date if today is Thursday)")
-            print("  - Type column (B) set to 'Podcast'")
-            print("  - Folder Name column (J) filled in")
-            sys.exit(1)
+        run = build_pipeline(config).run()
         
-        print("✓ Found video metadata")
         print()
-        
-        # Initialize Google Drive handler
-        print("Connecting to Google Drive...")
-        drive_handler = GoogleDriveHandler()
-        print("✓ Connected to Google Drive")
+        report_stage_errors(run)
+        print(run.timing_report())
+        log_report()
+        uploads = run.output('record') or {}
+        export_run_metrics('main', [run], run.succeeded('fetch') and all(uploads.values()), started)
+        finish_profiling('main')
         print()
         
-        # Download video and cover
-        print(f"Downloading video from: {metadata['folder_name']}_reels/reel_{metadata['reel_number']}/")
-        video_path, cover_path = drive_handler.get_video_and_cover(
-            metadata['folder_name'],
-            metadata['reel_number']
-        )
-        
-        if not video_path:
-            print("❌ Failed to download video")
+        # Without metadata or the downloaded video there was nothing to upload
+        if not run.succeeded('fetch'):
             sys.exit(1)
         
-        print(f"✓ Downloaded video: {video_path}")
-        if cover_path:
-            print(f"✓ Downloaded cover: {cover_path}")
-        else:
-            print("ℹ No custom cover found, will extract from video")
-        print()
-        
-        # Create/get thumbnail
-        print("Preparing thumbnail...")
-        thumbnail_path = ThumbnailExtractor.create_thumbnail(
-            video_path,
-            cover_path,
-            config.temp_dir
-        )
-        
-        if thumbnail_path:
-            print(f"✓ Thumbnail ready: {thumbnail_path}")
-        else:
-            print("⚠ Warning: Could not create thumbnail")
-        print()
-        
-        # Upload to YouTube
-        print("-" * 80)
-        print("UPLOADING TO YOUTUBE")
-        print("-" * 80)
-        
-        try:
-            youtube_uploader = YouTubeUploader()
-            
-            video_id = youtube_uploader.upload_video(
-                video_path=video_path,
-                title=metadata['youtube_title'],
-                description=metadata['youtube_description'],
-                thumbnail_path=thumbnail_path,
-                privacy_status="public"
-            )
-            
-            if video_id:
-                print("✓ YouTube upload successful!")
-                # Update status in sheet
-                metadata_manager.update_status(metadata['row_number'], 'youtube', 'UPLOADED')
-            else:
-                print("❌ YouTube upload failed")
-        except Exception as e:
-            print(f"❌ YouTube upload error: {e}")
-        
-        print()
-        
-        # Upload to Instagram
-        print("-" * 80)
-        print("UPLOADING TO INSTAGRAM")
-        print("-" * 80)
-        
-        try:
-            instagram_uploader = InstagramUploader()
-            
-            media_id = instagram_uploader.upload_reel_with_retry(
-                video_path=video_path,
-                caption=metadata['instagram_caption'],
-                cover_path=thumbnail_path,
-                max_retries=3
-            )
-            
-            if media_id:
-                print("✓ Instagram upload successful!")
-                # Update status in sheet
-                metadata_manager.update_status(metadata['row_number'], 'instagram', 'UPLOADED')
-            else:
-                print("❌ Instagram upload failed")
-        except Exception as e:
-            print(f"❌ Instagram upload error: {e}")
-        
-        print()
         print("=" * 80)
         print("UPLOAD PROCESS COMPLETED")
         print("=" * 80)
@@ -167,9 +468,10 @@ def main():
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
+        export_run_metrics('main', [], False, started)
+        finish_profiling('main')
         sys.exit(1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -7,14 +7,14 @@ Usage Examples:
     python manual_upload.py --video "drive://folder/video.mp4" \\
         --caption "New episode! 🎙️ #podcast" \\
         --platform instagram
-
+    
     # YouTube only
     python manual_upload.py --video "drive://folder/video.mp4" \\
         --title "Episode 4: Big Moments" \\
         --description "Full episode description..." \\
         --thumbnail "drive://folder/cover.jpg" \\
         --platform youtube
-
+    
     # Both platforms
     python manual_upload.py --video "drive://folder/video.mp4" \\
         --title "Episode 4" \\
@@ -22,7 +22,13 @@ Usage Examples:
         --caption "New episode!" \\
         --thumbnail "drive://folder/cover.jpg" \\
         --platform both
-
+    
+    # Check a Drive video and its thumbnails without downloading or uploading
+    python manual_upload.py --folder "https://drive.google.com/drive/folders/FOLDER_ID" --preview
+    
+    # Many uploads in one run (JSONL or CSV manifest, resumable)
+    python manual_upload.py --manifest uploads.jsonl --results uploads.results.jsonl
+    
     # Update Instagram bio only
     python manual_upload.py --update-bio \\
         --episode 4 \\
@@ -33,34 +39,41 @@ Usage Examples:
 import argparse
 import os
 import sys
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Dict, List, Optional
 
+from clients import connect_drive, connect_instagram, connect_youtube
 from config import get_config
-from google_drive_handler import GoogleDriveHandler
-from youtube_uploader import YouTubeUploader
-from thumbnail_extractor import ThumbnailExtractor
+from http_metrics import log_report
+from pipeline import Pipeline, PipelineRun
+from run_log import setup_logging
+from run_metrics import export_run_metrics
+from retry_policy import set_run_deadline
+from run_profile import finish_profiling, start_profiling
+from upload_manifest import ResultsLog, load_manifest
+
+# Platform and media modules are imported by the stage that needs them, so a
+# YouTube-only upload or --update-bio doesn't pay for instagrapi, cv2 and PIL
+if TYPE_CHECKING:
+    from google_drive_handler import GoogleDriveHandler
+    from youtube_uploader import YouTubeUploader
 
 # Instagram is optional (requires Python < 3.14)
-try:
-    from instagram_uploader import InstagramUploader
-    INSTAGRAM_AVAILABLE = True
-except ImportError:
-    INSTAGRAM_AVAILABLE = False
+INSTAGRAM_AVAILABLE = find_spec("instagrapi") is not None
+if not INSTAGRAM_AVAILABLE:
     print("Warning: Instagram support not available (instagrapi not installed)")
 
-# TikTok uploader (official API)
-try:
-    from tiktok_uploader import TikTokUploader
-    TIKTOK_AVAILABLE = True
-except ImportError:
-    TIKTOK_AVAILABLE = False
 
-# TikTok uploader (Buffer)
-try:
-    from tiktok_uploader_buffer import TikTokUploaderBuffer
-    BUFFER_AVAILABLE = True
-except ImportError:
-    BUFFER_AVAILABLE = False
+# Platforms uploaded to for each --platform choice
+PLATFORMS = {
+    "youtube": ["youtube"],
+    "instagram": ["instagram"],
+    "tiktok": ["tiktok"],
+    "all": ["youtube", "instagram", "tiktok"],
+}
 
 
 def extract_folder_id_from_link(link: str) -> Optional[str]:
@@ -90,9 +103,10 @@ def parse_drive_path(path: str) -> tuple:
     return None, path
 
 
-def download_from_folder_link(drive_handler: GoogleDriveHandler, folder_link: str) -> tuple:
+def download_from_folder_link(drive_handler: 'GoogleDriveHandler', folder_link: str, prefix: str = "manual") -> tuple:
     """
     Download video and cover files from a Google Drive folder link.
+    Local files are named '<prefix>_video' and '<prefix>_cover'.
     Returns: (video_path, cover_path)
     """
     folder_id = extract_folder_id_from_link(folder_link)
@@ -114,10 +128,10 @@ def download_from_folder_link(drive_handler: GoogleDriveHandler, folder_link: st
     cover_file = None
     
     # Get all files in folder
-    all_files = drive_handler.service.files().list(
+    all_files = drive_handler.execute(drive_handler.service.files().list(
         q=f"'{folder_id}' in parents and trashed=false",
-        fields='files(id, name, mimeType)'
-    ).execute().get('files', [])
+        fields='files(id, name, mimeType, md5Checksum)'
+    ), "list files in Drive folder").get('files', [])
     
     # Prefer image files with "cover" or "thumbnail" in name
     for file in all_files:
@@ -145,35 +159,23 @@ def download_from_folder_link(drive_handler: GoogleDriveHandler, folder_link: st
     
     # Download video
     video_ext = os.path.splitext(video_file['name'])[1]
-    video_path = os.path.join(config.temp_dir, f"manual_video{video_ext}")
+    video_path = os.path.join(config.temp_dir, f"{prefix}_video{video_ext}")
     
-    if not drive_handler.download_file(video_file['id'], video_path):
+    if not drive_handler.download_file(video_file['id'], video_path, video_file.get('md5Checksum')):
         return None, None
     
     # Download cover if found
     cover_path = None
     if cover_file:
         cover_ext = os.path.splitext(cover_file['name'])[1]
-        cover_path = os.path.join(config.temp_dir, f"manual_cover{cover_ext}")
-        drive_handler.download_file(cover_file['id'], cover_path)
+        cover_path = os.path.join(config.temp_dir, f"{prefix}_cover{cover_ext}")
+        drive_handler.download_file(cover_file['id'], cover_path, cover_file.get('md5Checksum'))
     
     return video_path, cover_path
 
 
-def download_from_drive(drive_handler: GoogleDriveHandler, drive_path: str, local_filename: str) -> Optional[str]:
-    """Download a file from Google Drive given a path."""
-    folder_path, filename = parse_drive_path(drive_path)
-    
-    if not folder_path:
-        # It's a local file
-        if os.path.exists(drive_path):
-            return drive_path
-        else:
-            print(f"Error: File not found: {drive_path}")
-            return None
-    
-    print(f"Downloading from Google Drive: {folder_path}/{filename}")
-    
+def find_drive_file(drive_handler: 'GoogleDriveHandler', folder_path: str, filename: str) -> Optional[dict]:
+    """Find a file by folder path (relative to the root folder) and name."""
     # Navigate to folder
     folder_id = drive_handler.config.drive_folder_id
     for folder_name in folder_path.split("/"):
@@ -186,17 +188,36 @@ def download_from_drive(drive_handler: GoogleDriveHandler, drive_path: str, loca
     file_info = drive_handler.find_file_in_folder(folder_id, file_pattern=None)
     if not file_info or file_info['name'] != filename:
         # Try to find exact filename
-        results = drive_handler.service.files().list(
+        results = drive_handler.execute(drive_handler.service.files().list(
             q=f"name='{filename}' and '{folder_id}' in parents and trashed=false",
             spaces='drive',
             fields='files(id, name)'
-        ).execute()
+        ), f"find '{filename}' on Drive")
         
         files = results.get('files', [])
         if not files:
             print(f"Error: File not found: {filename}")
             return None
         file_info = files[0]
+    return file_info
+
+
+def download_from_drive(drive_handler: 'GoogleDriveHandler', drive_path: str, local_filename: str) -> Optional[str]:
+    """Download a file from Google Drive given a path."""
+    folder_path, filename = parse_drive_path(drive_path)
+    
+    if not folder_path:
+        # It's a local file
+        if os.path.exists(drive_path):
+            return drive_path
+        else:
+            print(f"Error: File not found: {drive_path}")
+            return None
+    
+    print(f"Downloading from Google Drive: {folder_path}/{filename}")
+    file_info = find_drive_file(drive_handler, folder_path, filename)
+    if not file_info:
+        return None
     
     # Download
     config = get_config()
@@ -208,13 +229,69 @@ def download_from_drive(drive_handler: GoogleDriveHandler, drive_path: str, loca
     return None
 
 
-def upload_to_youtube(args, video_path: str, thumbnail_path: Optional[str]):
+def preview_from_drive(args, config) -> bool:
+    """
+    Probe a Drive video and create its thumbnails without downloading it.
+    
+    The video is read with range requests (see remote_file.py): only the
+    moov box and the parts around the sampled frames are fetched. Nothing
+    is uploaded.
+    
+    Returns:
+        True if the video could be probed
+    """
+    from media_probe import PLATFORM_LIMITS, MediaProbeError, check_eligibility, probe_reader
+    from remote_file import serve_http
+    from thumbnail_extractor import ThumbnailExtractor
+    
+    drive = connect_drive()
+    if args.folder:
+        folder_id = extract_folder_id_from_link(args.folder)
+        video_file = drive.find_file_in_folder(folder_id) if folder_id else None
+    else:
+        folder_path, filename = parse_drive_path(args.video)
+        video_file = find_drive_file(drive, folder_path, filename) if folder_path else None
+    if not video_file:
+        print("Error: --preview needs a video on Google Drive (--folder or --video drive://...)")
+        return False
+    
+    print(f"Previewing: {video_file['name']}")
+    remote = drive.open_file(video_file['id'], name=video_file['name'])
+    try:
+        # Probe through the same file so ffmpeg reuses the cached moov box
+        info = probe_reader(remote.read_at, remote.size).as_dict()
+    except MediaProbeError as e:
+        print(f"Error: Could not probe video: {e}")
+        return False
+    print(f"Video info: {info['width']}x{info['height']}, {info['duration']:.2f}s, {info['fps']:.2f} fps, "
+          f"{info['video_codec']}/{info['audio_codec']}, faststart: {info['faststart']}")
+    for platform in PLATFORMS[args.platform]:
+        if platform in PLATFORM_LIMITS:
+            problems = check_eligibility(info, platform)
+            print(f"  {platform}: {'eligible' if not problems else '; '.join(problems)}")
+    
+    with serve_http(remote) as url:
+        thumbnails = ThumbnailExtractor.create_thumbnails(url, None, config.temp_dir, info=info)
+    for name, path in thumbnails.items():
+        print(f"Thumbnail ({name}): {path}")
+    print(f"Read {remote.bytes_fetched / 1e6:.1f} MB of {remote.size / 1e6:.1f} MB "
+          f"in {remote.requests} range requests")
+    return True
+
+
+def upload_to_youtube(
+    args,
+    video_path: str,
+    thumbnail_path: Optional[str],
+    youtube: Optional['YouTubeUploader'] = None
+):
     """Upload video to YouTube. Returns YouTube URL if successful."""
     print("\n" + "="*80)
     print("UPLOADING TO YOUTUBE")
     print("="*80)
     
-    youtube = YouTubeUploader()
+    if youtube is None:
+        youtube = connect_youtube()
     
     # Parse schedule time if provided
     publish_at = None
@@ -260,7 +337,7 @@ def upload_to_youtube(args, video_path: str, thumbnail_path: Optional[str]):
         return None
 
 
-def upload_to_instagram(args, video_path: str, cover_path: Optional[str]):
+def upload_to_instagram(args, video_path: str, cover_path: Optional[str], instagram=None):
     """Upload video to Instagram. Returns Instagram URL if successful."""
     print("\n" + "="*80)
     print("UPLOADING TO INSTAGRAM - SINGLE ATTEMPT ONLY")
@@ -271,20 +348,20 @@ def upload_to_instagram(args, video_path: str, cover_path: Optional[str]):
         return None
     
     # Additional safeguard: Check for lock file before creating uploader instance
-    import hashlib
+    from instagram_uploader import NOT_POSTED, InstagramUploader
     config = get_config()
-    caption_hash = hashlib.md5(args.caption.encode()).hexdigest()[:8]
-    lock_file = os.path.join(config.temp_dir, f"instagram_upload_{caption_hash}.lock")
+    lock_file = InstagramUploader.lock_file(config.temp_dir, args.caption, video_path)
     
     if os.path.exists(lock_file):
         print(f"✗ ERROR: Lock file exists: {lock_file}")
-        print("✗ Another upload with this caption is in progress or was recently completed.")
+        print("✗ Another upload of this reel is in progress or was recently completed.")
         print("✗ To prevent duplicates, this upload is BLOCKED.")
-        return "locked"
+        return None
     
-    # Create Instagram uploader instance
+    # Create Instagram uploader instance (unless a logged-in one was passed in)
     # The uploader itself has multiple safeguards built in
-    instagram = InstagramUploader()
+    if instagram is None:
+        instagram = connect_instagram()
     
     # Call upload - this will only attempt once due to built-in safeguards
     print("Calling upload_reel_with_retry (which has NO retries)...")
@@ -294,7 +371,7 @@ def upload_to_instagram(args, video_path: str, cover_path: Optional[str]):
         cover_path=cover_path
     )
     
-    if media_id and media_id != "already_attempted" and media_id != "locked" and media_id != "uploaded":
+    if media_id and media_id not in NOT_POSTED and media_id != "uploaded":
         # Try to construct Instagram URL
         # Note: instagrapi may not always return the code, so we'll try to get it
         try:
@@ -322,61 +399,37 @@ def upload_to_instagram(args, video_path: str, cover_path: Optional[str]):
         return None
 
 
-def upload_to_tiktok(args, video_path: str, folder_link: str = None):
-    """Upload video to TikTok using Buffer API."""
+def upload_to_tiktok(args, video_path: str):
+    """Upload video to TikTok using the Content Posting API."""
     print("\n" + "="*80)
     print("UPLOADING TO TIKTOK")
     print("="*80)
     
-    # Use caption as the main text (TikTok uses caption, not separate title/description)
+    # TikTok has a single caption (hashtags included) instead of a title and description
     caption = args.caption or args.title or "New Video"
     
-    # Extract hashtags from caption
-    hashtags = []
-    words = caption.split()
-    hashtags = [word[1:] for word in words if word.startswith('#')]
-    
-    # Remove hashtags from caption text (they'll be added separately)
-    caption_text = " ".join([word for word in words if not word.startswith('#')])
-    
-    # Use Buffer (default method)
-    if not BUFFER_AVAILABLE:
-        print("✗ Buffer support not available")
-        print("   Install: pip install requests")
-        print("   Add BUFFER_ACCESS_TOKEN to .env")
-        return False
-    
     try:
-        buffer = TikTokUploaderBuffer()
-        
-        # If folder link provided, use that method
-        if folder_link:
-            result = buffer.upload_from_google_drive_folder(
-                folder_link=folder_link,
-                caption=caption,
-                hashtags=hashtags
-            )
-        else:
-            # Need to get public URL for video
-            print("✗ Buffer requires a public video URL or folder link")
-            print("   Use --folder option or make video publicly shareable")
-            return False
+        import http_metrics
+        from tiktok_uploader import TikTokUploader
+        http_metrics.install()
+        uploader = TikTokUploader()
+        result = uploader.upload_with_retry(video_path, caption)
         
         if result:
-            print(f"✓ TikTok video posted via Buffer!")
-            print(f"   Post ID: {result}")
-            return True
+            print(f"✓ TikTok video posted!")
+            print(f"   {result}")
+            return result
         else:
-            print("✗ Buffer upload failed")
-            return False
+            print("✗ TikTok upload failed")
+            return None
             
     except ValueError as e:
-        print(f"✗ Buffer setup error: {e}")
-        print("   Make sure BUFFER_ACCESS_TOKEN is in .env")
-        return False
+        print(f"✗ TikTok setup error: {e}")
+        print("   Add TIKTOK_ACCESS_TOKEN to .env")
+        return None
     except Exception as e:
-        print(f"✗ Buffer error: {e}")
-        return False
+        print(f"✗ TikTok error: {e}")
+        return None
 
 
 def update_instagram_bio(args):
@@ -389,7 +442,7 @@ def update_instagram_bio(args):
         print("✗ Instagram support not available (requires instagrapi package)")
         return False
     
-    instagram = InstagramUploader()
+    instagram = connect_instagram()
     
     try:
         # Update bio with episode links
@@ -423,6 +476,326 @@ def update_instagram_bio(args):
         return False
 
 
+def build_pipeline(args, config, platforms: Optional[List[str]] = None) -> Pipeline:
+    """
+    Build the manual upload pipeline for the selected platform(s).
+    
+    YouTube and Instagram authentication start right away and overlap with the
+    download. Uploads to different platforms run concurrently once the video
+    and thumbnail are ready, and the Google Sheet tracker is updated last.
+    
+    Args:
+        args: Upload options (command line arguments or a manifest entry)
+        config: Configuration
+        platforms: Platforms to upload to (default: from args.platform)
+    """
+    if platforms is None:
+        platforms = PLATFORMS[args.platform]
+    prefix = getattr(args, 'file_prefix', None) or "manual"
+    pipeline = Pipeline(
+        'manual-upload',
+        max_workers=config.pipeline_workers,
+        limits={'upload': config.upload_workers}
+    )
+    
+    def fetch(drive_auth: 'GoogleDriveHandler') -> dict:
+        thumbnail_path = None
+        if args.folder:
+            # Use folder link - automatically find video and cover
+            print("Downloading from folder link...")
+            video_path, thumbnail_path = download_from_folder_link(drive_auth, args.folder, prefix)
+        else:
+            print("Downloading video...")
+            video_path = download_from_drive(drive_auth, args.video, f"{prefix}_video.mp4")
+            if video_path and args.thumbnail:
+                print("Downloading thumbnail...")
+                thumbnail_path = download_from_drive(drive_auth, args.thumbnail, f"{prefix}_thumbnail.jpg")
+        
+        if not video_path:
+            raise RuntimeError("Failed to download video")
+        return {'video_path': video_path, 'thumbnail_path': thumbnail_path}
+    
+    def probe(fetch: dict) -> Optional[dict]:
+        from thumbnail_extractor import ThumbnailExtractor
+        info = ThumbnailExtractor.probe_video(fetch['video_path'])
+        if info:
+            print(f"Video info: {info['width']}x{info['height']}, "
+                  f"{info['duration']:.2f}s, {info['fps']:.2f} fps")
+            from media_probe import PLATFORM_LIMITS, check_eligibility
+            for platform in platforms:
+                if platform not in PLATFORM_LIMITS:
+                    continue
+                for problem in check_eligibility(info, platform):
+                    print(f"⚠ Warning: Not eligible for {platform} short-form: {problem}")
+        return info
+    
+    def thumbnail(fetch: dict) -> Dict[str, str]:
+        if not fetch['thumbnail_path'] and args.folder:
+            return {}
+        if not fetch['thumbnail_path']:
+            print("No thumbnail provided, extracting from video...")
+        from artifact_cache import get_artifact_cache
+        from thumbnail_extractor import ThumbnailExtractor
+        return ThumbnailExtractor.create_thumbnails(
+            fetch['video_path'], fetch['thumbnail_path'], config.temp_dir, get_artifact_cache()
+        )
+    
+    def faststart(fetch: dict, probe: Optional[dict]) -> str:
+        from artifact_cache import get_artifact_cache
+        from transcoder import remux_faststart
+        return remux_faststart(fetch['video_path'], config.temp_dir, get_artifact_cache(), info=probe)
+    
+    def transcode(fetch: dict, probe: Optional[dict], faststart: Optional[str] = None) -> Dict[str, str]:
+        from artifact_cache import get_artifact_cache
+        from transcoder import create_renditions
+        source = faststart or fetch['video_path']
+        return create_renditions(source, platforms, config.temp_dir, get_artifact_cache(), info=probe)
+    
+    def fingerprint(fetch: dict, probe: Optional[dict]):
+        from fingerprint_index import compute_fingerprint
+        return compute_fingerprint(fetch['video_path'], info=probe)
+    
+    def video_for(platform: str, fetch: dict, transcode: Optional[Dict[str, str]],
+                  faststart: Optional[str]) -> str:
+        # Without a rendition (transcode failed or not needed) the source is uploaded
+        return (transcode or {}).get(platform) or faststart or fetch['video_path']
+    
+    def once(platform: str, fingerprint, upload):
+        # Skipped if the same video was already posted there (unless --allow-duplicate)
+        from fingerprint_index import upload_once
+        label = args.title or args.caption or os.path.basename(args.folder or args.video or '')
+        return upload_once(fingerprint, platform, upload, label=label[:80],
+                           allow_duplicate=getattr(args, 'allow_duplicate', False))
+    
+    def upload_youtube(youtube_auth, fetch, thumbnail, transcode, fingerprint=None, faststart=None):
+        return once('youtube', fingerprint, lambda: upload_to_youtube(
+            args, video_for('youtube', fetch, transcode, faststart),
+            (thumbnail or {}).get('youtube'), youtube=youtube_auth
+        ))
+    
+    def upload_instagram(fetch, thumbnail, transcode, fingerprint=None, faststart=None, instagram_auth=None):
+        return once('instagram', fingerprint, lambda: upload_to_instagram(
+            args, video_for('instagram', fetch, transcode, faststart),
+            (thumbnail or {}).get('instagram'), instagram=instagram_auth
+        ))
+    
+    def upload_tiktok(fetch, transcode, fingerprint=None, faststart=None):
+        return once('tiktok', fingerprint, lambda: upload_to_tiktok(
+            args, video_for('tiktok', fetch, transcode, faststart)
+        ))
+    
+    def record(**uploads) -> dict:
+        results = {stage[len('upload_'):]: result for stage, result in uploads.items()}
+        # A resumed manifest entry only uploads the platforms an earlier run
+        # missed; the tracker needs the URLs of both runs
+        posted = dict(getattr(args, 'previous_uploads', None) or {}, **results)
+        youtube_url = posted.get('youtube')
+        if youtube_url and all(posted.values()):
+            update_sheet_tracker(youtube_url, posted.get('instagram'))
+        return results
+    
+    pipeline.add_stage('drive_auth', connect_drive)
+    pipeline.add_stage('fetch', fetch, depends_on=['drive_auth'])
+    pipeline.add_stage('probe', probe, depends_on=['fetch'])
+    pipeline.add_stage('thumbnail', thumbnail, depends_on=['fetch'])
+    remux = []
+    if config.faststart_remux:
+        pipeline.add_stage('faststart', faststart, depends_on=['fetch'], after=['probe'])
+        remux = ['faststart']
+    pipeline.add_stage('transcode', transcode, depends_on=['fetch'], after=['probe'] + remux)
+    pipeline.add_stage('fingerprint', fingerprint, depends_on=['fetch'], after=['probe'])
+    checks = ['fingerprint'] + remux
+    
+    upload_stages = []
+    if 'youtube' in platforms:
+        pipeline.add_stage('youtube_auth', connect_youtube)
+        pipeline.add_stage(
+            'upload_youtube', upload_youtube,
+            depends_on=['youtube_auth', 'fetch'], after=['thumbnail', 'transcode'] + checks, group='upload'
+        )
+        upload_stages.append('upload_youtube')
+    if 'instagram' in platforms:
+        instagram_deps = ['fetch']
+        if INSTAGRAM_AVAILABLE:
+            pipeline.add_stage('instagram_auth', connect_instagram)
+            instagram_deps.append('instagram_auth')
+        pipeline.add_stage(
+            'upload_instagram', upload_instagram,
+            depends_on=instagram_deps, after=['thumbnail', 'transcode'] + checks, group='upload'
+        )
+        upload_stages.append('upload_instagram')
+    if 'tiktok' in platforms:
+        pipeline.add_stage('upload_tiktok', upload_tiktok, depends_on=['fetch'], after=['transcode'] + checks,
+                           group='upload')
+        upload_stages.append('upload_tiktok')
+    
+    pipeline.add_stage('record', record, after=upload_stages)
+    return pipeline
+
+
+def update_sheet_tracker(youtube_url: str, instagram_url: Optional[str]):
+    """Update the Google Sheet tracker after a successful YouTube upload."""
+    print("\n" + "="*80)
+    print("UPDATING GOOGLE SHEET TRACKER")
+    print("="*80)
+    try:
+        import subprocess
+        cmd = [
+            sys.executable,
+            os.path.join(os.path.dirname(__file__), "update_sheet_after_post.py"),
+            youtube_url
+        ]
+        if instagram_url and instagram_url != "uploaded":
+            cmd.append(instagram_url)
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0:
+            print("✓ Google Sheet updated successfully")
+            if result.stdout:
+                print(result.stdout)
+        else:
+            print(f"⚠ Warning: Could not update Google Sheet: {result.stderr}")
+    except Exception as e:
+        print(f"⚠ Warning: Error updating Google Sheet: {e}")
+    print("="*80)
+
+
+def cleanup_run(run: PipelineRun):
+    """
+    Delete the video and thumbnail downloaded or extracted by a pipeline run.
+    Local files passed in with --video/--thumbnail are left alone.
+    """
+    temp_dir = os.path.abspath(get_config().temp_dir)
+    try:
+        fetched = run.output('fetch')
+        thumbnails = run.output('thumbnail') or {}
+        renditions = run.output('transcode') or {}
+        remuxed = run.output('faststart') if 'faststart' in run.records else None
+        for path in [fetched['video_path'], fetched['thumbnail_path'], remuxed,
+                     *thumbnails.values(), *renditions.values()]:
+            if path and os.path.dirname(os.path.abspath(path)) == temp_dir and os.path.exists(path):
+                os.remove(path)
+    except:
+        pass
+
+
+def run_manifest(args, config, runs: Optional[List[PipelineRun]] = None) -> bool:
+    """
+    Run every upload in a manifest file in this process.
+    
+    Drive, YouTube and Instagram sessions are created once and shared by all
+    entries. Entries run concurrently (BATCH_WORKERS at a time), each in its
+    own pipeline, and every result is appended to the results file as soon as
+    the entry finishes. Platforms an entry was already uploaded to are
+    skipped, so an interrupted or partly failed manifest can simply be run
+    again without posting anything twice.
+    
+    Args:
+        args: Command line arguments (--manifest, --results, --allow-duplicate)
+        config: Configuration
+        runs: If given, every pipeline run is appended to it
+    
+    Returns:
+        True if every entry succeeded
+    """
+    try:
+        entries = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load manifest: {e}")
+        return False
+    
+    results_path = args.results or f"{os.path.splitext(args.manifest)[0]}.results.jsonl"
+    results_log = ResultsLog(results_path)
+    
+    # Resume per platform: an entry is only uploaded where it hasn't succeeded yet
+    done = results_log.completed_platforms()
+    previous = results_log.completed_uploads()
+    pending = []
+    for entry in entries:
+        remaining = [p for p in entry['platforms'] if p not in done.get(entry['id'], set())]
+        if remaining:
+            uploaded = {p: url for p, url in previous.get(entry['id'], {}).items() if p in entry['platforms']}
+            pending.append(dict(entry, remaining=remaining, uploaded=uploaded))
+    
+    print(f"Manifest: {args.manifest} ({len(entries)} entries, {len(entries) - len(pending)} already done)")
+    print(f"Results: {results_path}")
+    print()
+    if not pending:
+        return True
+    
+    # Create each shared session once, only for platforms the manifest uses
+    needed = {platform for entry in pending for platform in entry['remaining']}
+    clients = Pipeline('authenticate', max_workers=3)
+    clients.add_stage('drive_auth', connect_drive)
+    if 'youtube' in needed:
+        clients.add_stage('youtube_auth', connect_youtube)
+    if 'instagram' in needed and INSTAGRAM_AVAILABLE:
+        clients.add_stage('instagram_auth', connect_instagram)
+    sessions = clients.run()
+    if runs is not None:
+        runs.append(sessions)
+    for name, error in sessions.errors.items():
+        print(f"✗ Stage '{name}' failed: {error}")
+    if not sessions.succeeded('drive_auth'):
+        return False
+    
+    def process(entry: dict) -> dict:
+        entry_args = argparse.Namespace(
+            folder=entry['folder'],
+            video=entry['video'],
+            thumbnail=entry['thumbnail'],
+            title=entry['title'],
+            description=entry['description'] or "",
+            caption=entry['caption'],
+            schedule=entry['schedule'],
+            privacy=entry['privacy'],
+            file_prefix=f"manifest_{entry['id']}",
+            allow_duplicate=args.allow_duplicate,
+            previous_uploads=entry['uploaded'],
+        )
+        # Platforms whose shared login failed are not retried for every entry
+        platforms = [
+            p for p in entry['remaining']
+            if f'{p}_auth' not in clients.stages or sessions.succeeded(f'{p}_auth')
+        ]
+        started = datetime.now()
+        try:
+            run = build_pipeline(entry_args, config, platforms).run(cached=sessions.outputs)
+            if runs is not None:
+                runs.append(run)
+            uploads = run.output('record') or {}
+            errors = {name: str(error) for name, error in run.errors.items()}
+            cleanup_run(run)
+        except Exception as e:
+            uploads, errors = {}, {'manifest': str(e)}
+        
+        ok = all(uploads.get(p) for p in entry['remaining'])
+        result = {
+            'id': entry['id'],
+            'status': 'ok' if ok else 'failed',
+            'platforms': entry['remaining'],
+            'results': uploads,
+            'errors': errors,
+            'started': started.isoformat(timespec='seconds'),
+            'finished': datetime.now().isoformat(timespec='seconds'),
+        }
+        results_log.record(result)
+        print(f"{'✓' if ok else '✗'} Manifest entry {entry['id']}: {result['status']}")
+        return result
+    
+    with ThreadPoolExecutor(max_workers=config.batch_workers, thread_name_prefix='manifest') as executor:
+        results = list(executor.map(process, pending))
+    
+    failed = [r['id'] for r in results if r['status'] != 'ok']
+    print()
+    print("="*80)
+    print(f"MANIFEST COMPLETED: {len(results) - len(failed)}/{len(results)} entries succeeded")
+    if failed:
+        print(f"Failed entries (re-run the same command to retry): {', '.join(failed)}")
+    print("="*80)
+    return not failed
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Manual video upload to Instagram and YouTube",
@@ -449,8 +822,6 @@ def main():
     parser.add_argument("--platform", choices=["youtube", "instagram", "tiktok", "all"], 
                        default="youtube", help="Which platform(s) to upload to")
     
-    # TikTok uses Buffer API by default
-    
     # Bio update options
     parser.add_argument("--update-bio", action="store_true", 
                        help="Update Instagram bio (instead of uploading video)")
@@ -458,8 +829,40 @@ def main():
     parser.add_argument("--spotify-url", help="Spotify episode URL")
     parser.add_argument("--youtube-url", help="YouTube episode URL")
     
+    parser.add_argument("--allow-duplicate", action="store_true",
+                       help="Upload even if the video looks like an earlier post to the same platform")
+    parser.add_argument("--preview", action="store_true",
+                       help="Probe the Drive video and create thumbnails without downloading or uploading it")
+    parser.add_argument("--profile-startup", action="store_true",
+                       help="Report import/initialization time per module and check the startup budget")
+    parser.add_argument("--profile", action="store_true",
+                       help="Run every pipeline stage under cProfile and write its stats next to the run log")
+    parser.add_argument("--trace", action="store_true",
+                       help="Write a Chrome trace timeline of stages and HTTP calls next to the run log")
+    
+    # Bulk mode
+    parser.add_argument("--manifest", help="JSONL or CSV file with one upload per entry (see upload_manifest.py)")
+    parser.add_argument("--results", help="Results file for --manifest (default: <manifest>.results.jsonl)")
+    
     args = parser.parse_args()
     
+    if args.profile_startup:
+        from startup_profile import profile_startup
+        sys.exit(0 if profile_startup('manual_upload') else 1)
+    
+    setup_logging('manual_upload')
+    start_profiling(profile=args.profile, trace=args.trace)
+    set_run_deadline()
+    started = time.time()
+    
+    if args.manifest:
+        runs = []
+        success = run_manifest(args, get_config(), runs)
+        log_report()
+        export_run_metrics('manual_upload', runs, success, started)
+        finish_profiling('manual_upload')
+        sys.exit(0 if success else 1)
+    
     # Validate arguments
     if args.update_bio:
         if not all([args.episode, args.spotify_url, args.youtube_url]):
@@ -474,6 +877,11 @@ def main():
         parser.print_help()
         sys.exit(1)
     
+    if args.preview:
+        success = preview_from_drive(args, get_config())
+        finish_profiling('manual_upload')
+        sys.exit(0 if success else 1)
+    
     if args.platform in ["youtube", "all"] and not args.title:
         print("Error: --title is required for YouTube uploads")
         sys.exit(1)
@@ -498,92 +906,25 @@ def main():
     
     # Initialize
     config = get_config()
-    drive_handler = GoogleDriveHandler()
+    run = build_pipeline(args, config).run()
     
-    # Download video and thumbnail
-    video_path = None
-    thumbnail_path = None
-    
-    if args.folder:
-        # Use folder link - automatically find video and cover
-        print("Downloading from folder link...")
-        video_path, thumbnail_path = download_from_folder_link(drive_handler, args.folder)
-        if not video_path:
-            print("Failed to download from folder")
-            sys.exit(1)
-    else:
-        # Download video
-        print("Downloading video...")
-        video_path = download_from_drive(drive_handler, args.video, "manual_video.mp4")
-        if not video_path:
-            print("Failed to get video file")
-            sys.exit(1)
-        
-        # Download or create thumbnail
-        if args.thumbnail:
-            print("Downloading thumbnail...")
-            thumbnail_path = download_from_drive(drive_handler, args.thumbnail, "manual_thumbnail.jpg")
-        else:
-            print("No thumbnail provided, extracting from video...")
-            thumbnail_path = ThumbnailExtractor.create_thumbnail(
-                video_path, None, config.temp_dir
-            )
-    
-    # Upload to platforms
-    success = True
-    youtube_url = None
-    instagram_url = None
-    
-    if args.platform in ["youtube", "all"]:
-        youtube_url = upload_to_youtube(args, video_path, thumbnail_path)
-        if not youtube_url:
-            success = False
-    
-    if args.platform in ["instagram", "all"]:
-        instagram_url = upload_to_instagram(args, video_path, thumbnail_path)
-        if not instagram_url:
-            success = False
-    
-    if args.platform in ["tiktok", "all"]:
-        folder_link = args.folder if args.folder else None
-        if not upload_to_tiktok(args, video_path, folder_link):
-            success = False
-    
-    # Update Google Sheet tracker if YouTube upload succeeded
-    if youtube_url and success:
-        print("\n" + "="*80)
-        print("UPDATING GOOGLE SHEET TRACKER")
-        print("="*80)
-        try:
-            import subprocess
-            cmd = [
-                sys.executable,
-                os.path.join(os.path.dirname(__file__), "update_sheet_after_post.py"),
-                youtube_url
-            ]
-            if instagram_url and instagram_url != "uploaded":
-                cmd.append(instagram_url)
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode == 0:
-                print("✓ Google Sheet updated successfully")
-                if result.stdout:
-                    print(result.stdout)
-            else:
-                print(f"⚠ Warning: Could not update Google Sheet: {result.stderr}")
-        except Exception as e:
-            print(f"⚠ Warning: Error updating Google Sheet: {e}")
-        print("="*80)
+    print()
+    for name, error in run.errors.items():
+        print(f"✗ Stage '{name}' failed: {error}")
+    print(run.timing_report())
+    log_report()
+    uploads = run.output('record') or {}
+    success = run.succeeded('fetch') and bool(uploads) and all(uploads.values())
+    export_run_metrics('manual_upload', [run], success, started)
+    finish_profiling('manual_upload')
+    
+    if not run.succeeded('fetch'):
+        print("Failed to get video file")
+        sys.exit(1)
     
     # Cleanup
     print("\nCleaning up temporary files...")
-    try:
-        if os.path.exists(video_path):
-            os.remove(video_path)
-        if thumbnail_path and os.path.exists(thumbnail_path):
-            os.remove(thumbnail_path)
-    except:
-        pass
+    cleanup_run(run)
     
     print("\n" + "="*80)
     if success:
@@ -0,0 +1,352 @@
+"""
+Media probing for MP4/MOV files without decoding or reading the whole file.
+
+Only the box (atom) headers at the top level of the file are read, by seeking
+from one box to the next, plus the contents of the 'moov' box that describes
+the tracks. That is a few kilobytes of I/O wherever the moov box is, so a file
+can be probed in milliseconds, or from Google Drive with a handful of range
+requests before anything is downloaded.
+"""
+
+import math
+import os
+import struct
+from typing import Callable, Iterator, List, Optional, Tuple
+
+
+# Sample entry formats to codec names
+CODECS = {
+    'avc1': 'h264',
+    'avc3': 'h264',
+    'hvc1': 'hevc',
+    'hev1': 'hevc',
+    'av01': 'av1',
+    'vp09': 'vp9',
+    'mp4v': 'mpeg4',
+    'mp4a': 'aac',
+    'ac-3': 'ac3',
+    'ec-3': 'eac3',
+    'Opus': 'opus',
+}
+
+# Short-form video requirements per platform
+PLATFORM_LIMITS = {
+    # YouTube Shorts: square or vertical, up to 3 minutes
+    'youtube': {'min_duration': 1, 'max_duration': 180, 'max_aspect': 1.0},
+    # Instagram Reels: 3 seconds to 15 minutes, 23-60 fps, H.264/HEVC with AAC audio
+    'instagram': {
+        'min_duration': 3, 'max_duration': 900, 'max_aspect': 1.0,
+        'min_fps': 23, 'max_fps': 60,
+        'video_codecs': ('h264', 'hevc'), 'audio_codecs': ('aac',),
+    },
+}
+
+# Largest moov box we are willing to read into memory
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+
+class MediaProbeError(Exception):
+    """Raised when a file is not a readable MP4/MOV file."""
+
+
+class TrackInfo:
+    """Properties of one track from its tkhd, mdhd, hdlr, stsd and stts boxes."""
+    
+    def __init__(self):
+        self.kind: Optional[str] = None  # 'video', 'audio' or another handler type
+        self.codec: Optional[str] = None
+        self.timescale = 0
+        self.duration = 0  # In timescale units
+        self.width = 0
+        self.height = 0
+        self.rotation = 0
+        self.sample_count = 0
+        self.channels = 0
+        self.sample_rate = 0
+    
+    @property
+    def duration_seconds(self) -> float:
+        return self.duration / self.timescale if self.timescale else 0.0
+
+
+class MediaInfo:
+    """Description of an MP4/MOV file."""
+    
+    def __init__(self, size: int, brand: Optional[str], duration: float, tracks: List[TrackInfo], faststart: bool):
+        """
+        Args:
+            size: File size in bytes
+            brand: Major brand from the ftyp box (e.g. 'isom', 'qt  ')
+            duration: Duration in seconds
+            tracks: Tracks found in the moov box
+            faststart: True if the moov box comes before the media data
+        """
+        self.size = size
+        self.brand = brand
+        self.duration = duration
+        self.tracks = tracks
+        self.faststart = faststart
+        
+        video = self.video_track
+        audio = self.audio_track
+        self.video_codec = video.codec if video else None
+        self.audio_codec = audio.codec if audio else None
+        self.rotation = video.rotation if video else 0
+        self.frame_count = video.sample_count if video else 0
+        self.fps = video.sample_count / video.duration_seconds if video and video.duration_seconds else 0.0
+        
+        # Display size, after applying the rotation in the track matrix
+        width, height = (video.width, video.height) if video else (0, 0)
+        if self.rotation in (90, 270):
+            width, height = height, width
+        self.width = width
+        self.height = height
+    
+    @property
+    def video_track(self) -> Optional[TrackInfo]:
+        return next((t for t in self.tracks if t.kind == 'video'), None)
+    
+    @property
+    def audio_track(self) -> Optional[TrackInfo]:
+        return next((t for t in self.tracks if t.kind == 'audio'), None)
+    
+    @property
+    def aspect_ratio(self) -> float:
+        """Display width divided by height (0 if there is no video)."""
+        return self.width / self.height if self.height else 0.0
+    
+    @property
+    def bitrate(self) -> int:
+        """Average bitrate in bits per second."""
+        return int(self.size * 8 / self.duration) if self.duration else 0
+    
+    def as_dict(self) -> dict:
+        """Return the descriptor as a JSON-serializable dict."""
+        audio = self.audio_track
+        return {
+            'duration': self.duration,
+            'fps': self.fps,
+            'width': self.width,
+            'height': self.height,
+            'frame_count': self.frame_count,
+            'rotation': self.rotation,
+            'video_codec': self.video_codec,
+            'audio_codec': self.audio_codec,
+            'audio_channels': audio.channels if audio else 0,
+            'audio_sample_rate': audio.sample_rate if audio else 0,
+            'bitrate': self.bitrate,
+            'size': self.size,
+            'brand': self.brand,
+            'faststart': self.faststart,
+        }
+
+
+def probe_file(path: str) -> Optional[MediaInfo]:
+    """
+    Probe a local MP4/MOV file.
+    
+    Returns:
+        MediaInfo, or None if the file is not a readable MP4/MOV file
+    """
+    try:
+        with open(path, 'rb') as f:
+            def read_at(offset: int, length: int) -> bytes:
+                f.seek(offset)
+                return f.read(length)
+            
+            return probe_reader(read_at, os.path.getsize(path))
+    except (OSError, MediaProbeError):
+        return None
+
+
+def probe_reader(read_at: Callable[[int, int], bytes], size: int) -> MediaInfo:
+    """
+    Probe an MP4/MOV file through a random-access read function.
+    
+    Args:
+        read_at: Called with (offset, length); returns up to length bytes
+        size: Total file size in bytes
+    
+    Returns:
+        MediaInfo for the file
+    
+    Raises:
+        MediaProbeError: If the file has no ftyp/moov box or is malformed
+    """
+    brand = None
+    moov = None
+    moov_offset = mdat_offset = None
+    
+    offset = 0
+    while offset + 8 <= size:
+        header = read_at(offset, 16)
+        if len(header) < 8:
+            break
+        box_size, box_type = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if box_size == 1:
+            if len(header) < 16:
+                raise MediaProbeError("Truncated 64-bit box header")
+            box_size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = size - offset  # Box extends to the end of the file
+        if box_size < header_size:
+            raise MediaProbeError(f"Invalid box size {box_size} at offset {offset}")
+        
+        name = box_type.decode('latin-1')
+        if name == 'ftyp':
+            brand = header[8:12].decode('latin-1') if header_size == 8 else None
+        elif name == 'moov':
+            if box_size > MAX_MOOV_SIZE:
+                raise MediaProbeError(f"moov box is too large ({box_size} bytes)")
+            moov_offset = offset
+            moov = read_at(offset + header_size, box_size - header_size)
+        elif name == 'mdat' and mdat_offset is None:
+            mdat_offset = offset
+        
+        if moov is not None and mdat_offset is not None:
+            break
+        offset += box_size
+    
+    if moov is None:
+        raise MediaProbeError("No moov box found")
+    
+    movie_timescale, movie_duration = 0, 0
+    tracks = []
+    try:
+        for name, start, end in _boxes(moov, 0, len(moov)):
+            if name == 'mvhd':
+                movie_timescale, movie_duration = _parse_mvhd(moov, start)
+            elif name == 'trak':
+                tracks.append(_parse_trak(moov, start, end))
+    except struct.error as e:
+        raise MediaProbeError(f"Truncated box inside moov: {e}")
+    
+    duration = movie_duration / movie_timescale if movie_timescale else 0.0
+    if not duration and tracks:
+        duration = max(t.duration_seconds for t in tracks)
+    
+    faststart = mdat_offset is None or moov_offset < mdat_offset
+    return MediaInfo(size, brand, duration, tracks, faststart)
+
+
+def check_eligibility(info: dict, platform: str) -> List[str]:
+    """
+    Check a video against a platform's short-form video requirements.
+    
+    Args:
+        info: Probe result (MediaInfo.as_dict() or ThumbnailExtractor.probe_video)
+        platform: 'youtube' (Shorts) or 'instagram' (Reels)
+    
+    Returns:
+        List of problems; empty if the video is eligible. Codec checks are
+        skipped when the probe did not report codecs.
+    """
+    limits = PLATFORM_LIMITS[platform]
+    problems = []
+    
+    duration, fps = info.get('duration') or 0.0, info.get('fps') or 0.0
+    width, height = info.get('width') or 0, info.get('height') or 0
+    video_codec, audio_codec = info.get('video_codec'), info.get('audio_codec')
+    
+    if not width or not height:
+        return ["no video track"]
+    if duration < limits['min_duration']:
+        problems.append(f"duration {duration:.1f}s is shorter than {limits['min_duration']}s")
+    if duration > limits['max_duration']:
+        problems.append(f"duration {duration:.1f}s is longer than {limits['max_duration']}s")
+    if width / height > limits['max_aspect']:
+        problems.append(f"{width}x{height} is not vertical or square")
+    if 'min_fps' in limits and fps < limits['min_fps']:
+        problems.append(f"frame rate {fps:.2f} is below {limits['min_fps']} fps")
+    if 'max_fps' in limits and fps > limits['max_fps'] + 0.5:
+        problems.append(f"frame rate {fps:.2f} is above {limits['max_fps']} fps")
+    if 'video_codecs' in limits and video_codec and video_codec not in limits['video_codecs']:
+        problems.append(f"video codec {video_codec} is not {'/'.join(limits['video_codecs'])}")
+    if 'audio_codecs' in limits and audio_codec and audio_codec not in limits['audio_codecs']:
+        problems.append(f"audio codec {audio_codec} is not {'/'.join(limits['audio_codecs'])}")
+    return problems
+
+
+def _boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[str, int, int]]:
+    """Yield (type, payload start, box end) for the boxes in data[start:end]."""
+    offset = start
+    while offset + 8 <= end:
+        box_size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header_size or offset + box_size > end:
+            raise MediaProbeError(f"Invalid box size {box_size} inside moov")
+        yield box_type.decode('latin-1'), offset + header_size, offset + box_size
+        offset += box_size
+
+
+def _find(data: bytes, start: int, end: int, *path: str) -> Optional[Tuple[int, int]]:
+    """Return (payload start, end) of the first box at a path of box types."""
+    for name, box_start, box_end in _boxes(data, start, end):
+        if name == path[0]:
+            if len(path) == 1:
+                return box_start, box_end
+            return _find(data, box_start, box_end, *path[1:])
+    return None
+
+
+def _parse_mvhd(data: bytes, start: int) -> Tuple[int, int]:
+    """Return (timescale, duration) from a mvhd box."""
+    if data[start] == 1:
+        return struct.unpack_from('>IQ', data, start + 20)
+    return struct.unpack_from('>II', data, start + 12)
+
+
+def _parse_trak(data: bytes, start: int, end: int) -> TrackInfo:
+    """Parse the boxes of one track."""
+    track = TrackInfo()
+    
+    tkhd = _find(data, start, end, 'tkhd')
+    if tkhd:
+        # Version 1 uses 64-bit times and duration
+        matrix_offset = tkhd[0] + (52 if data[tkhd[0]] == 1 else 40)
+        a, b = struct.unpack_from('>ii', data, matrix_offset)
+        track.rotation = int(round(math.degrees(math.atan2(b, a)))) % 360
+        width, height = struct.unpack_from('>II', data, matrix_offset + 36)
+        track.width, track.height = width >> 16, height >> 16
+    
+    mdhd = _find(data, start, end, 'mdia', 'mdhd')
+    if mdhd:
+        if data[mdhd[0]] == 1:
+            track.timescale, track.duration = struct.unpack_from('>IQ', data, mdhd[0] + 20)
+        else:
+            track.timescale, track.duration = struct.unpack_from('>II', data, mdhd[0] + 12)
+    
+    hdlr = _find(data, start, end, 'mdia', 'hdlr')
+    if hdlr:
+        handler = data[hdlr[0] + 8:hdlr[0] + 12].decode('latin-1')
+        track.kind = {'vide': 'video', 'soun': 'audio'}.get(handler, handler)
+    
+    stsd = _find(data, start, end, 'mdia', 'minf', 'stbl', 'stsd')
+    if stsd and struct.unpack_from('>I', data, stsd[0] + 4)[0] > 0:
+        entry = stsd[0] + 8
+        fourcc = data[entry + 4:entry + 8].decode('latin-1')
+        track.codec = CODECS.get(fourcc, fourcc)
+        if track.kind == 'video':
+            width, height = struct.unpack_from('>HH', data, entry + 32)
+            track.width = track.width or width
+            track.height = track.height or height
+        elif track.kind == 'audio':
+            track.channels = struct.unpack_from('>H', data, entry + 24)[0]
+            track.sample_rate = struct.unpack_from('>I', data, entry + 32)[0] >> 16
+    
+    stts = _find(data, start, end, 'mdia', 'minf', 'stbl', 'stts')
+    if stts:
+        entry_count = struct.unpack_from('>I', data, stts[0] + 4)[0]
+        track.sample_count = sum(
+            struct.unpack_from('>I', data, stts[0] + 8 + i * 8)[0]
+            for i in range(entry_count)
+        )
+    
+    return track
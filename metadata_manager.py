@@ -2,11 +2,15 @@
 Google Sheets metadata manager for reading video information.
 """
 
+import re
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Set
+import threading
 import gspread
 from google.oauth2 import service_account
 from config import get_config
+from rate_limiter import WRITE
+from retry_policy import SHEETS_HOST, call_with_retries
 
 
 class MetadataManager:
@@ -24,10 +28,17 @@ class MetadataManager:
     COL_SHORT_DESC_2 = 8   # I: short desc 2
     COL_FOLDER_NAME = 9    # J: Folder Name
     
+    # Days after the row date each reel is due (Tuesday reel 1, Thursday reel 2)
+    REEL_OFFSETS = {1: 0, 2: 2}
+    
+    # Status columns per platform
+    STATUS_COLUMNS = {'youtube': COL_YT_STATUS, 'instagram': COL_IG_STATUS}
+    
     def __init__(self):
         self.config = get_config()
         self.client = self._authenticate()
         self.sheet = self._open_sheet()
+        self._write_lock = threading.Lock()  # Serializes status writes from concurrent uploads
     
     def _authenticate(self):
         """Authenticate with Google Sheets API using service account."""
@@ -41,7 +52,8 @@ class MetadataManager:
     def _open_sheet(self):
         """Open the Google Sheet."""
         try:
-            return self.client.open_by_key(self.config.sheets_id).sheet1
+            return call_with_retries(SHEETS_HOST, lambda: self.client.open_by_key(self.config.sheets_id).sheet1,
+                                     "open Google Sheet")
         except Exception as e:
             raise Exception(f"Failed to open Google Sheet: {e}")
     
@@ -135,7 +147,7 @@ class MetadataManager:
         
         # Get all rows from the sheet
         try:
-            all_rows = self.sheet.get_all_values()
+            all_rows = call_with_retries(SHEETS_HOST, self.sheet.get_all_values, "read Google Sheet")
         except Exception as e:
             print(f"Error reading sheet: {e}")
             return None
@@ -157,39 +169,10 @@ class MetadataManager:
             
             if row_date and row_date.date() == lookup_date.date():
                 # Found matching row!
-                folder_name = row[self.COL_FOLDER_NAME].strip()
-                
-                if not folder_name:
-                    print(f"Warning: Row {i} has matching date but no folder name in Column J")
+                metadata = self._build_metadata(i, row, lookup_date, reel_number)
+                if not metadata:
                     continue
                 
-                # Extract metadata
-                metadata = {
-                    'row_number': i,
-                    'date': lookup_date,
-                    'reel_number': reel_number,
-                    'folder_name': folder_name,
-                    'youtube_title': row[self.COL_WHAT].strip(),
-                    'youtube_description': row[self.COL_LONG_DESC].strip(),
-                    'instagram_caption': row[self.COL_SHORT_DESC].strip(),
-                    'instagram_caption_alt': row[self.COL_SHORT_DESC_2].strip() if len(row) > self.COL_SHORT_DESC_2 else '',
-                    'youtube_status': row[self.COL_YT_STATUS].strip(),
-                    'instagram_status': row[self.COL_IG_STATUS].strip(),
-                }
-                
-                # Validate required fields
-                if not metadata['youtube_title']:
-                    print(f"Warning: Row {i} missing YouTube title (Column A)")
-                if not metadata['youtube_description']:
-                    print(f"Warning: Row {i} missing YouTube description (Column G)")
-                if not metadata['instagram_caption']:
-                    print(f"Warning: Row {i} missing Instagram caption (Column H)")
-                
-                # Apply character limits
-                metadata['youtube_title'] = self.config.validate_youtube_title(metadata['youtube_title'])
-                metadata['youtube_description'] = self.config.validate_youtube_description(metadata['youtube_description'])
-                metadata['instagram_caption'] = self.config.validate_instagram_caption(metadata['instagram_caption'])
-                
                 print(f"Found metadata in row {i}:")
                 print(f"  Folder: {metadata['folder_name']}")
                 print(f"  YouTube Title: {metadata['youtube_title']}")
@@ -200,7 +183,138 @@ class MetadataManager:
         print(f"No matching row found for date {lookup_date.strftime('%m/%d/%Y')} with type='Podcast'")
         return None
     
-    def update_status(self, row_number: int, platform: str, status: str = "UPLOADED") -> bool:
+    def find_due_videos(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        types: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Find every reel that is due between two dates (inclusive).
+        
+        A row dated D has reel 1 due on D and reel 2 due two days later,
+        matching the Tuesday/Thursday logic of find_video_metadata.
+        
+        Args:
+            start_date: First due date to include
+            end_date: Last due date to include
+            types: Row types to include (case-insensitive). All types if None.
+        
+        Returns:
+            List of metadata dictionaries, ordered by due date and row. Each
+            has 'uploaded', the platforms whose status column already marks
+            the reel as uploaded; reels uploaded everywhere are left out.
+        """
+        wanted_types = {t.strip().lower() for t in types} if types else None
+        
+        try:
+            all_rows = call_with_retries(SHEETS_HOST, self.sheet.get_all_values, "read Google Sheet")
+        except Exception as e:
+            print(f"Error reading sheet: {e}")
+            return []
+        
+        due = []
+        for i, row in enumerate(all_rows[1:], start=2):
+            if len(row) <= self.COL_FOLDER_NAME:
+                continue
+            
+            row_type = row[self.COL_TYPE].strip()
+            if wanted_types is not None and row_type.lower() not in wanted_types:
+                continue
+            
+            row_date_str = row[self.COL_DATE].strip()
+            row_date = self._parse_date(row_date_str) if row_date_str else None
+            if not row_date:
+                continue
+            
+            for reel_number, offset in self.REEL_OFFSETS.items():
+                due_date = row_date + timedelta(days=offset)
+                if start_date.date() <= due_date.date() <= end_date.date():
+                    metadata = self._build_metadata(i, row, row_date, reel_number)
+                    if not metadata:
+                        continue
+                    metadata['type'] = row_type
+                    metadata['due_date'] = due_date
+                    metadata['uploaded'] = [
+                        platform for platform in self.STATUS_COLUMNS
+                        if reel_number in self.uploaded_reels(metadata[f'{platform}_status'])
+                    ]
+                    if len(metadata['uploaded']) == len(self.STATUS_COLUMNS):
+                        print(f"Row {i} reel {reel_number} is already uploaded everywhere, skipping")
+                        continue
+                    due.append(metadata)
+        
+        due.sort(key=lambda m: (m['due_date'], m['row_number'], m['reel_number']))
+        print(f"Found {len(due)} due reel(s) between "
+              f"{start_date.strftime('%m/%d/%Y')} and {end_date.strftime('%m/%d/%Y')}")
+        return due
+    
+    def _build_metadata(self, i: int, row: list, lookup_date: datetime, reel_number: int) -> Optional[Dict]:
+        """
+        Build the metadata dictionary for one sheet row and reel.
+        
+        Args:
+            i: Sheet row number (1-indexed)
+            row: Row values
+            lookup_date: Date of the row
+            reel_number: Reel to upload from the row's folder
+        
+        Returns:
+            Dictionary with video metadata, or None if the row has no folder name
+        """
+        folder_name = row[self.COL_FOLDER_NAME].strip()
+        
+        if not folder_name:
+            print(f"Warning: Row {i} has matching date but no folder name in Column J")
+            return None
+        
+        # Extract metadata
+        metadata = {
+            'row_number': i,
+            'date': lookup_date,
+            'reel_number': reel_number,
+            'folder_name': folder_name,
+            'youtube_title': row[self.COL_WHAT].strip(),
+            'youtube_description': row[self.COL_LONG_DESC].strip(),
+            'instagram_caption': row[self.COL_SHORT_DESC].strip(),
+            'instagram_caption_alt': row[self.COL_SHORT_DESC_2].strip() if len(row) > self.COL_SHORT_DESC_2 else '',
+            'youtube_status': row[self.COL_YT_STATUS].strip(),
+            'instagram_status': row[self.COL_IG_STATUS].strip(),
+        }
+        
+        # Validate required fields
+        if not metadata['youtube_title']:
+            print(f"Warning: Row {i} missing YouTube title (Column A)")
+        if not metadata['youtube_description']:
+            print(f"Warning: Row {i} missing YouTube description (Column G)")
+        if not metadata['instagram_caption']:
+            print(f"Warning: Row {i} missing Instagram caption (Column H)")
+        
+        # Apply character limits
+        metadata['youtube_title'] = self.config.validate_youtube_title(metadata['youtube_title'])
+        metadata['youtube_description'] = self.config.validate_youtube_description(metadata['youtube_description'])
+        metadata['instagram_caption'] = self.config.validate_instagram_caption(metadata['instagram_caption'])
+        
+        return metadata
+    
+    @classmethod
+    def uploaded_reels(cls, status: str) -> Set[int]:
+        """
+        Return the reels a status cell marks as uploaded.
+        
+        Statuses name the reels, e.g. "UPLOADED (reel 1)" or "UPLOADED (reels 1, 2)".
+        A bare "UPLOADED" (written before statuses named the reel) is taken
+        to cover every reel, so those reels are never posted twice.
+        """
+        if not status or not status.strip().upper().startswith('UPLOADED'):
+            return set()
+        match = re.search(r'\(reels? ([\d,\s]+)\)', status)
+        if not match:
+            return set(cls.REEL_OFFSETS)
+        return {int(n) for n in re.findall(r'\d+', match.group(1))}
+    
+    def update_status(self, row_number: int, platform: str, status: str = "UPLOADED",
+                      reel_number: Optional[int] = None) -> bool:
         """
         Update the upload status in the sheet.
         
@@ -208,20 +322,27 @@ class MetadataManager:
             row_number: Row number to update (1-indexed)
             platform: 'youtube' or 'instagram'
             status: Status text (default: "UPLOADED")
+            reel_number: Reel that was uploaded. With "UPLOADED", the reel is
+                added to the reels the cell already lists.
         
         Returns:
             True if successful, False otherwise
         """
         try:
-            if platform.lower() == 'youtube':
-                col = self.COL_YT_STATUS + 1  # Convert to 1-indexed
-            elif platform.lower() == 'instagram':
-                col = self.COL_IG_STATUS + 1
-            else:
+            if platform.lower() not in self.STATUS_COLUMNS:
                 print(f"Unknown platform: {platform}")
                 return False
+            col = self.STATUS_COLUMNS[platform.lower()] + 1  # Convert to 1-indexed
             
-            self.sheet.update_cell(row_number, col, status)
+            with self._write_lock:
+                if status == "UPLOADED" and reel_number is not None:
+                    current = call_with_retries(SHEETS_HOST, lambda: self.sheet.cell(row_number, col).value,
+                                                "read status cell") or ''
+                    reels = sorted(self.uploaded_reels(current) | {reel_number})
+                    label = 'reel' if len(reels) == 1 else 'reels'
+                    status = f"UPLOADED ({label} {', '.join(map(str, reels))})"
+                call_with_retries(SHEETS_HOST, lambda: self.sheet.update_cell(row_number, col, status),
+                                  "update status cell", operation=WRITE)
             print(f"Updated {platform} status to '{status}' in row {row_number}")
             return True
         except Exception as e:
@@ -0,0 +1,319 @@
+"""
+Small pipeline engine for running upload workflows as a graph of stages.
+
+Each stage declares the stages it depends on. Stages whose dependencies are
+finished run in parallel on a bounded thread pool, every stage output is kept
+so it is computed only once, and each run records when every stage started
+and finished so the timing breakdown shows where wall-clock time went.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from run_log import set_stage
+from run_profile import record_span, stage_span
+
+
+# Stage states
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+CACHED = 'cached'
+FAILED = 'failed'
+TIMED_OUT = 'timed out'
+SKIPPED = 'skipped'
+
+FINISHED_STATES = (DONE, CACHED, FAILED, TIMED_OUT, SKIPPED)
+SUCCESS_STATES = (DONE, CACHED)
+
+
+class StageTimeout(Exception):
+    """Raised (as a stage error) when a stage runs longer than its timeout."""
+
+
+class Stage:
+    """A single unit of work in a pipeline."""
+    
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        depends_on: Iterable[str] = (),
+        after: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        group: Optional[str] = None
+    ):
+        """
+        Args:
+            name: Unique stage name. Downstream stages receive this stage's
+                output as a keyword argument with the same name.
+            func: Callable run with the outputs of depends_on and after stages
+            depends_on: Stages that must succeed before this one runs. If any
+                of them fails, this stage is skipped.
+            after: Stages that must finish (successfully or not) before this
+                one runs. Their output is passed as None if they failed.
+            timeout: Seconds the stage may run before it is marked timed out.
+                The stage's thread cannot be stopped and keeps running, so
+                only set timeouts on stages that are safe to abandon (not on
+                uploads or other non-idempotent work).
+            group: Optional concurrency group (see Pipeline limits)
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+        self.after = list(after)
+        self.timeout = timeout
+        self.group = group
+    
+    @property
+    def upstream(self) -> List[str]:
+        return self.depends_on + self.after
+
+
+class StageRecord:
+    """Outcome and timing of one stage in one run."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.status = PENDING
+        self.output = None
+        self.error: Optional[BaseException] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.thread: Optional[str] = None
+    
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class PipelineRun:
+    """Result of running a pipeline: outputs, errors and timings per stage."""
+    
+    def __init__(self, name: str, stage_names: Iterable[str]):
+        self.name = name
+        self.records: Dict[str, StageRecord] = {n: StageRecord(n) for n in stage_names}
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+    
+    @property
+    def wall_time(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+    
+    @property
+    def outputs(self) -> Dict[str, Any]:
+        return {n: r.output for n, r in self.records.items() if r.status in SUCCESS_STATES}
+    
+    @property
+    def errors(self) -> Dict[str, BaseException]:
+        return {n: r.error for n, r in self.records.items() if r.error is not None}
+    
+    def succeeded(self, name: str) -> bool:
+        return self.records[name].status in SUCCESS_STATES
+    
+    def output(self, name: str, default: Any = None) -> Any:
+        record = self.records[name]
+        return record.output if record.status in SUCCESS_STATES else default
+    
+    def timing_report(self) -> str:
+        """Return a table of stage start offsets and durations for this run."""
+        lines = [f"Timing breakdown for '{self.name}' (wall clock {self.wall_time:.2f}s):"]
+        lines.append(f"  {'stage':<20} {'status':<10} {'start':>8} {'duration':>9}")
+        
+        ordered = sorted(
+            self.records.values(),
+            key=lambda r: (r.started is None, r.started or 0.0, r.name)
+        )
+        busy = 0.0
+        for record in ordered:
+            start = f"{record.started - self.started:7.2f}s" if record.started is not None else "       -"
+            duration = f"{record.duration:8.2f}s" if record.started is not None else "        -"
+            lines.append(f"  {record.name:<20} {record.status:<10} {start:>8} {duration:>9}")
+            busy += record.duration
+        
+        if self.wall_time > 0:
+            lines.append(
+                f"  Total stage time {busy:.2f}s in {self.wall_time:.2f}s wall clock "
+                f"({busy / self.wall_time:.1f}x parallelism)"
+            )
+        return "\n".join(lines)
+
+
+class Pipeline:
+    """A graph of stages executed with bounded concurrency."""
+    
+    def __init__(self, name: str, max_workers: int = 4, limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            name: Pipeline name used in reports
+            max_workers: Maximum number of stages running at the same time
+            limits: Optional per-group limits, e.g. {'upload': 2}
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.limits = dict(limits or {})
+        self.stages: Dict[str, Stage] = {}
+    
+    def add_stage(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        depends_on: Iterable[str] = (),
+        after: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        group: Optional[str] = None
+    ) -> Stage:
+        """Add a stage to the pipeline. See Stage for the arguments."""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already defined")
+        stage = Stage(name, func, depends_on, after, timeout, group)
+        self.stages[name] = stage
+        return stage
+    
+    def _validate(self):
+        """Check that every dependency exists and that the graph has no cycles."""
+        for stage in self.stages.values():
+            for dep in stage.upstream:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        
+        visiting, visited = set(), set()
+        
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline '{self.name}' has a dependency cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].upstream:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+        
+        for name in self.stages:
+            visit(name)
+    
+    def run(self, cached: Optional[Dict[str, Any]] = None) -> PipelineRun:
+        """
+        Run every stage once, in dependency order, in parallel where possible.
+        
+        Args:
+            cached: Optional outputs of stages that are already done. These
+                stages are not run again and their outputs are passed on.
+        
+        Returns:
+            PipelineRun with the output, error and timing of every stage
+        """
+        self._validate()
+        run = PipelineRun(self.name, self.stages)
+        traced_from = time.perf_counter()
+        
+        for name, output in (cached or {}).items():
+            if name in run.records:
+                record = run.records[name]
+                record.status = CACHED
+                record.output = output
+        
+        running = {}  # future -> stage name
+        active_groups: Dict[str, int] = {}
+        
+        def execute(stage: Stage, kwargs: Dict[str, Any]):
+            record = run.records[stage.name]
+            record.thread = threading.current_thread().name
+            record.started = time.monotonic()
+            # Log lines printed by the stage are tagged with its name
+            set_stage(stage.name)
+            try:
+                with stage_span(self.name, stage.name):
+                    return stage.func(**kwargs)
+            finally:
+                set_stage(None)
+        
+        def finish(name: str, status: str, output: Any = None, error: Optional[BaseException] = None):
+            record = run.records[name]
+            record.status = status
+            record.output = output
+            record.error = error
+            record.finished = time.monotonic()
+            if record.started is None:
+                record.started = record.finished
+            group = self.stages[name].group
+            if group and status != SKIPPED:
+                active_groups[group] -= 1
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        try:
+            while True:
+                # Skip stages whose hard dependencies did not succeed
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for name, stage in self.stages.items():
+                        record = run.records[name]
+                        if record.status != PENDING:
+                            continue
+                        failed = [d for d in stage.depends_on
+                                  if run.records[d].status in FINISHED_STATES
+                                  and run.records[d].status not in SUCCESS_STATES]
+                        if failed:
+                            finish(name, SKIPPED)
+                            progressed = True
+                
+                # Start every stage that is ready and fits in its group limit
+                for name, stage in self.stages.items():
+                    record = run.records[name]
+                    if record.status != PENDING:
+                        continue
+                    if any(run.records[d].status not in FINISHED_STATES for d in stage.upstream):
+                        continue
+                    if stage.group and active_groups.get(stage.group, 0) >= self.limits.get(stage.group, self.max_workers):
+                        continue
+                    
+                    kwargs = {dep: run.output(dep) for dep in stage.upstream}
+                    record.status = RUNNING
+                    if stage.group:
+                        active_groups[stage.group] = active_groups.get(stage.group, 0) + 1
+                    running[executor.submit(execute, stage, kwargs)] = name
+                
+                if not running:
+                    break
+                
+                # Wait for the next stage to finish or the nearest timeout
+                now = time.monotonic()
+                deadlines = []
+                for future, name in running.items():
+                    stage, record = self.stages[name], run.records[name]
+                    if stage.timeout is not None and record.started is not None:
+                        deadlines.append(record.started + stage.timeout - now)
+                wait_for = max(0.0, min(deadlines)) if deadlines else None
+                done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        finish(name, DONE, output=future.result())
+                    except Exception as e:
+                        finish(name, FAILED, error=e)
+                
+                # Give up on stages that ran past their timeout. The worker
+                # thread cannot be interrupted, so its result is discarded.
+                now = time.monotonic()
+                for future, name in list(running.items()):
+                    stage, record = self.stages[name], run.records[name]
+                    if stage.timeout is not None and record.started is not None \
+                            and now - record.started >= stage.timeout:
+                        running.pop(future)
+                        finish(name, TIMED_OUT, error=StageTimeout(
+                            f"Stage '{name}' timed out after {stage.timeout:g}s; it may still be "
+                            f"running in the background and its result is unknown"
+                        ))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            run.finished = time.monotonic()
+            record_span(self.name, 'pipeline', traced_from, time.perf_counter())
+        
+        return run
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Prepare probes and thumbnails for a whole season ahead of time.
+
+Walks every <folder>_reels/reel_N folder on Google Drive (or every video in a
+local directory) and computes each reel's probe, Shorts/Reels eligibility and
+best-frame thumbnails in a process pool with one worker per core. Drive
+videos are not downloaded: they are probed and their frames grabbed through
+range requests (see remote_file.py). Thumbnails are stored in the artifact
+cache, where the upload pipeline picks them up, and each reel's probe and
+eligibility are recorded in an index file for review. Reels already in the
+index are skipped, so an interrupted run can simply be started again.
+
+Usage:
+    python prepare_assets.py                          # every *_reels folder on Drive
+    python prepare_assets.py --folder Episode_12      # selected episode folders
+    python prepare_assets.py --local ./exports        # videos in a local directory
+    python prepare_assets.py --workers 4 --index season.jsonl
+"""
+
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Optional
+
+from config import get_config
+from http_metrics import log_report
+from run_log import setup_logging
+from upload_manifest import ResultsLog
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.avi', '.mkv')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# Number of Drive assets opened (probed, cover downloaded) at the same time
+FETCH_WORKERS = 2
+
+
+def prepare_asset(video_path: str, cover_path: Optional[str], cache_dir: str,
+                  checksums: Optional[Dict[str, str]] = None, info: Optional[dict] = None,
+                  source_hash: Optional[str] = None) -> dict:
+    """
+    Probe a video and create its thumbnails. Runs in a worker process.
+    
+    Args:
+        video_path: Local video file, or URL of a remote one (see serve_http)
+        cover_path: Optional custom cover image
+        cache_dir: Artifact cache directory
+        checksums: Optional Drive MD5 checksums by local path, so the worker
+            does not hash downloaded files again
+        info: Probe result, if already known
+        source_hash: Content hash of a remote video for its cache key
+    
+    Returns:
+        Dict with the probe, eligibility problems per platform, thumbnail
+        paths and processing time
+    """
+    from artifact_cache import ArtifactCache
+    from media_probe import PLATFORM_LIMITS, check_eligibility
+    from storage import StorageArea
+    from thumbnail_extractor import ThumbnailExtractor
+    
+    started = time.monotonic()
+    cache = ArtifactCache(StorageArea('cache', cache_dir))
+    for path, checksum in (checksums or {}).items():
+        cache.remember_checksum(path, checksum)
+    info = info or ThumbnailExtractor.probe_video(video_path)
+    if info is None:
+        raise RuntimeError(f"Could not probe {video_path}")
+    
+    # A remote video without a checksum can't be keyed in the cache; its
+    # thumbnails are written to the system temp directory for review
+    remote = '://' in video_path
+    thumbnails = ThumbnailExtractor.create_thumbnails(
+        video_path, cover_path, tempfile.gettempdir() if remote else os.path.dirname(video_path),
+        cache if source_hash or not remote else None, info=info, source_hash=source_hash
+    )
+    return {
+        'probe': info,
+        'eligibility': {platform: check_eligibility(info, platform) for platform in PLATFORM_LIMITS},
+        'thumbnails': thumbnails,
+        'seconds': round(time.monotonic() - started, 2),
+    }
+
+
+def find_local_assets(directory: str) -> List[Dict]:
+    """
+    Find the videos in a local directory tree.
+    
+    A video's cover is an image with '_cover' in its name in the same
+    directory, starting with the video's name (or the only such image if the
+    directory holds a single video).
+    """
+    assets = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        videos = sorted(f for f in files if f.lower().endswith(VIDEO_EXTENSIONS))
+        covers = sorted(f for f in files if f.lower().endswith(IMAGE_EXTENSIONS) and '_cover' in f.lower())
+        for video in videos:
+            stem = os.path.splitext(video)[0]
+            cover = next((c for c in covers if c.startswith(stem)), None)
+            if cover is None and len(videos) == 1 and covers:
+                cover = covers[0]
+            
+            path = os.path.join(root, video)
+            stat = os.stat(path)
+            assets.append({
+                'id': f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}",
+                'label': os.path.relpath(path, directory),
+                'video_path': path,
+                'cover_path': os.path.join(root, cover) if cover else None,
+            })
+    return assets
+
+
+def find_drive_assets(drive_handler, folders: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Find the reel videos in every <folder>_reels/reel_N folder on Drive.
+    
+    Args:
+        drive_handler: GoogleDriveHandler
+        folders: Optional folder names (sheet column J) to limit the walk to
+    """
+    assets = []
+    for reels_folder in drive_handler.list_folders(name_contains='_reels'):
+        if not reels_folder['name'].endswith('_reels'):
+            continue
+        folder_name = reels_folder['name'][:-len('_reels')]
+        if folders and folder_name not in folders:
+            continue
+        
+        for reel_folder in drive_handler.list_folders(reels_folder['id'], name_contains='reel_'):
+            match = re.fullmatch(r'reel_(\d+)', reel_folder['name'])
+            if not match:
+                continue
+            label = f"{reels_folder['name']}/{reel_folder['name']}"
+            video_file = drive_handler.find_file_in_folder(reel_folder['id'])
+            if not video_file:
+                print(f"⚠ No video in {label}, skipping")
+                continue
+            
+            # The checksum makes a replaced video count as a new asset
+            assets.append({
+                'id': f"{label}:{video_file.get('md5Checksum') or video_file['id']}",
+                'label': label,
+                'folder_name': folder_name,
+                'reel_number': int(match.group(1)),
+                'video_file': video_file,
+                'cover_file': drive_handler.find_file_in_folder(reel_folder['id'], file_pattern='_cover'),
+            })
+    return assets
+
+
+def open_drive_asset(drive_handler, asset: Dict, temp_dir: str) -> Dict:
+    """
+    Make a Drive asset readable by a worker process without downloading its video.
+    
+    The video is probed through range requests and served on a local URL
+    (see remote_file.py), so frame grabs only fetch the parts of the file
+    around the sampled keyframes. The cover, a small image, is downloaded.
+    Call the returned asset's 'release' when it has been processed.
+    """
+    from media_probe import MediaProbeError, probe_reader
+    from remote_file import serve_http
+    
+    prefix = re.sub(r'[^A-Za-z0-9_-]+', '_', asset['folder_name'])
+    reel_number = asset['reel_number']
+    video_file = asset['video_file']
+    
+    with ExitStack() as stack:
+        remote = drive_handler.open_file(video_file['id'], name=video_file['name'])
+        try:
+            # Probed here so the worker doesn't fetch the moov box again
+            info = probe_reader(remote.read_at, remote.size).as_dict()
+        except MediaProbeError:
+            info = None  # Not MP4/MOV: the worker probes it over HTTP with OpenCV
+        video_url = stack.enter_context(serve_http(remote))
+        
+        cover_path = None
+        checksums = {}
+        cover_file = asset['cover_file']
+        if cover_file:
+            cover_ext = os.path.splitext(cover_file['name'])[1]
+            cover_path = os.path.join(temp_dir, f"{prefix}_cover_{reel_number}{cover_ext}")
+            if drive_handler.download_file(cover_file['id'], cover_path):
+                stack.callback(_remove, cover_path)
+                if cover_file.get('md5Checksum'):
+                    checksums[cover_path] = cover_file['md5Checksum']
+            else:
+                cover_path = None
+        
+        release = stack.pop_all().close
+    
+    checksum = video_file.get('md5Checksum')
+    return dict(asset, video_path=video_url, cover_path=cover_path, info=info, checksums=checksums,
+                source_hash=f"md5:{checksum}" if checksum else None, release=release)
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def prepare_all(
+    assets: List[Dict],
+    index: ResultsLog,
+    cache_dir: str,
+    workers: int,
+    fetch: Optional[Callable[[Dict], Dict]] = None
+) -> List[Dict]:
+    """
+    Prepare every asset in a process pool and record each result in the index.
+    
+    Args:
+        assets: Assets from find_local_assets or find_drive_assets
+        index: Index the results are appended to
+        cache_dir: Artifact cache directory
+        workers: Number of worker processes
+        fetch: Optional function making an asset readable by the workers
+            (e.g. open_drive_asset). Fetches run in threads, and at most two
+            per worker are held open at a time; an asset's 'release' is
+            called once it has been processed.
+    
+    Returns:
+        List of result records
+    """
+    results = []
+    results_lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    
+    # Spawned workers don't inherit the server and fetch threads of this process
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool, \
+            ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='fetch') as fetchers:
+        
+        def record(asset: Dict, status: str, started: float, **fields):
+            result = {
+                'id': asset['id'],
+                'label': asset['label'],
+                'status': status,
+                'prepared_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'wall_seconds': round(time.monotonic() - started, 2),
+                **fields,
+            }
+            index.record(result)
+            with results_lock:
+                results.append(result)
+            marker = '✓' if status == 'ok' else '✗'
+            print(f"{marker} [{len(results)}/{len(assets)}] {asset['label']}: {status}")
+        
+        def finished(asset: Dict, started: float, future: Future):
+            try:
+                record(asset, 'ok', started, **future.result())
+            except Exception as e:
+                record(asset, 'failed', started, error=str(e))
+            finally:
+                if asset.get('release'):
+                    asset['release']()
+                in_flight.release()
+        
+        def submit(asset: Dict):
+            started = time.monotonic()
+            in_flight.acquire()
+            try:
+                if fetch is not None:
+                    asset = fetch(asset)
+                future = pool.submit(prepare_asset, asset['video_path'], asset['cover_path'], cache_dir,
+                                     asset.get('checksums'), asset.get('info'), asset.get('source_hash'))
+            except Exception as e:
+                if asset.get('release'):
+                    asset['release']()
+                in_flight.release()
+                record(asset, 'failed', started, error=str(e))
+                return
+            future.add_done_callback(lambda f: finished(asset, started, f))
+        
+        for future in [fetchers.submit(submit, asset) for asset in assets]:
+            future.result()
+    
+    return results
+
+
+def pending_assets(assets: List[Dict], index: ResultsLog, force: bool = False) -> List[Dict]:
+    """Return the assets without a successful result in the index (all of them with force)."""
+    done = set() if force else index.completed_ids()
+    return [a for a in assets if a['id'] not in done]
+
+
+def print_summary(results: List[Dict], wall_time: float):
+    """Print the per-reel results and the overall throughput."""
+    print()
+    print("=" * 80)
+    print("ASSET SUMMARY")
+    print("=" * 80)
+    for result in sorted(results, key=lambda r: r['label']):
+        if result['status'] != 'ok':
+            print(f"✗ {result['label']}: {result.get('error')}")
+            continue
+        probe = result['probe']
+        problems = [f"{platform}: {'; '.join(p)}" for platform, p in result['eligibility'].items() if p]
+        print(f"✓ {result['label']}: {probe['width']}x{probe['height']}, {probe['duration']:.1f}s, "
+              f"{probe['fps']:.2f} fps ({result['seconds']:.1f}s)")
+        for name, path in sorted(result['thumbnails'].items()):
+            print(f"    {name:<10} {path}")
+        for problem in problems:
+            print(f"    ⚠ {problem}")
+    
+    busy = sum(r.get('seconds', 0.0) for r in results)
+    failed = sum(1 for r in results if r['status'] != 'ok')
+    print()
+    print(f"Prepared {len(results) - failed}/{len(results)} reels in {wall_time:.1f}s "
+          f"({busy:.1f}s of processing, {busy / wall_time if wall_time else 0:.1f}x parallelism)")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Prepare probes and thumbnails for every reel in advance",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument("--local", help="Local directory to scan instead of Google Drive")
+    parser.add_argument("--folder", action="append",
+                        help="Only this Drive folder name (column J); can be repeated")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: number of cores)")
+    parser.add_argument("--index", help="Index file (default: state/assets_index.jsonl)")
+    parser.add_argument("--force", action="store_true", help="Prepare reels already in the index again")
+    args = parser.parse_args()
+    
+    setup_logging('prepare_assets')
+    config = get_config()
+    index = ResultsLog(args.index or config.state_file('assets_index.jsonl'))
+    
+    if args.local:
+        assets = find_local_assets(args.local)
+        fetch = None
+    else:
+        from clients import connect_drive
+        drive = connect_drive()
+        print("Listing reel folders on Google Drive...")
+        assets = find_drive_assets(drive, args.folder)
+        fetch = lambda asset: open_drive_asset(drive, asset, config.temp_dir)
+    
+    pending = pending_assets(assets, index, args.force)
+    print(f"Found {len(assets)} reels, {len(assets) - len(pending)} already prepared")
+    if not pending:
+        return
+    
+    workers = max(1, args.workers)
+    print(f"Preparing {len(pending)} reels with {workers} worker process(es)...")
+    started = time.monotonic()
+    results = prepare_all(pending, index, config.cache.path, workers, fetch)
+    print_summary(results, time.monotonic() - started)
+    log_report()
+    print(f"Index: {index.path}")
+    
+    sys.exit(0 if all(r['status'] == 'ok' for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
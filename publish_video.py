@@ -4,6 +4,8 @@ Use this for scheduled Shorts publishing.
 """
 
 import sys
+from rate_limiter import WRITE
+from retry_policy import YOUTUBE_HOST, call_with_retries
 from youtube_uploader import YouTubeUploader
 
 
@@ -23,7 +25,7 @@ def publish_video(video_id: str) -> bool:
         uploader = YouTubeUploader()
         
         # Update video status to public
-        uploader.youtube.videos().update(
+        call_with_retries(YOUTUBE_HOST, uploader.youtube.videos().update(
             part="status",
             body={
                 "id": video_id,
@@ -32,7 +34,7 @@ def publish_video(video_id: str) -> bool:
                     "selfDeclaredMadeForKids": False
                 }
             }
-        ).execute()
+        ).execute, "publish YouTube video", operation=WRITE)
         
         print(f"✓ Video is now PUBLIC!")
         print(f"  URL: https://www.youtube.com/watch?v={video_id}")
@@ -0,0 +1,151 @@
+"""
+Process-wide pacing of Google API calls, so batch runs stay under the quotas.
+
+Every API and operation class (read or write) has a token bucket sized from
+its per-minute quota. A call takes a token first and waits while the bucket
+is empty, so concurrent reels share the quota instead of each sending as
+fast as it can, hitting 429s and backing off together.
+
+A bucket refills at RATE_LIMIT_HEADROOM (default 0.9) of the quota and holds
+the rest as burst, so even a full burst followed by a minute at the refill
+rate stays within the quota's one-minute window.
+
+Quotas are Google's defaults per user (see QUOTAS); a project with raised
+limits can override them with RATE_LIMIT_<API>_<OPERATION>, in requests per
+minute (e.g. RATE_LIMIT_SHEETS_WRITE=300). call_with_retries() takes a token
+for every attempt.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+READ = 'read'
+WRITE = 'write'
+
+# Default requests per minute per user, by API and operation class. The
+# YouTube Data API is limited by daily quota units rather than per minute;
+# its buckets only smooth bursts of upload chunks and metadata calls.
+QUOTAS: Dict[Tuple[str, str], float] = {
+    ('sheets', READ): 60,
+    ('sheets', WRITE): 60,
+    ('drive', READ): 12000,
+    ('drive', WRITE): 180,  # Drive throttles sustained writes past ~3/s
+    ('youtube', READ): 600,
+    ('youtube', WRITE): 600,
+}
+
+# Fraction of a quota used as the steady rate; the rest is burst
+RATE_LIMIT_HEADROOM = float(os.getenv('RATE_LIMIT_HEADROOM', '0.9'))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; a waiting caller reserves its token up front."""
+    
+    def __init__(self, name: str, per_minute: float, headroom: float = RATE_LIMIT_HEADROOM):
+        """
+        Args:
+            name: Bucket name for stats (e.g. 'sheets.write')
+            per_minute: Quota in requests per minute
+            headroom: Fraction of the quota used as the refill rate
+        """
+        self.name = name
+        self.rate = per_minute * headroom / 60
+        self.capacity = max(1.0, round(per_minute * (1 - headroom), 6))
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self.calls = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+    
+    def reserve(self) -> float:
+        """
+        Take a token, borrowing from the refill if the bucket is empty.
+        
+        Returns:
+            Seconds the caller has to wait before its call
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.calls += 1
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+            return wait
+    
+    def acquire(self) -> float:
+        """Wait for a token; returns the seconds waited."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                'per_minute': round(self.rate * 60, 1),
+                'calls': self.calls,
+                'waits': self.waits,
+                'wait_seconds': round(self.wait_seconds, 3),
+            }
+
+
+class RateLimiter:
+    """Token buckets per API and operation class."""
+    
+    def __init__(self, quotas: Optional[Dict[Tuple[str, str], float]] = None,
+                 headroom: float = RATE_LIMIT_HEADROOM):
+        """
+        Args:
+            quotas: Requests per minute by (api, operation) (default: QUOTAS
+                with RATE_LIMIT_<API>_<OPERATION> overrides)
+            headroom: Fraction of each quota used as the refill rate
+        """
+        if quotas is None:
+            quotas = {
+                (api, operation): float(os.getenv(f'RATE_LIMIT_{api.upper()}_{operation.upper()}', per_minute))
+                for (api, operation), per_minute in QUOTAS.items()
+            }
+        self._buckets = {
+            key: TokenBucket(f"{key[0]}.{key[1]}", per_minute, headroom)
+            for key, per_minute in quotas.items()
+        }
+    
+    def acquire(self, api: str, operation: str = READ) -> float:
+        """
+        Wait until a call is within the quota of its API and operation class.
+        
+        Args:
+            api: API name ('sheets', 'drive', 'youtube'); others are not paced
+            operation: READ or WRITE
+        
+        Returns:
+            Seconds waited
+        """
+        bucket = self._buckets.get((api, operation))
+        return bucket.acquire() if bucket is not None else 0.0
+    
+    def stats(self) -> Dict[str, dict]:
+        """Calls and waits per bucket that was used."""
+        return {bucket.name: bucket.as_dict() for bucket in self._buckets.values() if bucket.calls}
+
+
+# Singleton instance
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the process-wide rate limiter."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,240 @@
+"""
+Seekable read-only access to remote files through HTTP range reads.
+
+RemoteFile wraps a function that reads a byte range (for Google Drive, see
+GoogleDriveHandler.open_file) in a regular file object with a block cache, so
+parsers such as media_probe.py fetch only the parts of a file they look at.
+
+Decoders that run in another process (ffmpeg) cannot read a Python file
+object, so serve_http() exposes a RemoteFile on a local HTTP URL that answers
+Range requests from the same block cache. ffmpeg seeks over HTTP the same way
+it seeks in a local file, so grabbing a frame fetches the moov box and the
+GOP around the frame instead of the whole video.
+"""
+
+import io
+import re
+import socket
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List
+from urllib.parse import quote
+
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+DEFAULT_CACHE_BLOCKS = 64
+
+# Size of the chunks written to HTTP clients
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Send buffer of HTTP connections. Clients such as ffmpeg ask for the rest of
+# the file on every seek and drop the connection once they have what they
+# need; a small buffer keeps the server from fetching far ahead of the reader.
+SEND_BUFFER_SIZE = 64 * 1024
+
+
+class RemoteFile(io.RawIOBase):
+    """Read-only, seekable file over a range-read function, with an LRU block cache."""
+    
+    def __init__(
+        self,
+        read_range: Callable[[int, int], bytes],
+        size: int,
+        name: str = 'remote',
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        cache_blocks: int = DEFAULT_CACHE_BLOCKS
+    ):
+        """
+        Args:
+            read_range: Called with (offset, length); returns those bytes
+            size: File size in bytes
+            name: File name (used in URLs; keep the extension)
+            block_size: Size of the blocks fetched and cached
+            cache_blocks: Number of blocks kept in memory
+        """
+        super().__init__()
+        self._read_range = read_range
+        self.size = size
+        self.name = name
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self._blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._position = 0
+        
+        # Transfer statistics
+        self.requests = 0
+        self.bytes_fetched = 0
+    
+    def read_at(self, offset: int, length: int) -> bytes:
+        """
+        Read up to length bytes at an offset without moving the file position.
+        
+        Safe to call from several threads. Missing blocks that are next to
+        each other are fetched with a single range request.
+        """
+        if offset >= self.size or length <= 0:
+            return b''
+        end = min(offset + length, self.size)
+        first, last = offset // self.block_size, (end - 1) // self.block_size
+        
+        blocks = self._cached_blocks(first, last)
+        missing = [i for i in range(first, last + 1) if i not in blocks]
+        for run_start, run_end in _runs(missing):
+            blocks.update(self._fetch(run_start, run_end))
+        
+        data = b''.join(blocks[i] for i in range(first, last + 1))
+        start = offset - first * self.block_size
+        return data[start:start + end - offset]
+    
+    def _cached_blocks(self, first: int, last: int) -> Dict[int, bytes]:
+        """Return the cached blocks in a range, marking them recently used."""
+        blocks = {}
+        with self._lock:
+            for index in range(first, last + 1):
+                if index in self._blocks:
+                    self._blocks.move_to_end(index)
+                    blocks[index] = self._blocks[index]
+        return blocks
+    
+    def _fetch(self, first: int, last: int) -> Dict[int, bytes]:
+        """Fetch blocks first..last with one range request and cache them."""
+        offset = first * self.block_size
+        length = min((last + 1) * self.block_size, self.size) - offset
+        data = self._read_range(offset, length)
+        if len(data) < length:
+            raise IOError(f"Short read from {self.name}: {len(data)} of {length} bytes at {offset}")
+        
+        blocks = {
+            index: data[(index - first) * self.block_size:(index - first + 1) * self.block_size]
+            for index in range(first, last + 1)
+        }
+        with self._lock:
+            self.requests += 1
+            self.bytes_fetched += len(data)
+            for index, block in blocks.items():
+                self._blocks[index] = block
+                self._blocks.move_to_end(index)
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+        return blocks
+    
+    # io.RawIOBase interface
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+    
+    def readinto(self, buffer) -> int:
+        data = self.read_at(self._position, len(buffer))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+def _runs(indexes: List[int]) -> Iterator[tuple]:
+    """Yield (first, last) for every run of consecutive integers."""
+    start = previous = None
+    for index in indexes:
+        if start is None:
+            start = previous = index
+        elif index == previous + 1:
+            previous = index
+        else:
+            yield start, previous
+            start = previous = index
+    if start is not None:
+        yield start, previous
+
+
+@contextmanager
+def serve_http(remote: RemoteFile) -> Iterator[str]:
+    """
+    Serve a RemoteFile on a local HTTP URL with Range support.
+    
+    The server listens on 127.0.0.1 only and stops when the block exits.
+    
+    Yields:
+        URL of the file, e.g. http://127.0.0.1:PORT/video.mp4
+    """
+    
+    class RangeHandler(BaseHTTPRequestHandler):
+        def setup(self):
+            self.request.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
+            super().setup()
+        
+        def do_HEAD(self):
+            self._respond(send_body=False)
+        
+        def do_GET(self):
+            self._respond(send_body=True)
+        
+        def _respond(self, send_body: bool):
+            start, end = 0, remote.size - 1
+            match = re.match(r'bytes=(\d*)-(\d*)$', self.headers.get('Range', ''))
+            partial = match is not None and (match.group(1) or match.group(2))
+            if partial:
+                if match.group(1):
+                    start = int(match.group(1))
+                    if match.group(2):
+                        end = min(int(match.group(2)), remote.size - 1)
+                else:
+                    start = max(0, remote.size - int(match.group(2)))  # Last N bytes
+                if start >= remote.size or start > end:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f"bytes */{remote.size}")
+                    self.end_headers()
+                    return
+            
+            self.send_response(206 if partial else 200)
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('Content-Length', str(end - start + 1))
+            if partial:
+                self.send_header('Content-Range', f"bytes {start}-{end}/{remote.size}")
+            self.end_headers()
+            if not send_body:
+                return
+            
+            position = start
+            try:
+                while position <= end:
+                    chunk = remote.read_at(position, min(STREAM_CHUNK_SIZE, end - position + 1))
+                    if not chunk:
+                        break  # The file is shorter than its size said; the client sees a short body
+                    self.wfile.write(chunk)
+                    position += len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client seeked elsewhere and closed this connection
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    thread = threading.Thread(target=server.serve_forever, name='remote-file-http', daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/{quote(remote.name)}"
+    finally:
+        server.shutdown()
+        server.server_close()
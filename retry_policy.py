@@ -0,0 +1,287 @@
+"""
+One retry policy for the Google API calls (Drive, YouTube, Sheets).
+
+call_with_retries() runs a call and classifies what it raised:
+googleapiclient HttpErrors, gspread APIErrors and requests HTTPErrors with
+status 429, 5xx or a 403 rate-limit reason are retried, as are connection
+errors, timeouts and failed token refreshes. Other errors (404, 400, daily
+quota exceeded) are raised at once. Retries wait with exponential backoff and
+jitter, or as long as the server's Retry-After asks.
+
+Each host has a circuit breaker. After BREAKER_THRESHOLD retriable failures
+in a row the host is skipped for BREAKER_COOLDOWN seconds: calls fail at once
+with CircuitOpenError instead of every reel of a batch waiting out its own
+retries. Then one trial call decides whether the host is back.
+
+Every attempt first takes a token from the shared rate limiter
+(rate_limiter.py) for the host's API and the call's operation class, so
+concurrent reels stay under the per-minute quotas.
+
+No retry waits past the run's deadline, RUN_DEADLINE_SECONDS after
+set_run_deadline() (called by the entry points at startup) or after this
+module was imported, so a failing API cannot stretch a scheduled run
+indefinitely.
+
+Instagram uploads are not retried here: clip_upload can post the reel and
+still raise, so it stays a single attempt (see instagram_uploader.py).
+"""
+
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from rate_limiter import READ, get_rate_limiter
+
+T = TypeVar('T')
+
+
+DRIVE_HOST = 'www.googleapis.com'
+YOUTUBE_HOST = 'youtube.googleapis.com'
+SHEETS_HOST = 'sheets.googleapis.com'
+
+# API of each host, for its rate limiter buckets
+HOST_APIS = {DRIVE_HOST: 'drive', YOUTUBE_HOST: 'youtube', SHEETS_HOST: 'sheets'}
+
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '5'))
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+# Consecutive retriable failures that open a host's breaker, and how long it
+# stays open before a trial call
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+
+# Retries stop once this many seconds of the run have passed
+RUN_DEADLINE = float(os.getenv('RUN_DEADLINE_SECONDS', '3600'))
+
+RETRIABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# 403 reasons Google uses for per-minute/per-user rate limits (daily quota
+# errors use 'quotaExceeded' and are not retried)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'RATE_LIMIT_EXCEEDED')
+
+# Errors without an HTTP status that are worth retrying
+NETWORK_ERRORS = (ConnectionError, TimeoutError, socket.timeout, socket.gaierror)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open."""
+    
+    def __init__(self, host: str, retry_in: float):
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__(f"{host} failed repeatedly; not calling it for another {retry_in:.0f}s")
+
+
+def _response_of(error: BaseException) -> Tuple[Optional[int], Dict[str, str], str]:
+    """Status, lowercase headers and body of the response behind an error, if any."""
+    resp = getattr(error, 'resp', None)  # googleapiclient HttpError (httplib2.Response)
+    if resp is not None and hasattr(resp, 'status'):
+        content = getattr(error, 'content', b'') or b''
+        body = content.decode('utf-8', 'replace') if isinstance(content, bytes) else str(content)
+        return int(resp.status), {str(k).lower(): v for k, v in resp.items()}, body
+    response = getattr(error, 'response', None)  # requests HTTPError, gspread APIError
+    if response is not None and hasattr(response, 'status_code'):
+        try:
+            body = response.text
+        except Exception:
+            body = ''
+        return response.status_code, {k.lower(): v for k, v in response.headers.items()}, body
+    return None, {}, ''
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+    
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_network_error(error: BaseException) -> bool:
+    if isinstance(error, NETWORK_ERRORS):
+        return True
+    # Errors of modules that are only checked once imported (their errors
+    # cannot occur before), which keeps them out of startup
+    ssl = sys.modules.get('ssl')
+    if ssl is not None and isinstance(error, ssl.SSLError):
+        return True
+    http_client = sys.modules.get('http.client')
+    if http_client is not None and isinstance(error, http_client.HTTPException):
+        return True
+    requests = sys.modules.get('requests')
+    if requests is not None and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    httplib2 = sys.modules.get('httplib2')
+    if httplib2 is not None and isinstance(error, httplib2.ServerNotFoundError):
+        return True
+    auth_exceptions = sys.modules.get('google.auth.exceptions')
+    return auth_exceptions is not None and isinstance(error, auth_exceptions.TransportError)
+
+
+def classify_error(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Decide whether a failed call is worth retrying.
+    
+    Args:
+        error: What the call raised
+    
+    Returns:
+        Tuple of (retriable, seconds the server asked to wait or None)
+    """
+    status, headers, body = _response_of(error)
+    if status is not None:
+        retriable = status in RETRIABLE_STATUSES or (
+            status == 403 and any(reason in body for reason in RATE_LIMIT_REASONS)
+        )
+        return retriable, _parse_retry_after(headers.get('retry-after')) if retriable else None
+    return _is_network_error(error), None
+
+
+def describe_error(error: BaseException) -> str:
+    """Short description of a failed call for log lines."""
+    status = _response_of(error)[0]
+    return f"HTTP {status}" if status is not None else f"{type(error).__name__}: {error}"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one host."""
+    
+    def __init__(self, host: str, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+    
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+    
+    def before_call(self):
+        """
+        Let a call through, or raise CircuitOpenError.
+        
+        Once the cooldown has passed, a single trial call is let through;
+        the others keep failing fast until it succeeds.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpenError(self.host, max(remaining, 0.0))
+            self._trial_running = True
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            trial, self._trial_running = self._trial_running, False
+            if not trial and (self._failures < self.threshold or self._opened_at is not None):
+                return
+            self._opened_at = time.monotonic()
+            failures = self._failures
+        print(f"⚠ {self.host} failed {failures} times in a row; pausing calls to it for {self.cooldown:.0f}s")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_deadline = time.monotonic() + RUN_DEADLINE
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    """Get or create the circuit breaker of a host."""
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def set_run_deadline(seconds: Optional[float] = None):
+    """Start the run's retry deadline (default: RUN_DEADLINE_SECONDS from now)."""
+    global _deadline
+    _deadline = time.monotonic() + (RUN_DEADLINE if seconds is None else seconds)
+
+
+def time_left() -> float:
+    """Seconds until the run's retry deadline."""
+    return _deadline - time.monotonic()
+
+
+def backoff_delay(attempt: int, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with jitter before retry number attempt + 1."""
+    return min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def call_with_retries(host: str, func: Callable[[], T], description: str, attempts: Optional[int] = None,
+                      base_delay: float = RETRY_BASE_DELAY, operation: str = READ) -> T:
+    """
+    Call a Google API, retrying transient failures.
+    
+    Only wrap idempotent calls, or resumable upload steps that continue
+    where the failed attempt stopped.
+    
+    Args:
+        host: Host the call goes to (its circuit breaker is used)
+        func: The call, without arguments
+        description: What the call does, for log lines (e.g. 'list Drive folders')
+        attempts: Maximum attempts (default: RETRY_ATTEMPTS)
+        base_delay: Wait before the first retry, doubled for each further one
+        operation: Rate limiter operation class, READ or WRITE
+    
+    Returns:
+        What func returned
+    
+    Raises:
+        CircuitOpenError: If the host's breaker is open
+        Exception: What the last attempt raised, if it was not retriable,
+            attempts ran out or the next wait would pass the run deadline
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    breaker = get_breaker(host)
+    limiter = get_rate_limiter()
+    for attempt in range(attempts):
+        breaker.before_call()
+        limiter.acquire(HOST_APIS.get(host, host), operation)
+        try:
+            result = func()
+        except Exception as e:
+            retriable, retry_after = classify_error(e)
+            if not retriable:
+                breaker.record_success()  # The host answered
+                raise
+            breaker.record_failure()
+            if attempt == attempts - 1 or breaker.is_open:
+                raise
+            delay = retry_after if retry_after is not None else backoff_delay(attempt, base_delay)
+            if delay > time_left():
+                print(f"⚠ {description} failed ({describe_error(e)}); not retrying past the run deadline")
+                raise
+            print(f"⚠ {description} failed ({describe_error(e)}), retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 2}/{attempts})...")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
@@ -9,13 +9,17 @@ cd /Users/carrieliu/cinrol-video-automation
 # Create log directory if it doesn't exist
 mkdir -p logs
 
+# Correlation ID of this run; main.py writes its JSON log to logs/main_<RUN_ID>.jsonl
+export RUN_ID="${RUN_ID:-$(date +%Y%m%d_%H%M%S)_$$}"
+
 # Set log file with timestamp
-LOG_FILE="logs/automation_$(date +%Y%m%d_%H%M%S).log"
+LOG_FILE="logs/automation_${RUN_ID}.log"
 
 # Log start time
 echo "========================================" >> "$LOG_FILE"
 echo "Video Automation Started" >> "$LOG_FILE"
 echo "Date: $(date)" >> "$LOG_FILE"
+echo "Run ID: $RUN_ID" >> "$LOG_FILE"
 echo "========================================" >> "$LOG_FILE"
 
 # Run the automation script
@@ -33,7 +37,7 @@ echo "Date: $(date)" >> "$LOG_FILE"
 echo "========================================" >> "$LOG_FILE"
 
 # Keep only last 30 days of logs
-find logs -name "automation_*.log" -mtime +30 -delete
+find logs \( -name "automation_*.log" -o -name "*.jsonl" -o -name "*.pstats" -o -name "*.trace.json" \) -mtime +30 -delete
 
 exit $EXIT_CODE
 
@@ -0,0 +1,150 @@
+"""
+Checkpoint journal that lets a crashed scheduled run resume a reel.
+
+Every reel (sheet row and reel number) has a journal in the state area,
+state/journal/<folder>_row<N>_reel<M>.jsonl. It gets one line for each
+completed step of the reel's pipeline, with its output:
+
+    fetch             Downloaded video and cover paths, with the size,
+                      modification time and content hash of each file
+    thumbnail         Thumbnail paths per platform
+    upload_<platform> YouTube video ID, Instagram media ID, ...
+    sheet_<platform>  The sheet status write for the upload
+
+A rerun for the same reel returns the recorded output instead of doing the
+step again, so after a crash between the YouTube and Instagram uploads it
+neither downloads the video again nor posts it to YouTube a second time,
+and continues with the first step that had not finished. A step whose files
+are gone or changed (e.g. the scratch area was emptied) runs again.
+
+Lines are flushed to disk before the step's output is passed on (see
+upload_manifest.ResultsLog). Journals live in their own storage area inside
+state/, the only part of it with a retention policy and size cap
+(JOURNAL_RETENTION_DAYS, JOURNAL_MAX_MB).
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from run_log import run_id
+from upload_manifest import ResultsLog
+
+
+class RunJournal(ResultsLog):
+    """Completed steps of one reel, across runs."""
+    
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._steps: Optional[Dict[str, Dict]] = None
+    
+    @staticmethod
+    def name_for(metadata: Dict) -> str:
+        """Journal file name of a reel from its sheet metadata."""
+        folder = re.sub(r'[^A-Za-z0-9_-]+', '_', metadata['folder_name'])
+        return f"{folder}_row{metadata['row_number']}_reel{metadata['reel_number']}.jsonl"
+    
+    def completed(self) -> Dict[str, Dict]:
+        """Latest journal line of every completed step."""
+        with self._lock:
+            if self._steps is None:
+                self._steps = {entry['id']: entry for entry in self._results()}
+            return dict(self._steps)
+    
+    def checkpoint(self, step: str, output: Any, files: Iterable[Optional[str]] = ()):
+        """
+        Record a completed step.
+        
+        Args:
+            step: Step name (e.g. 'fetch', 'upload_youtube')
+            output: The step's output (JSON-serializable)
+            files: Local files the output refers to; a rerun only reuses
+                the output while they are unchanged
+        """
+        from artifact_cache import get_artifact_cache
+        
+        cache = get_artifact_cache()
+        entry = {
+            'id': step,
+            'output': output,
+            'files': {path: _file_state(path, cache.source_hash(path)) for path in files if path},
+            'run_id': run_id(),
+            'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        self.record(entry)
+        with self._lock:
+            if self._steps is not None:
+                self._steps[step] = entry
+    
+    def resume(self, step: str) -> Optional[Any]:
+        """
+        Output of a step completed by an earlier run, or None.
+        
+        Files of the step must still be as they were recorded. Their
+        content hashes are handed to the artifact cache, so renditions and
+        thumbnails of the downloaded video are found without hashing it.
+        """
+        entry = self.completed().get(step)
+        if entry is None:
+            return None
+        for path, recorded in entry.get('files', {}).items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            if (stat.st_size, stat.st_mtime_ns) != (recorded['size'], recorded['mtime_ns']):
+                return None
+        
+        from artifact_cache import get_artifact_cache
+        cache = get_artifact_cache()
+        for path, recorded in entry.get('files', {}).items():
+            cache.remember_hash(path, recorded['hash'])
+        return entry['output']
+    
+    def step(self, step: str, func: Callable[[], Any],
+             files: Callable[[Any], Iterable[Optional[str]]] = lambda output: ()) -> Any:
+        """
+        Run a step unless an earlier run completed it.
+        
+        Args:
+            step: Step name
+            func: Does the step; a falsy result means it failed and is not recorded
+            files: Local files of the step's output (see checkpoint())
+        
+        Returns:
+            The recorded output, or what func returned
+        """
+        output = self.resume(step)
+        if output is not None:
+            entry = self.completed()[step]
+            print(f"✓ {step} already done by run {entry.get('run_id')} at {entry.get('finished')}, skipping")
+            return output
+        
+        output = func()
+        if output:
+            self.checkpoint(step, output, files(output))
+        return output
+
+
+def _file_state(path: str, content_hash: str) -> Dict:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash}
+
+
+# One journal object per reel, so its steps are appended under one lock
+_journals: Dict[str, RunJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(metadata: Dict) -> RunJournal:
+    """Get or open the journal of a reel from its sheet metadata."""
+    from config import get_config
+    
+    name = RunJournal.name_for(metadata)
+    with _journals_lock:
+        journal = _journals.get(name)
+        if journal is None:
+            journal = _journals[name] = RunJournal(get_config().journal.path_for(name))
+        return journal
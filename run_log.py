@@ -0,0 +1,262 @@
+"""
+Leveled logging for automation runs.
+
+Every run has a correlation ID: RUN_ID from the environment (set by
+run_automation.sh and the GitHub workflows) or a new one. setup_logging()
+sends print() output through the 'cinrol' logger, so the modules keep
+printing as before while each line gets a level (✗/❌/Error lines are errors,
+⚠/Warning lines are warnings). The console shows lines at LOG_LEVEL and up,
+unchanged, and logs/<script>_<run id>.jsonl gets one JSON record per line with
+its time, level, thread and pipeline stage.
+
+Chunked transfers report through Progress, which emits a line when the
+percentage crosses a step or some seconds have passed, not for every chunk.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+
+LOGGER_NAME = 'cinrol'
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+
+# Progress is reported every PROGRESS_STEP percent, or after PROGRESS_INTERVAL
+# seconds if that comes first
+PROGRESS_STEP = 25
+PROGRESS_INTERVAL = 15.0
+
+# Printed lines starting with these markers get the matching level
+ERROR_MARKERS = ('✗', '❌', 'Error', 'ERROR', 'CRITICAL')
+WARNING_MARKERS = ('⚠', 'Warning', 'WARNING')
+
+_context = threading.local()
+_run_id: Optional[str] = None
+_log_path: Optional[str] = None
+_original_stdout = None
+_handlers = []
+
+
+def run_id() -> str:
+    """Correlation ID of this run (RUN_ID, or generated on first use)."""
+    global _run_id
+    if _run_id is None:
+        _run_id = os.getenv('RUN_ID') or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        # Subprocesses (e.g. update_sheet_after_post.py) log under the same ID
+        os.environ['RUN_ID'] = _run_id
+    return _run_id
+
+
+def log_path() -> Optional[str]:
+    """JSON log file of this run, once setup_logging() was called."""
+    return _log_path
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module, under the run's 'cinrol' logger."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def set_stage(stage: Optional[str]):
+    """Tag records logged by the calling thread with a pipeline stage."""
+    _context.stage = stage
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the run ID and pipeline stage."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'run_id': _run_id,
+            'logger': record.name,
+            'thread': record.threadName,
+            'stage': getattr(record, 'stage', None),
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _StageFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.stage = getattr(_context, 'stage', None)
+        return True
+
+
+class _PrintStream:
+    """
+    Stands in for sys.stdout and logs each printed line.
+    
+    Lines are buffered per thread, so output of stages printing at the same
+    time is not interleaved within a line.
+    """
+    
+    def __init__(self, logger: logging.Logger, original):
+        self._logger = logger
+        self._original = original
+        self._buffers: Dict[int, str] = {}
+        self._lock = threading.Lock()
+    
+    def write(self, text: str) -> int:
+        thread = threading.get_ident()
+        with self._lock:
+            buffered = self._buffers.pop(thread, '') + text
+            *lines, rest = buffered.split('\n')
+            if rest:
+                self._buffers[thread] = rest
+        for line in lines:
+            self._emit(line)
+        return len(text)
+    
+    def _emit(self, line: str):
+        stripped = line.lstrip()
+        if stripped.startswith(ERROR_MARKERS):
+            level = logging.ERROR
+        elif stripped.startswith(WARNING_MARKERS):
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        self._logger.log(level, line)
+    
+    def flush(self):
+        self._original.flush()
+    
+    def close_buffers(self):
+        """Log lines left without a newline."""
+        with self._lock:
+            rest, self._buffers = list(self._buffers.values()), {}
+        for line in rest:
+            self._emit(line)
+    
+    def isatty(self) -> bool:
+        return self._original.isatty()
+    
+    def fileno(self) -> int:
+        return self._original.fileno()
+    
+    @property
+    def encoding(self) -> str:
+        return self._original.encoding
+
+
+def setup_logging(script: str, level: Optional[str] = None, log_dir: Optional[str] = None) -> str:
+    """
+    Start logging a run: console at LOG_LEVEL, everything to a JSON file.
+    
+    Args:
+        script: Name used in the log file name (e.g. 'main')
+        level: Console level (default: LOG_LEVEL or INFO)
+        log_dir: Directory for the JSON log (default: LOG_DIR or logs/)
+    
+    Returns:
+        Path of the JSON log file
+    """
+    global _log_path, _original_stdout
+    if _log_path:
+        return _log_path
+    
+    level_name = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    console_level = getattr(logging, level_name, logging.INFO)
+    log_dir = log_dir or LOG_DIR
+    os.makedirs(log_dir, exist_ok=True)
+    _log_path = os.path.join(log_dir, f"{script}_{run_id()}.jsonl")
+    
+    _original_stdout = sys.stdout
+    console = logging.StreamHandler(_original_stdout)
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    json_file = logging.FileHandler(_log_path, encoding='utf-8')
+    json_file.setLevel(min(console_level, logging.INFO))
+    json_file.setFormatter(JsonFormatter())
+    
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(min(console_level, logging.INFO))
+    logger.propagate = False
+    for handler in (console, json_file):
+        handler.addFilter(_StageFilter())
+        logger.addHandler(handler)
+        _handlers.append(handler)
+    
+    sys.stdout = _PrintStream(get_logger('print'), _original_stdout)
+    get_logger('run').info(f"Run ID: {run_id()} (log: {_log_path})", extra={'fields': {'script': script}})
+    return _log_path
+
+
+def shutdown_logging():
+    """Restore stdout and close the run's log file."""
+    global _log_path, _original_stdout
+    if isinstance(sys.stdout, _PrintStream):
+        sys.stdout.close_buffers()
+        sys.stdout = _original_stdout
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in _handlers:
+        logger.removeHandler(handler)
+        handler.close()
+    _handlers.clear()
+    _log_path = None
+    _original_stdout = None
+
+
+class Progress:
+    """Rate-limited progress reporting for a chunked transfer."""
+    
+    def __init__(self, label: str, total: Optional[int] = None, step: float = PROGRESS_STEP,
+                 interval: float = PROGRESS_INTERVAL, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            label: Start of each progress line (e.g. 'Download progress')
+            total: Total bytes, if known
+            step: Report every time this many more percent are done
+            interval: Report at least this often (seconds) while progressing
+            logger: Logger to report to
+        """
+        self.label = label
+        self.total = total
+        self.step = step
+        self.interval = interval
+        self.logger = logger or get_logger('progress')
+        self._started = time.monotonic()
+        self._last_time = self._started
+        self._last_percent = 0.0
+        self._finished = False
+    
+    def update(self, done: int, total: Optional[int] = None, detail: str = ""):
+        """
+        Record progress, reporting it if a threshold was crossed.
+        
+        Args:
+            done: Bytes done so far
+            total: Total bytes, if it became known
+            detail: Extra text for the line (e.g. '3/5 chunks')
+        """
+        if total:
+            self.total = total
+        if self._finished or not self.total:
+            return
+        now = time.monotonic()
+        percent = min(100.0, done * 100.0 / self.total)
+        finished = done >= self.total
+        if not finished and percent - self._last_percent < self.step and now - self._last_time < self.interval:
+            return
+        
+        self._last_time, self._last_percent, self._finished = now, percent, finished
+        elapsed = now - self._started
+        rate = done / elapsed / 1024 / 1024 if elapsed > 0 else 0.0
+        text = f"{self.label}: {int(percent)}% ({done / 1024 / 1024:.1f} of {self.total / 1024 / 1024:.1f} MB"
+        text += f", {rate:.1f} MB/s" + (f", {detail}" if detail else "") + ")"
+        if not _handlers:
+            print(text)  # Logging not set up (e.g. a module used on its own)
+            return
+        self.logger.info(text, extra={'fields': {
+            'progress': self.label, 'done_bytes': done, 'total_bytes': self.total, 'mb_per_s': round(rate, 2),
+        }})
@@ -0,0 +1,221 @@
+"""
+Run metrics for scheduled runs, as a Prometheus textfile and a JSONL history.
+
+At the end of a run the orchestrator collects stage durations from its
+pipeline runs, per-platform upload results from their 'record' stage, and
+HTTP calls, bytes, retries and upload throughput per API from http_metrics,
+and time spent waiting for the rate limiter per quota bucket. YouTube quota
+units are estimated from the calls made.
+
+The metrics replace METRICS_DIR/cinrol_<script>.prom atomically, for the node
+exporter's textfile collector, and are appended to METRICS_DIR/history.jsonl
+so latency and throughput can be charted across runs without a running
+service. All values describe the last run, so every metric is a gauge.
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from http_metrics import get_http_metrics
+from rate_limiter import get_rate_limiter
+from run_log import run_id
+from storage import atomic_write_text
+
+
+METRICS_DIR = os.getenv('METRICS_DIR', 'metrics')
+HISTORY_FILE = 'history.jsonl'
+
+# API of an endpoint, by host and path prefix (first match wins)
+API_PREFIXES = (
+    ('www.googleapis.com/upload/drive/', 'drive'),
+    ('www.googleapis.com/drive/', 'drive'),
+    ('sheets.googleapis.com/', 'sheets'),
+    ('www.googleapis.com/upload/youtube/', 'youtube'),
+    ('www.googleapis.com/youtube/', 'youtube'),
+    ('youtube.googleapis.com/', 'youtube'),
+    ('oauth2.googleapis.com/', 'google_auth'),
+    ('i.instagram.com/', 'instagram'),
+    ('www.instagram.com/', 'instagram'),
+    ('open.tiktokapis.com/', 'tiktok'),
+    ('open-upload.tiktokapis.com/', 'tiktok'),
+)
+
+# YouTube Data API quota cost of each call, by method and path prefix (any
+# other YouTube call costs 1 unit; resumable upload chunks are free)
+YOUTUBE_QUOTA = (
+    ('POST', '/upload/youtube/v3/videos', 1600),
+    ('PUT', '/upload/youtube/v3/videos', 0),
+    ('POST', '/upload/youtube/v3/thumbnails/set', 50),
+    ('PUT', '/youtube/v3/videos', 50),
+    ('POST', '/youtube/v3/playlistItems', 50),
+)
+
+
+def api_of(endpoint: str) -> str:
+    """API name of an http_metrics endpoint ('GET host/path')."""
+    location = endpoint.split(' ', 1)[-1]
+    for prefix, api in API_PREFIXES:
+        if location.startswith(prefix):
+            return api
+    return 'other'
+
+
+def youtube_quota(endpoint: str, calls: int) -> int:
+    """Estimated YouTube quota units used by calls to an endpoint."""
+    method, location = endpoint.split(' ', 1)
+    path = location[location.find('/'):]
+    for quota_method, prefix, units in YOUTUBE_QUOTA:
+        if method == quota_method and path.startswith(prefix):
+            return units * calls
+    return calls
+
+
+def collect(script: str, runs: Iterable, success: bool, started: float) -> dict:
+    """
+    Gather the metrics of a finished run.
+    
+    Args:
+        script: Entry point name (e.g. 'main')
+        runs: PipelineRuns of the run (one per reel in batch mode)
+        success: Whether the run as a whole succeeded
+        started: time.time() when the run started
+    
+    Returns:
+        Metrics as a JSON-serializable dictionary
+    """
+    stages: Dict[str, float] = {}
+    uploads: Dict[Tuple[str, str], int] = {}
+    for run in runs:
+        for name, record in run.records.items():
+            if record.started is not None:
+                stages[name] = stages.get(name, 0.0) + record.duration
+        for platform, result in (run.output('record') or {}).items():
+            key = (platform, 'ok' if result else 'failed')
+            uploads[key] = uploads.get(key, 0) + 1
+    
+    apis: Dict[str, dict] = {}
+    for endpoint, stats in get_http_metrics().snapshot().items():
+        api = apis.setdefault(api_of(endpoint), {
+            'requests': 0, 'errors': 0, 'retries': 0, 'bytes_in': 0, 'bytes_out': 0,
+            'seconds': 0.0, 'upload_bytes': 0, 'upload_seconds': 0.0, 'quota_units': 0,
+        })
+        for key in ('errors', 'retries', 'bytes_in', 'bytes_out', 'seconds'):
+            api[key] += stats[key]
+        api['requests'] += stats['calls']
+        if stats['bytes_out']:
+            api['upload_bytes'] += stats['bytes_out']
+            api['upload_seconds'] += stats['seconds']
+        if api_of(endpoint) == 'youtube':
+            api['quota_units'] += youtube_quota(endpoint, stats['calls'])
+    
+    for api in apis.values():
+        api['upload_bytes_per_second'] = (
+            round(api['upload_bytes'] / api['upload_seconds']) if api['upload_seconds'] > 0 else 0
+        )
+        del api['upload_seconds']
+        api['seconds'] = round(api['seconds'], 3)
+    
+    return {
+        'run_id': run_id(),
+        'script': script,
+        'timestamp': round(time.time(), 3),
+        'duration_seconds': round(time.time() - started, 3),
+        'success': bool(success),
+        'stages': {name: round(seconds, 3) for name, seconds in sorted(stages.items())},
+        'uploads': [{'platform': p, 'result': r, 'count': n} for (p, r), n in sorted(uploads.items())],
+        'apis': dict(sorted(apis.items())),
+        'rate_limits': get_rate_limiter().stats(),
+    }
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def to_prometheus(metrics: dict) -> str:
+    """Render collected metrics in the Prometheus text exposition format."""
+    script = metrics['script']
+    families: List[Tuple[str, str, List[Tuple[str, float]]]] = [
+        ('cinrol_last_run_timestamp_seconds', "When the last run finished (Unix time).",
+         [(_labels(script=script), metrics['timestamp'])]),
+        ('cinrol_last_run_success', "1 if the last run succeeded, 0 if it failed.",
+         [(_labels(script=script), int(metrics['success']))]),
+        ('cinrol_last_run_duration_seconds', "Wall-clock duration of the last run.",
+         [(_labels(script=script), metrics['duration_seconds'])]),
+        ('cinrol_last_run_stage_duration_seconds', "Time spent in each pipeline stage (summed over reels).",
+         [(_labels(script=script, stage=stage), seconds) for stage, seconds in metrics['stages'].items()]),
+        ('cinrol_last_run_uploads', "Uploads in the last run per platform and result.",
+         [(_labels(script=script, platform=u['platform'], result=u['result']), u['count'])
+          for u in metrics['uploads']]),
+    ]
+    per_api = (
+        ('cinrol_last_run_http_requests', 'requests', "HTTP requests per API."),
+        ('cinrol_last_run_http_errors', 'errors', "HTTP requests per API that failed (429, 5xx or no response)."),
+        ('cinrol_last_run_http_retries', 'retries', "HTTP requests per API that repeated a failed request."),
+        ('cinrol_last_run_http_seconds', 'seconds', "Time spent in HTTP requests per API."),
+        ('cinrol_last_run_upload_throughput_bytes_per_second', 'upload_bytes_per_second',
+         "Bytes sent per second of request time per API."),
+        ('cinrol_last_run_quota_units', 'quota_units', "Estimated API quota units used (YouTube Data API)."),
+    )
+    for name, key, help_text in per_api:
+        families.append((name, help_text, [(_labels(script=script, api=api), values[key])
+                                           for api, values in metrics['apis'].items()]))
+    families.append(('cinrol_last_run_http_bytes', "Bytes transferred per API and direction.", [
+        (_labels(script=script, api=api, direction=direction), values[f'bytes_{direction}'])
+        for api, values in metrics['apis'].items() for direction in ('in', 'out')
+    ]))
+    rate_limits = metrics.get('rate_limits', {})
+    for name, key, help_text in (
+        ('cinrol_last_run_rate_limit_waits', 'waits', "Calls per quota bucket that waited for the rate limiter."),
+        ('cinrol_last_run_rate_limit_wait_seconds', 'wait_seconds', "Time spent waiting for the rate limiter."),
+    ):
+        families.append((name, help_text, [(_labels(script=script, bucket=bucket), values[key])
+                                           for bucket, values in rate_limits.items()]))
+    
+    lines = []
+    for name, help_text, samples in families:
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{labels} {_number(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def export_run_metrics(script: str, runs: Iterable, success: bool, started: float,
+                       metrics_dir: Optional[str] = None) -> Optional[dict]:
+    """
+    Write the metrics of a finished run to the textfile and the history.
+    
+    Exporting never fails the run: errors are reported as warnings.
+    
+    Args:
+        script: Entry point name (e.g. 'main')
+        runs: PipelineRuns of the run
+        success: Whether the run as a whole succeeded
+        started: time.time() when the run started
+        metrics_dir: Output directory (default: METRICS_DIR or metrics/)
+    
+    Returns:
+        The exported metrics, or None if exporting failed
+    """
+    metrics_dir = metrics_dir or METRICS_DIR
+    try:
+        metrics = collect(script, runs, success, started)
+        os.makedirs(metrics_dir, exist_ok=True)
+        atomic_write_text(os.path.join(metrics_dir, f"cinrol_{script}.prom"), to_prometheus(metrics))
+        with open(os.path.join(metrics_dir, HISTORY_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(metrics) + '\n')
+    except Exception as e:
+        print(f"⚠ Warning: Could not export run metrics: {e}")
+        return None
+    print(f"Run metrics written to {metrics_dir}")
+    return metrics
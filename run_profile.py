@@ -0,0 +1,235 @@
+"""
+Opt-in profiling and tracing of a run (--profile and --trace).
+
+With --profile every pipeline stage runs under cProfile. The stats of each
+stage, merged over every reel of the run, are written to
+logs/<script>_<run id>_<stage>.pstats next to the run log, and the functions
+with the most time of their own are printed at the end of the run, so the
+time of a slow stage can be told apart as OpenCV, PIL, instagrapi or socket
+reads (network waits).
+
+With --trace every pipeline run, stage and HTTP call is recorded as a span on
+the thread it ran on, and logs/<script>_<run id>.trace.json gets them in the
+Chrome trace event format, which chrome://tracing, Perfetto and speedscope
+open as a timeline per thread.
+
+Both are off unless start_profiling() is called; stages and HTTP calls then
+only check a module attribute.
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from typing import Dict, List, Optional
+
+from run_log import LOG_DIR, log_path, run_id
+
+
+# Functions listed per stage in the profile report
+TOP_FUNCTIONS = 8
+
+
+def _function_label(func: tuple) -> str:
+    """'package/module.py:line(name)' for a pstats function key."""
+    filename, line, name = func
+    if filename == '~':
+        return name  # Built-in function, e.g. {method 'recv_into' of '_ssl._SSLSocket' objects}
+    for marker in ('site-packages' + os.sep, 'dist-packages' + os.sep):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{line}({name})"
+
+
+class RunProfiler:
+    """cProfile stats per stage and trace spans of one run."""
+    
+    def __init__(self, profile: bool = True, trace: bool = True):
+        """
+        Args:
+            profile: Run every stage under cProfile
+            trace: Record spans for the trace timeline
+        """
+        self.profile = profile
+        self.trace = trace
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, List[cProfile.Profile]] = {}
+        self._unprofiled: Dict[str, int] = {}
+        self._spans: List[dict] = []
+        self._threads: Dict[int, str] = {}
+        self._origin = time.perf_counter()
+    
+    def add_span(self, name: str, category: str, start: float, end: float, args: Optional[dict] = None):
+        """
+        Record a span that ran on the calling thread.
+        
+        Args:
+            name: Span name (stage name, HTTP endpoint, ...)
+            category: 'pipeline', 'stage' or 'http'
+            start: time.perf_counter() when it started
+            end: time.perf_counter() when it ended
+            args: Details shown with the span
+        """
+        if not self.trace:
+            return
+        thread = threading.current_thread()
+        span = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'pid': os.getpid(),
+            'tid': thread.ident,
+            'ts': round((start - self._origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+        }
+        if args:
+            span['args'] = args
+        with self._lock:
+            self._threads[thread.ident] = thread.name
+            self._spans.append(span)
+    
+    @contextlib.contextmanager
+    def stage(self, pipeline: str, name: str):
+        """Profile and trace one stage of a pipeline run on the calling thread."""
+        profiler = None
+        if self.profile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process, so a
+                # stage that starts while another is profiled runs without
+                profiler = None
+                with self._lock:
+                    self._unprofiled[name] = self._unprofiled.get(name, 0) + 1
+        
+        status = 'done'
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            status = 'failed'
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    self._profiles.setdefault(name, []).append(profiler)
+            self.add_span(name, 'stage', started, time.perf_counter(), {'pipeline': pipeline, 'status': status})
+    
+    def stage_stats(self) -> Dict[str, pstats.Stats]:
+        """cProfile stats per stage, merged over every run of the stage."""
+        with self._lock:
+            profiles = {name: list(items) for name, items in self._profiles.items()}
+        return {name: pstats.Stats(*items) for name, items in sorted(profiles.items())}
+    
+    def report(self, stats: Dict[str, pstats.Stats]) -> str:
+        """Return the functions with the most own time per stage."""
+        lines = ["Profile (own time per function, by stage):"]
+        for name, stage in sorted(stats.items(), key=lambda item: -item[1].total_tt):
+            lines.append(f"  {name}: {stage.total_tt:.2f}s in {stage.total_calls} calls")
+            top = sorted(stage.stats.items(), key=lambda item: -item[1][2])[:TOP_FUNCTIONS]
+            for func, (_, calls, own, cumulative, _) in top:
+                lines.append(f"    {own:7.3f}s {cumulative:7.3f}s cum {calls:>8}  {_function_label(func)}")
+        if self._unprofiled:
+            skipped = ', '.join(f"{name} x{count}" for name, count in sorted(self._unprofiled.items()))
+            lines.append(f"  ⚠ Not profiled while another stage was (one profiler at a time): {skipped}. "
+                         f"Run with PIPELINE_WORKERS=1 and BATCH_WORKERS=1 to profile every stage.")
+        return "\n".join(lines)
+    
+    def trace_events(self) -> dict:
+        """Spans and thread names in the Chrome trace event format."""
+        with self._lock:
+            spans = list(self._spans)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f"run {run_id()}"}}]
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                      for tid, name in threads.items())
+        return {'traceEvents': events + sorted(spans, key=lambda span: span['ts']), 'displayTimeUnit': 'ms'}
+    
+    def write(self, script: str, log_dir: Optional[str] = None) -> List[str]:
+        """
+        Write the stage stats and the trace next to the run log and print
+        the profile report.
+        
+        Args:
+            script: Entry point name used in the file names (e.g. 'main')
+            log_dir: Directory (default: the run log's, or LOG_DIR)
+        
+        Returns:
+            Paths of the written files
+        """
+        log_dir = log_dir or (os.path.dirname(log_path()) if log_path() else LOG_DIR)
+        os.makedirs(log_dir, exist_ok=True)
+        base = os.path.join(log_dir, f"{script}_{run_id()}")
+        written = []
+        
+        if self.profile:
+            stats = self.stage_stats()
+            for name, stage in stats.items():
+                path = f"{base}_{name}.pstats"
+                stage.dump_stats(path)
+                written.append(path)
+            print(self.report(stats))
+        
+        if self.trace:
+            path = f"{base}.trace.json"
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.trace_events(), f)
+            written.append(path)
+        return written
+
+
+_profiler: Optional[RunProfiler] = None
+
+
+def start_profiling(profile: bool = False, trace: bool = False) -> Optional[RunProfiler]:
+    """Start profiling and/or tracing the stages of this run."""
+    global _profiler
+    if profile or trace:
+        _profiler = RunProfiler(profile=profile, trace=trace)
+    return _profiler
+
+
+def stage_span(pipeline: str, name: str):
+    """Context manager around a stage: profiles and traces it if enabled."""
+    profiler = _profiler
+    return profiler.stage(pipeline, name) if profiler is not None else contextlib.nullcontext()
+
+
+def record_span(name: str, category: str, start: float, end: float, args: Optional[dict] = None):
+    """Add a span to the trace, if tracing is enabled (times from time.perf_counter())."""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.add_span(name, category, start, end, args)
+
+
+def finish_profiling(script: str) -> List[str]:
+    """
+    Write the profile and trace of this run, if enabled. Never fails the run.
+    
+    Args:
+        script: Entry point name (e.g. 'main')
+    
+    Returns:
+        Paths of the written files
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return []
+    try:
+        written = profiler.write(script)
+    except Exception as e:
+        print(f"⚠ Warning: Could not write the profile/trace: {e}")
+        return []
+    for path in written:
+        print(f"Profile output: {path}")
+    return written
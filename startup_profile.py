@@ -0,0 +1,159 @@
+"""
+Startup profiling for the command line entry points.
+
+`python main.py --profile-startup` (or manual_upload.py) imports the entry
+point and every module its stages load on demand, each in a fresh
+interpreter with `-X importtime`, and reports how long each one takes to
+import and which dependencies dominate. It doubles as a regression check:
+it fails if the entry point imports a heavy platform or media library at
+startup or takes longer than the startup budget.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# Libraries that must only be imported by the stage that needs them
+HEAVY_MODULES = (
+    'cv2',
+    'numpy',
+    'PIL',
+    'instagrapi',
+    'googleapiclient',
+    'gspread',
+    'google_auth_oauthlib',
+)
+
+# Modules loaded on demand by pipeline stages
+STAGE_MODULES = (
+    'metadata_manager',
+    'google_drive_handler',
+    'youtube_uploader',
+    'instagram_uploader',
+    'tiktok_uploader',
+    'thumbnail_extractor',
+)
+
+DEFAULT_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '500'))
+
+
+def measure_import(module: str, cwd: Optional[str] = None) -> Tuple[float, Dict[str, float], Optional[str]]:
+    """
+    Import a module in a fresh interpreter and record import times.
+    
+    Args:
+        module: Module name to import
+        cwd: Directory to run in (default: this file's directory)
+    
+    Returns:
+        Tuple of (wall-clock milliseconds, {imported module: cumulative ms},
+        error message or None)
+    """
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd,
+        capture_output=True,
+        text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    
+    # Lines look like: "import time:       self [us] |  cumulative | imported package"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line.split(':', 1)[1].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            cumulative[fields[2].strip()] = int(fields[1]) / 1000
+        except ValueError:
+            continue
+    
+    error = None
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed'
+    return wall_ms, cumulative, error
+
+
+def heavy_imports(cumulative: Dict[str, float]) -> List[str]:
+    """Return the heavy top-level packages present in an import-time report."""
+    return sorted(name for name in cumulative if name in HEAVY_MODULES)
+
+
+def profile_startup(entry_module: str, budget_ms: float = DEFAULT_BUDGET_MS) -> bool:
+    """
+    Print an import and initialization profile for an entry point.
+    
+    Args:
+        entry_module: Entry point module name (e.g. 'main')
+        budget_ms: Maximum allowed import time of the entry point
+    
+    Returns:
+        True if the entry point stays within budget and imports no heavy
+        library at startup
+    """
+    print("=" * 80)
+    print(f"STARTUP PROFILE: {entry_module}.py")
+    print("=" * 80)
+    
+    ok = True
+    entry_wall, entry_imports, error = measure_import(entry_module)
+    entry_ms = entry_imports.get(entry_module, 0.0)
+    
+    if error:
+        print(f"✗ Could not import {entry_module}: {error}")
+        return False
+    
+    print(f"Entry point import: {entry_ms:.1f} ms (interpreter + import: {entry_wall:.0f} ms)")
+    
+    # Measure config initialization on its own: it runs before every stage
+    config_started = time.perf_counter()
+    init = subprocess.run(
+        [sys.executable, '-c', 'from config import get_config; get_config()'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    config_ms = (time.perf_counter() - config_started) * 1000
+    if init.returncode == 0:
+        print(f"Configuration load (fresh interpreter): {config_ms:.0f} ms")
+    else:
+        print("Configuration load: skipped (environment variables not set)")
+    
+    print()
+    print(f"  {'module':<24} {'import':>10}   heaviest dependencies")
+    for module in STAGE_MODULES:
+        _, imports, error = measure_import(module)
+        if error:
+            print(f"  {module:<24} {'n/a':>10}   {error}")
+            continue
+        deps = sorted(
+            ((name, ms) for name, ms in imports.items() if name != module and '.' not in name),
+            key=lambda item: item[1],
+            reverse=True
+        )[:3]
+        deps_text = ", ".join(f"{name} {ms:.0f} ms" for name, ms in deps)
+        print(f"  {module:<24} {imports.get(module, 0.0):>7.1f} ms   {deps_text}")
+    print()
+    
+    heavy = heavy_imports(entry_imports)
+    if heavy:
+        ok = False
+        print(f"✗ {entry_module}.py imports heavy libraries at startup: {', '.join(heavy)}")
+        print("  Import them inside the stage that needs them instead.")
+    else:
+        print("✓ No heavy libraries imported at startup")
+    
+    if entry_ms > budget_ms:
+        ok = False
+        print(f"✗ Startup import took {entry_ms:.1f} ms, budget is {budget_ms:.0f} ms")
+    else:
+        print(f"✓ Startup import within budget ({entry_ms:.1f} ms <= {budget_ms:.0f} ms)")
+    
+    return ok
@@ -0,0 +1,171 @@
+"""
+Local storage areas and atomic file writes.
+
+Files written by the automation fall into three areas with different
+lifetimes:
+
+    state    Login state and indexes that must survive between runs
+             (YouTube token, Instagram session, fingerprint index). Never
+             cleared or evicted by cleanup.
+    cache    Derived data that is expensive to recompute (thumbnails,
+             probes, renditions). Kept between runs, bounded by size.
+    scratch  Per-run working files (downloads, lock files). Cleared after
+             every run.
+
+The cache and scratch areas have their own retention policy (maximum file age)
+and size cap. When an area is over its cap, the least recently used files are
+evicted first.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """
+    Write a file atomically.
+    
+    The data is written to a temporary file in the same directory, flushed
+    to disk and renamed over the destination, so readers (and concurrent
+    writers) see either the old file or the complete new one.
+    """
+    with atomic_writer(path, 'wb') as f:
+        f.write(data)
+
+
+def atomic_write_text(path: str, text: str, encoding: str = 'utf-8'):
+    """Write a text file atomically. See atomic_write_bytes."""
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+@contextmanager
+def atomic_writer(path: str, mode: str = 'wb'):
+    """
+    Context manager yielding a file object that replaces `path` on success.
+    
+    If the block raises, the temporary file is removed and `path` is left
+    untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class StorageArea:
+    """A directory with a retention policy and an LRU-evicted size cap."""
+    
+    def __init__(self, name: str, path: str, max_bytes: Optional[int] = None, max_age_days: Optional[float] = None):
+        """
+        Args:
+            name: Area name used in log messages
+            path: Directory path (created if missing)
+            max_bytes: Size cap; least recently used files are evicted above it
+            max_age_days: Files not used for longer than this are removed
+        """
+        self.name = name
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+    
+    def path_for(self, *parts: str) -> str:
+        """Return a path inside the area, creating parent directories."""
+        path = os.path.join(self.path, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+    
+    @staticmethod
+    def touch(path: str):
+        """Mark a file as recently used so LRU eviction keeps it longer."""
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+    
+    def _files(self) -> List[Tuple[float, int, str]]:
+        """Return (last used, size, path) for every file in the area."""
+        files = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed by another worker meanwhile
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+    
+    def size(self) -> int:
+        """Total size of the files in the area, in bytes."""
+        return sum(size for _, size, _ in self._files())
+    
+    def enforce(self) -> int:
+        """
+        Apply the retention policy and size cap.
+        
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        with self._lock:
+            files = sorted(self._files())
+            now = time.time()
+            
+            if self.max_age_days is not None:
+                cutoff = now - self.max_age_days * 86400
+                expired = [f for f in files if f[0] < cutoff]
+                files = [f for f in files if f[0] >= cutoff]
+                for _, _, path in expired:
+                    removed += self._remove(path)
+            
+            if self.max_bytes is not None:
+                total = sum(size for _, size, _ in files)
+                # Oldest first: evict least recently used until under the cap
+                for _, size, path in files:
+                    if total <= self.max_bytes:
+                        break
+                    if self._remove(path):
+                        removed += 1
+                        total -= size
+        
+        if removed:
+            print(f"Removed {removed} file(s) from {self.name} ({self.path})")
+        return removed
+    
+    def clear(self) -> int:
+        """
+        Remove every file in the area.
+        
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        with self._lock:
+            for _, _, path in self._files():
+                removed += self._remove(path)
+        return removed
+    
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
@@ -0,0 +1,23 @@
+"""
+Shared test setup: make the modules at the repository root importable and
+provide a Config for tests that need one.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """A Config with placeholder credentials and its storage areas under tmp_path."""
+    from config import Config
+    
+    for name in ('GOOGLE_SHEETS_ID', 'DRIVE_FOLDER_ID', 'GOOGLE_DRIVE_CREDENTIALS', 'YOUTUBE_CLIENT_SECRETS',
+                 'INSTAGRAM_USERNAME', 'INSTAGRAM_PASSWORD'):
+        monkeypatch.setenv(name, 'test')
+    monkeypatch.setenv('AUTOMATION_HOME', str(tmp_path / 'home'))
+    return Config()
@@ -0,0 +1,137 @@
+"""
+Tests for the content-addressed artifact cache (artifact_cache.py).
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from artifact_cache import ArtifactCache
+from storage import StorageArea
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ArtifactCache(StorageArea('cache', str(tmp_path / 'cache'), max_bytes=1000))
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'video data')
+    return str(path)
+
+
+def age(path, seconds):
+    used = time.time() - seconds
+    os.utime(path, (used, used))
+
+
+def test_hit_returns_the_stored_bytes_without_producing(cache, source):
+    produced = []
+    
+    def produce():
+        produced.append(1)
+        return b'thumbnail'
+    
+    first = cache.get_or_create(source, 'thumbnail', {'width': 1280}, produce, '.jpg')
+    second = cache.get_or_create(source, 'thumbnail', {'width': 1280}, produce, '.jpg')
+    
+    assert first == second and first.endswith('.jpg')
+    assert os.path.dirname(first).startswith(cache.area.path)
+    with open(second, 'rb') as f:
+        assert f.read() == b'thumbnail'
+    assert produced == [1]
+
+
+def test_changed_params_or_operation_miss(cache, source):
+    key = cache.key(source, 'thumbnail', {'width': 1280, 'quality': 90})
+    
+    # Parameter order does not matter, values and the operation do
+    assert cache.key(source, 'thumbnail', {'quality': 90, 'width': 1280}) == key
+    assert cache.key(source, 'thumbnail', {'width': 720, 'quality': 90}) != key
+    assert cache.key(source, 'rendition', {'width': 1280, 'quality': 90}) != key
+    
+    cache.put_bytes(key, b'data', '.jpg')
+    assert cache.lookup(cache.key(source, 'thumbnail', {'width': 720, 'quality': 90}), '.jpg') is None
+
+
+def test_changed_source_misses_and_a_copy_hits(cache, source, tmp_path):
+    key = cache.key(source, 'thumbnail')
+    cache.put_bytes(key, b'data')
+    copy = tmp_path / 'downloaded again.mp4'
+    copy.write_bytes(b'video data')
+    
+    assert cache.lookup(cache.key(str(copy), 'thumbnail')) is not None
+    
+    with open(source, 'wb') as f:
+        f.write(b'edited video')
+    assert cache.key(source, 'thumbnail') != key
+
+
+def test_source_hash_is_computed_once_per_file_version(cache, source, monkeypatch):
+    reads = []
+    real_open = open
+    
+    def counting_open(path, *args, **kwargs):
+        if path == source:
+            reads.append(path)
+        return real_open(path, *args, **kwargs)
+    
+    monkeypatch.setattr('builtins.open', counting_open)
+    threads = [threading.Thread(target=cache.source_hash, args=(source,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.source_hash(source) == cache.source_hash(source)
+    assert len(reads) == 1
+    
+    # A new modification time is a new version of the file
+    age(source, 60)
+    cache.source_hash(source)
+    assert len(reads) == 2
+
+
+def test_remembered_checksum_replaces_hashing(cache, source):
+    cache.remember_checksum(source, 'abc123')
+    
+    assert cache.source_hash(source) == 'md5:abc123'
+    cache.remember_checksum(source, None)
+    assert cache.source_hash(source) == 'md5:abc123'
+
+
+def test_hit_marks_the_entry_recently_used(cache, source):
+    key = cache.key(source, 'thumbnail')
+    path = cache.put_bytes(key, b'data')
+    age(path, 3600)
+    
+    cache.lookup(key)
+    
+    assert time.time() - os.path.getmtime(path) < 60
+
+
+def test_eviction_goes_through_the_cache_area(cache, source):
+    used = cache.put_bytes(cache.key(source, 'used'), b'x' * 400)
+    old = cache.put_bytes(cache.key(source, 'old'), b'x' * 400)
+    new = cache.put_bytes(cache.key(source, 'new'), b'x' * 300)
+    age(used, 7200)
+    age(old, 3600)
+    cache.lookup(cache.key(source, 'used'))  # A hit makes the oldest entry the most recently used
+    
+    assert cache.area.enforce() == 1
+    
+    assert not os.path.exists(old)
+    assert os.path.exists(used) and os.path.exists(new)
+    assert cache.lookup(cache.key(source, 'old')) is None
+
+
+def test_json_results_round_trip(cache, source):
+    assert cache.get_json(source, 'probe') is None
+    
+    cache.put_json(source, 'probe', None, {'duration': 12.5})
+    
+    assert cache.get_json(source, 'probe') == {'duration': 12.5}
+    assert cache.get_json(source, 'probe', {'version': 2}) is None
@@ -0,0 +1,137 @@
+"""
+Tests for perceptual fingerprints and the repost index (fingerprint_index.py).
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import fingerprint_index
+from fingerprint_index import (
+    DuplicateVideoError, FingerprintIndex, dhash_frames, upload_once
+)
+
+
+def scene(seed, width=320, height=180):
+    """A frame of smooth random shapes, different for every seed."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def clip(first_seed, frames=16):
+    return [scene(first_seed + i) for i in range(frames)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return FingerprintIndex(str(tmp_path / 'fingerprints.jsonl'))
+
+
+def test_dhash_survives_resizing_and_recompression():
+    frame = scene(1)
+    resized = cv2.resize(frame, (1280, 720), interpolation=cv2.INTER_LINEAR)
+    _, jpeg = cv2.imencode('.jpg', resized, [cv2.IMWRITE_JPEG_QUALITY, 40])
+    recompressed = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+    
+    original, copy = dhash_frames([frame, recompressed])
+    other = dhash_frames([scene(2)])[0]
+    
+    assert bin(int(original ^ copy)).count('1') <= 6
+    assert bin(int(original ^ other)).count('1') > 16
+
+
+def test_dhash_of_no_frames_is_empty():
+    assert dhash_frames([]).shape == (0,)
+
+
+def test_same_clip_matches_and_other_clips_do_not(index):
+    index.add(dhash_frames(clip(100)), 'youtube', 'vid1', 'episode 1 reel_1')
+    index.add(dhash_frames(clip(200)), 'youtube', 'vid2', 'episode 1 reel_2')
+    
+    matches = index.find_matches(dhash_frames(clip(100)), 'youtube')
+    
+    assert [m['post_id'] for m in matches] == ['vid1']
+    assert matches[0]['similarity'] == 1.0
+    assert index.find_matches(dhash_frames(clip(300)), 'youtube') == []
+
+
+def test_trimmed_and_reordered_copy_still_matches(index):
+    index.add(dhash_frames(clip(100)), 'youtube', 'vid1')
+    
+    trimmed = clip(100)[2:14]
+    assert index.find_matches(dhash_frames(trimmed[::-1]), 'youtube')
+
+
+def test_matches_are_per_platform(index):
+    index.add(dhash_frames(clip(100)), 'youtube', 'vid1')
+    
+    assert index.find_matches(dhash_frames(clip(100)), 'instagram') == []
+    assert index.find_matches(dhash_frames(clip(100)))
+
+
+def test_too_few_frames_are_never_a_match(index):
+    index.add(dhash_frames(clip(100)), 'youtube', 'vid1')
+    
+    assert index.find_matches(dhash_frames(clip(100, frames=2)), 'youtube') == []
+
+
+def test_index_is_reloaded_from_disk(tmp_path, index):
+    index.add(dhash_frames(clip(100)), 'youtube', 'vid1', 'label')
+    with open(index.path, 'a', encoding='utf-8') as f:
+        f.write('{"platform": "youtube", "hash')  # Interrupted write
+    
+    reloaded = FingerprintIndex(index.path)
+    
+    assert len(reloaded) == 1
+    assert reloaded.find_matches(dhash_frames(clip(100)), 'youtube')[0]['label'] == 'label'
+
+
+def test_check_not_posted_raises_for_a_repost(index):
+    index.add(dhash_frames(clip(100)), 'youtube', 'vid1', 'episode 1 reel_1')
+    
+    with pytest.raises(DuplicateVideoError, match='episode 1 reel_1'):
+        index.check_not_posted(dhash_frames(clip(100)), 'youtube')
+    index.check_not_posted(dhash_frames(clip(100)), 'instagram')
+    index.check_not_posted(None, 'youtube')  # Fingerprinting failed: not checked
+
+
+def test_upload_once_records_successful_uploads(monkeypatch, index):
+    monkeypatch.setattr(fingerprint_index, '_index', index)
+    video = dhash_frames(clip(100))
+    calls = []
+    
+    assert upload_once(video, 'youtube', lambda: calls.append(1) or 'vid1') == 'vid1'
+    with pytest.raises(DuplicateVideoError):
+        upload_once(video, 'youtube', lambda: calls.append(2) or 'vid2')
+    assert upload_once(video, 'youtube', lambda: calls.append(3) or 'vid3', allow_duplicate=True) == 'vid3'
+    
+    assert calls == [1, 3]
+    assert len(index) == 2
+
+
+def test_failed_upload_is_not_recorded(monkeypatch, index):
+    monkeypatch.setattr(fingerprint_index, '_index', index)
+    
+    assert upload_once(dhash_frames(clip(100)), 'youtube', lambda: None) is None
+    assert len(index) == 0
+
+
+def test_old_uploads_are_remembered_after_cleanup(config, monkeypatch):
+    import config as config_module
+    import main
+    
+    monkeypatch.setattr(config_module, '_config', config)
+    monkeypatch.setattr(fingerprint_index, '_index', None)
+    fingerprint_index.get_fingerprint_index().add(dhash_frames(clip(100)), 'youtube', 'vid1')
+    path = config.state_file('fingerprints.jsonl')
+    posted_long_ago = time.time() - 400 * 86400
+    os.utime(path, (posted_long_ago, posted_long_ago))
+    
+    main.cleanup_temp_files(config)
+    monkeypatch.setattr(fingerprint_index, '_index', None)
+    
+    assert fingerprint_index.get_fingerprint_index().find_matches(dhash_frames(clip(100)), 'youtube')
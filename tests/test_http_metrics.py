@@ -0,0 +1,138 @@
+"""
+Tests for HTTP call metrics (http_metrics.py), against a local server.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_metrics
+from http_metrics import HttpMetrics, endpoint_name, get_http_metrics
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+    
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        status = 503 if '/flaky/' in self.path and not self.server.flaky_ok.pop() else 200
+        body = b'x' * 1000
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    do_GET = do_PUT = do_POST = _reply
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.flaky_ok = [True, False]  # Popped from the end: fail, then succeed
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    # Undo the transport patches after each test
+    from requests.adapters import HTTPAdapter
+    monkeypatch.setattr(HTTPAdapter, 'send', HTTPAdapter.send)
+    try:
+        import httplib2
+        monkeypatch.setattr(httplib2.Http, 'request', httplib2.Http.request)
+    except ImportError:
+        pass
+    http_metrics.install()
+    metrics = get_http_metrics()
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+def test_endpoint_names_group_ids():
+    assert endpoint_name('get', 'https://www.googleapis.com/drive/v3/files/1AbCdEfGhIjKlMnOpQrStUv12?alt=media') \
+        == 'GET www.googleapis.com/drive/v3/files/{id}'
+    assert endpoint_name('POST', 'https://i.instagram.com/api/v1/media/3123456789012345678_123/info/') \
+        == 'POST i.instagram.com/api/v1/media/{id}/info/'
+    assert endpoint_name('GET', 'https://sheets.googleapis.com/v4/spreadsheets/abc/values/A1:Z') \
+        == 'GET sheets.googleapis.com/v4/spreadsheets/abc/values/A1:Z'
+
+
+def test_record_counts_calls_statuses_and_retries():
+    metrics = HttpMetrics()
+    metrics.record('GET', 'https://api/x/1', 503, 0.2)
+    metrics.record('GET', 'https://api/x/2', 200, 0.3, bytes_in=100)
+    metrics.record('GET', 'https://api/x/3', 200, 7.0, bytes_in=50)
+    metrics.record('PUT', 'https://api/y', None, 1.0, bytes_out=10, error='ConnectionError')
+    
+    stats = metrics.snapshot()
+    get = stats['GET api/x/{id}']
+    assert (get['calls'], get['errors'], get['retries']) == (3, 1, 1)
+    assert get['statuses'] == {503: 1, 200: 2}
+    assert get['bytes_in'] == 150
+    assert get['latency_buckets']['0.25'] == 1 and get['latency_buckets']['10.0'] == 1
+    assert stats['PUT api/y']['statuses'] == {'ConnectionError': 1}
+    assert metrics.totals()['calls'] == 4
+
+
+def test_requests_calls_are_recorded(metrics, server):
+    import requests
+    
+    session = requests.Session()
+    session.put(f"{server}/upload/1234567890", data=b'y' * 300)
+    session.get(f"{server}/flaky/a")
+    session.get(f"{server}/flaky/a")
+    
+    stats = metrics.snapshot()
+    upload = stats['PUT 127.0.0.1/upload/{id}']
+    assert (upload['calls'], upload['bytes_out'], upload['bytes_in']) == (1, 300, 1000)
+    flaky = stats['GET 127.0.0.1/flaky/a']
+    assert (flaky['calls'], flaky['errors'], flaky['retries']) == (2, 1, 1)
+    assert flaky['statuses'] == {503: 1, 200: 1}
+
+
+def test_httplib2_calls_are_recorded(metrics, server):
+    httplib2 = pytest.importorskip('httplib2')
+    
+    response, content = httplib2.Http().request(f"{server}/drive/v3/files/42", 'POST', body=b'z' * 20)
+    
+    assert response.status == 200 and len(content) == 1000
+    stats = metrics.snapshot()['POST 127.0.0.1/drive/v3/files/{id}']
+    assert (stats['calls'], stats['bytes_out'], stats['bytes_in']) == (1, 20, 1000)
+
+
+def test_failed_connections_are_recorded(metrics):
+    import requests
+    
+    with pytest.raises(requests.ConnectionError):
+        requests.get("http://127.0.0.1:9/unreachable", timeout=2)
+    
+    stats = metrics.snapshot()['GET 127.0.0.1/unreachable']
+    assert stats['errors'] == 1
+    assert stats['statuses'] == {'ConnectionError': 1}
+
+
+def test_install_is_idempotent(metrics, server):
+    import requests
+    
+    http_metrics.install()
+    requests.get(f"{server}/once")
+    
+    assert metrics.snapshot()['GET 127.0.0.1/once']['calls'] == 1
+
+
+def test_report_lists_every_endpoint():
+    metrics = HttpMetrics()
+    assert metrics.report() == "HTTP calls: none recorded"
+    metrics.record('GET', 'https://api/x', 200, 0.1, bytes_in=2 * 1024 * 1024)
+    
+    report = metrics.report()
+    assert report.startswith("HTTP calls (1 calls to 1 endpoints, 2.0 MB in")
+    assert 'GET api/x' in report and '200x1' in report
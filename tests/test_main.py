@@ -0,0 +1,128 @@
+"""
+Tests for the scheduled upload pipeline and batch options (main.py).
+"""
+
+import threading
+
+import pytest
+
+import config as config_module
+import fingerprint_index
+import main
+import run_journal
+import thumbnail_extractor
+import transcoder
+
+
+REEL = {
+    'row_number': 5, 'reel_number': 1, 'folder_name': 'Episode 12',
+    'youtube_title': 'Title', 'youtube_description': 'Description', 'instagram_caption': 'Caption',
+}
+
+
+class FakeSheets:
+    def __init__(self):
+        self.statuses = []
+    
+    def find_video_metadata(self):
+        return dict(REEL)
+    
+    def update_status(self, row_number, platform, status, reel_number):
+        self.statuses.append((row_number, platform, status, reel_number))
+        return True
+
+
+class FakeDrive:
+    def __init__(self, video_path, downloading):
+        self.video_path = video_path
+        self.downloading = downloading
+    
+    def get_video_and_cover(self, folder_name, reel_number):
+        self.downloading.set()
+        return self.video_path, None
+
+
+@pytest.fixture
+def setup(config, tmp_path, monkeypatch):
+    """Fake clients and media steps around the real pipeline of main.py."""
+    monkeypatch.setattr(config_module, '_config', config)
+    monkeypatch.setattr(run_journal, '_journals', {})
+    monkeypatch.setattr(fingerprint_index, '_index', None)
+    config.faststart_remux = False
+    
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'video data')
+    monkeypatch.setattr(thumbnail_extractor.ThumbnailExtractor, 'probe_video', staticmethod(lambda path: None))
+    monkeypatch.setattr(thumbnail_extractor.ThumbnailExtractor, 'create_thumbnails',
+                        staticmethod(lambda video_path, cover_path, temp_dir, cache=None: {}))
+    monkeypatch.setattr(transcoder, 'create_renditions',
+                        lambda path, platforms, temp_dir, cache=None, info=None: {p: path for p in platforms})
+    monkeypatch.setattr(fingerprint_index, 'compute_fingerprint', lambda path, info=None: None)
+    
+    downloading = threading.Event()
+    sheets = FakeSheets()
+    monkeypatch.setitem(main.CLIENTS, 'sheets', lambda: sheets)
+    monkeypatch.setitem(main.CLIENTS, 'drive_auth', lambda: FakeDrive(str(video), downloading))
+    monkeypatch.setitem(main.CLIENTS, 'youtube_auth', lambda: 'youtube client')
+    monkeypatch.setitem(main.CLIENTS, 'instagram_auth', lambda: 'instagram client')
+    return {'sheets': sheets, 'downloading': downloading}
+
+
+def test_uploads_run_concurrently(setup, config, monkeypatch):
+    both_uploading = threading.Barrier(2, timeout=5)
+    
+    def upload(post_id):
+        def run(client, metadata, video_path, thumbnail_path):
+            both_uploading.wait()  # Times out unless the other upload runs at the same time
+            return post_id
+        return run
+    
+    monkeypatch.setitem(main.UPLOADERS, 'youtube', upload('vid1'))
+    monkeypatch.setitem(main.UPLOADERS, 'instagram', upload('media1'))
+    
+    run = main.build_pipeline(config).run()
+    
+    assert run.output('record') == {'youtube': 'vid1', 'instagram': 'media1'}
+    assert sorted(setup['sheets'].statuses) == [(5, 'instagram', 'UPLOADED', 1), (5, 'youtube', 'UPLOADED', 1)]
+
+
+def test_authentication_overlaps_the_download(setup, config, monkeypatch):
+    def slow_login():
+        # Only finishes once the download has started, so it cannot run first
+        assert setup['downloading'].wait(5)
+        return 'youtube client'
+    
+    monkeypatch.setitem(main.CLIENTS, 'youtube_auth', slow_login)
+    monkeypatch.setitem(main.UPLOADERS, 'youtube', lambda client, *args: f'vid from {client}')
+    monkeypatch.setitem(main.UPLOADERS, 'instagram', lambda client, *args: None)
+    
+    run = main.build_pipeline(config, ['youtube', 'instagram']).run()
+    
+    assert run.output('record') == {'youtube': 'vid from youtube client', 'instagram': None}
+    assert [status[1] for status in setup['sheets'].statuses] == ['youtube']
+
+
+def test_failed_upload_is_not_recorded_and_rerun_skips_the_other(setup, config, monkeypatch):
+    calls = []
+    
+    def upload(platform, result):
+        def run(*args):
+            calls.append(platform)
+            return result
+        return run
+    
+    monkeypatch.setitem(main.UPLOADERS, 'youtube', upload('youtube', 'vid1'))
+    monkeypatch.setitem(main.UPLOADERS, 'instagram', upload('instagram', None))
+    main.build_pipeline(config).run()
+    
+    monkeypatch.setitem(main.UPLOADERS, 'instagram', upload('instagram', 'media1'))
+    run = main.build_pipeline(config).run()
+    
+    assert run.output('record') == {'youtube': 'vid1', 'instagram': 'media1'}
+    assert sorted(calls) == ['instagram', 'instagram', 'youtube']
+
+
+def test_batch_types_are_stripped():
+    args = main.parse_args(['--batch', '--types', ' Podcast, Clip ,,'])
+    
+    assert args.types == ['Podcast', 'Clip']
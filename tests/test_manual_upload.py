@@ -0,0 +1,65 @@
+"""
+Tests for resuming manifest uploads (manual_upload.py).
+"""
+
+import argparse
+import json
+
+import pytest
+
+import config as config_module
+import fingerprint_index
+import manual_upload
+import thumbnail_extractor
+import transcoder
+from upload_manifest import ResultsLog
+
+
+@pytest.fixture
+def manifest(config, tmp_path, monkeypatch):
+    """A youtube+tiktok manifest entry whose YouTube upload an earlier run completed."""
+    monkeypatch.setattr(config_module, '_config', config)
+    monkeypatch.setattr(fingerprint_index, '_index', None)
+    config.faststart_remux = False
+    
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'video data')
+    monkeypatch.setattr(manual_upload, 'connect_drive', lambda: 'drive client')
+    monkeypatch.setattr(manual_upload, 'connect_youtube', lambda: 'youtube client')
+    monkeypatch.setattr(manual_upload, 'download_from_drive', lambda drive, path, name: str(video))
+    monkeypatch.setattr(thumbnail_extractor.ThumbnailExtractor, 'probe_video', staticmethod(lambda path: None))
+    monkeypatch.setattr(thumbnail_extractor.ThumbnailExtractor, 'create_thumbnails',
+                        staticmethod(lambda video_path, cover_path, temp_dir, cache=None: {}))
+    monkeypatch.setattr(transcoder, 'create_renditions',
+                        lambda path, platforms, temp_dir, cache=None, info=None: {p: path for p in platforms})
+    monkeypatch.setattr(fingerprint_index, 'compute_fingerprint', lambda path, info=None: None)
+    
+    path = tmp_path / 'manifest.jsonl'
+    path.write_text(json.dumps({'id': 'ep1', 'video': 'drive://reels/ep1.mp4', 'title': 'Episode 1',
+                                'caption': 'Caption', 'platforms': 'youtube,tiktok'}) + '\n', encoding='utf-8')
+    results = tmp_path / 'results.jsonl'
+    ResultsLog(str(results)).record({'id': 'ep1', 'status': 'failed', 'platforms': ['youtube', 'tiktok'],
+                                     'results': {'youtube': 'https://youtu.be/1', 'tiktok': None}})
+    return argparse.Namespace(manifest=str(path), results=str(results), allow_duplicate=False)
+
+
+def test_resumed_entry_updates_the_tracker_once_every_platform_is_done(manifest, config, monkeypatch):
+    uploaded, tracked = [], []
+    monkeypatch.setattr(manual_upload, 'upload_to_youtube', lambda *args, **kwargs: uploaded.append('youtube'))
+    monkeypatch.setattr(manual_upload, 'upload_to_tiktok', lambda args, path: uploaded.append('tiktok') or 'posted')
+    monkeypatch.setattr(manual_upload, 'update_sheet_tracker', lambda *urls: tracked.append(urls))
+    
+    assert manual_upload.run_manifest(manifest, config)
+    
+    assert uploaded == ['tiktok']
+    assert tracked == [('https://youtu.be/1', None)]
+
+
+def test_tracker_waits_while_a_platform_is_still_missing(manifest, config, monkeypatch):
+    tracked = []
+    monkeypatch.setattr(manual_upload, 'upload_to_tiktok', lambda args, path: None)
+    monkeypatch.setattr(manual_upload, 'update_sheet_tracker', lambda *urls: tracked.append(urls))
+    
+    assert not manual_upload.run_manifest(manifest, config)
+    
+    assert tracked == []
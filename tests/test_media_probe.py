@@ -0,0 +1,176 @@
+"""
+Tests for the MP4/MOV box parser (media_probe.py), on files built box by box.
+"""
+
+import struct
+
+import pytest
+
+from media_probe import MediaProbeError, check_eligibility, probe_file, probe_reader
+
+
+def box(name, *payload):
+    data = b''.join(payload)
+    return struct.pack('>I4s', 8 + len(data), name.encode('latin-1')) + data
+
+
+def full_box(name, version, *payload):
+    return box(name, struct.pack('>B3x', version), *payload)
+
+
+def mvhd(timescale, duration, version=0):
+    if version == 1:
+        return full_box('mvhd', 1, struct.pack('>QQIQ', 0, 0, timescale, duration), bytes(80))
+    return full_box('mvhd', 0, struct.pack('>IIII', 0, 0, timescale, duration), bytes(80))
+
+
+def tkhd(width, height, rotation=0, version=0):
+    cos, sin = {0: (1, 0), 90: (0, 1), 180: (-1, 0), 270: (0, -1)}[rotation]
+    matrix = struct.pack('>9i', cos << 16, sin << 16, 0, -sin << 16, cos << 16, 0, 0, 0, 1 << 30)
+    if version == 1:
+        times = struct.pack('>QQI4xQ', 0, 0, 1, 0)
+    else:
+        times = struct.pack('>III4xI', 0, 0, 1, 0)
+    return full_box('tkhd', version, times, bytes(16), matrix, struct.pack('>II', width << 16, height << 16))
+
+
+def mdhd(timescale, duration, version=0):
+    if version == 1:
+        return full_box('mdhd', 1, struct.pack('>QQIQ', 0, 0, timescale, duration), bytes(4))
+    return full_box('mdhd', 0, struct.pack('>IIII', 0, 0, timescale, duration), bytes(4))
+
+
+def hdlr(handler):
+    return full_box('hdlr', 0, bytes(4), handler.encode('latin-1'), bytes(12), b'\0')
+
+
+def stsd(entry):
+    return full_box('stsd', 0, struct.pack('>I', 1), entry)
+
+
+def video_entry(fourcc, width, height):
+    return box(fourcc, bytes(6), struct.pack('>H', 1), bytes(16), struct.pack('>HH', width, height), bytes(50))
+
+
+def audio_entry(fourcc, channels, sample_rate):
+    return box(fourcc, bytes(6), struct.pack('>H', 1), bytes(8),
+               struct.pack('>HHHHI', channels, 16, 0, 0, sample_rate << 16))
+
+
+def stts(*runs):
+    return full_box('stts', 0, struct.pack('>I', len(runs)), *(struct.pack('>II', n, d) for n, d in runs))
+
+
+def trak(header, handler, entry, timescale, duration, samples, version=0):
+    stbl = box('stbl', stsd(entry), stts(*samples))
+    return box('trak', header, box('mdia', mdhd(timescale, duration, version), hdlr(handler), box('minf', stbl)))
+
+
+def movie(version=0, rotation=0, width=1080, height=1920):
+    video = trak(tkhd(width, height, rotation, version), 'vide', video_entry('avc1', width, height),
+                 30000, 300000, [(300, 1000)], version)
+    audio = trak(tkhd(0, 0, version=version), 'soun', audio_entry('mp4a', 2, 48000),
+                 48000, 480000, [(469, 1024)], version)
+    return box('moov', mvhd(1000, 10000, version), video, audio)
+
+
+FTYP = box('ftyp', b'isom', struct.pack('>I', 512), b'isomiso2avc1mp41')
+MDAT = box('mdat', bytes(4096))
+
+
+def probe_bytes(data):
+    return probe_reader(lambda offset, length: data[offset:offset + length], len(data))
+
+
+@pytest.mark.parametrize('version', [0, 1])
+def test_probe_reads_tracks_from_version_0_and_1_headers(version):
+    info = probe_bytes(FTYP + movie(version) + MDAT)
+    
+    assert info.brand == 'isom'
+    assert info.duration == pytest.approx(10.0)
+    assert (info.width, info.height) == (1080, 1920)
+    assert info.fps == pytest.approx(30.0)
+    assert info.frame_count == 300
+    assert info.video_codec == 'h264'
+    assert info.audio_codec == 'aac'
+    assert info.audio_track.channels == 2
+    assert info.audio_track.sample_rate == 48000
+
+
+@pytest.mark.parametrize('rotation', [90, 270])
+def test_rotation_swaps_the_display_size(rotation):
+    info = probe_bytes(FTYP + movie(rotation=rotation, width=1920, height=1080) + MDAT)
+    
+    assert info.rotation == rotation
+    assert (info.width, info.height) == (1080, 1920)
+
+
+def test_faststart_depends_on_moov_position():
+    assert probe_bytes(FTYP + movie() + MDAT).faststart is True
+    assert probe_bytes(FTYP + MDAT + movie()).faststart is False
+
+
+def test_moov_after_a_64_bit_mdat_is_found():
+    large_mdat = struct.pack('>I4sQ', 1, b'mdat', 16 + 4096) + bytes(4096)
+    
+    info = probe_bytes(FTYP + large_mdat + movie())
+    
+    assert info.faststart is False
+    assert info.video_codec == 'h264'
+
+
+def test_only_headers_and_moov_are_read():
+    data = FTYP + box('mdat', bytes(1024 * 1024)) + movie()
+    reads = []
+    
+    def read_at(offset, length):
+        reads.append(length)
+        return data[offset:offset + length]
+    
+    probe_reader(read_at, len(data))
+    
+    assert sum(reads) < 4096
+
+
+def test_as_dict_reports_bitrate_and_size():
+    data = FTYP + movie() + MDAT
+    result = probe_bytes(data).as_dict()
+    
+    assert result['size'] == len(data)
+    assert result['bitrate'] == int(len(data) * 8 / 10.0)
+    assert result['faststart'] is True
+
+
+def test_file_without_moov_is_rejected():
+    with pytest.raises(MediaProbeError, match="No moov box"):
+        probe_bytes(FTYP + MDAT)
+
+
+def test_invalid_box_size_is_rejected():
+    with pytest.raises(MediaProbeError, match="Invalid box size"):
+        probe_bytes(FTYP + struct.pack('>I4s', 4, b'free') + movie())
+
+
+def test_probe_file_returns_none_for_non_mp4_files(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes(b'not a video at all')
+    
+    assert probe_file(str(path)) is None
+
+
+def test_probe_file_reads_a_local_file(tmp_path):
+    path = tmp_path / 'reel.mp4'
+    path.write_bytes(FTYP + movie() + MDAT)
+    
+    assert probe_file(str(path)).height == 1920
+
+
+def test_eligibility():
+    info = probe_bytes(FTYP + movie() + MDAT).as_dict()
+    assert check_eligibility(info, 'youtube') == []
+    assert check_eligibility(info, 'instagram') == []
+    
+    wide = dict(info, width=1920, height=1080, fps=120.0, duration=200.0)
+    assert len(check_eligibility(wide, 'youtube')) == 2
+    assert len(check_eligibility(wide, 'instagram')) == 2
+    assert check_eligibility(dict(info, width=0), 'youtube') == ["no video track"]
@@ -0,0 +1,126 @@
+"""
+Tests for due-reel selection and status updates (metadata_manager.py).
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('gspread')
+
+import rate_limiter
+import retry_policy
+from metadata_manager import MetadataManager
+from rate_limiter import RateLimiter
+
+
+HEADER = ['what', 'type', 'date', 'files', 'yt', 'ig', 'long', 'short', 'short 2', 'folder']
+
+
+def row(title, row_type, date, folder, yt_status='', ig_status=''):
+    return [title, row_type, date, '', yt_status, ig_status, 'Long description', 'Caption', '', folder]
+
+
+class FakeCell:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeWorksheet:
+    """In-memory worksheet; reads are slow enough to expose lost updates."""
+    
+    def __init__(self, rows):
+        self.rows = [list(r) for r in rows]
+    
+    def get_all_values(self):
+        return [list(r) for r in self.rows]
+    
+    def cell(self, row_number, col):
+        value = self.rows[row_number - 1][col - 1]
+        time.sleep(0.01)
+        return FakeCell(value)
+    
+    def update_cell(self, row_number, col, value):
+        self.rows[row_number - 1][col - 1] = value
+
+
+@pytest.fixture
+def manager(config, monkeypatch):
+    monkeypatch.setattr(rate_limiter, '_limiter', RateLimiter({}))
+    monkeypatch.setattr(retry_policy, '_breakers', {})
+    
+    def make(rows):
+        manager = MetadataManager.__new__(MetadataManager)
+        manager.config = config
+        manager.sheet = FakeWorksheet([HEADER] + rows)
+        manager._write_lock = threading.Lock()
+        return manager
+    return make
+
+
+def test_due_reels_in_range_ordered_by_due_date(manager):
+    sheets = manager([
+        row('Episode 2', 'Podcast', '01/09/2025', 'ep2'),
+        row('Episode 1', 'Podcast', '01/07/2025', 'ep1'),
+        row('Old', 'Podcast', '12/01/2024', 'old'),
+    ])
+    
+    due = sheets.find_due_videos(datetime(2025, 1, 7), datetime(2025, 1, 10))
+    
+    # Reel 2 of a row is due two days after reel 1
+    assert [(m['folder_name'], m['reel_number'], m['due_date'].day) for m in due] == [
+        ('ep1', 1, 7), ('ep2', 1, 9), ('ep1', 2, 9),
+    ]
+
+
+def test_types_filter_ignores_case_and_padding(manager):
+    sheets = manager([
+        row('Episode', 'Podcast ', '01/07/2025', 'ep'),
+        row('Clip', 'Clip', '01/07/2025', 'clip'),
+    ])
+    
+    due = sheets.find_due_videos(datetime(2025, 1, 7), datetime(2025, 1, 7), types=[' podcast'])
+    
+    assert [m['folder_name'] for m in due] == ['ep']
+    assert due[0]['type'] == 'Podcast'
+
+
+def test_reels_uploaded_everywhere_are_skipped(manager):
+    sheets = manager([
+        row('Done', 'Podcast', '01/07/2025', 'done', 'UPLOADED (reel 1)', 'UPLOADED (reels 1, 2)'),
+        row('Half', 'Podcast', '01/07/2025', 'half', 'UPLOADED (reel 1)', ''),
+        row('Legacy', 'Podcast', '01/07/2025', 'legacy', 'UPLOADED', 'UPLOADED'),
+        row('No folder', 'Podcast', '01/07/2025', ''),
+    ])
+    
+    due = sheets.find_due_videos(datetime(2025, 1, 7), datetime(2025, 1, 9))
+    
+    assert [(m['folder_name'], m['reel_number'], m['uploaded']) for m in due] == [
+        ('half', 1, ['youtube']), ('done', 2, ['instagram']), ('half', 2, []),
+    ]
+
+
+def test_update_status_adds_the_reel_to_the_cell(manager):
+    sheets = manager([row('Episode', 'Podcast', '01/07/2025', 'ep', yt_status='UPLOADED (reel 1)')])
+    
+    assert sheets.update_status(2, 'youtube', 'UPLOADED', 2)
+    assert sheets.update_status(2, 'instagram', 'UPLOADED', 2)
+    
+    assert sheets.sheet.rows[1][MetadataManager.COL_YT_STATUS] == 'UPLOADED (reels 1, 2)'
+    assert sheets.sheet.rows[1][MetadataManager.COL_IG_STATUS] == 'UPLOADED (reel 2)'
+    assert not sheets.update_status(2, 'tiktok', 'UPLOADED', 1)
+
+
+def test_concurrent_status_updates_are_not_lost(manager):
+    sheets = manager([row('Episode', 'Podcast', '01/07/2025', 'ep')])
+    
+    threads = [threading.Thread(target=sheets.update_status, args=(2, 'youtube', 'UPLOADED', reel))
+               for reel in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sheets.sheet.rows[1][MetadataManager.COL_YT_STATUS] == 'UPLOADED (reels 1, 2)'
@@ -0,0 +1,151 @@
+"""
+Tests for the pipeline engine (pipeline.py).
+"""
+
+import threading
+import time
+
+import pytest
+
+from pipeline import CACHED, DONE, FAILED, SKIPPED, TIMED_OUT, Pipeline
+
+
+def test_outputs_are_passed_downstream_by_stage_name():
+    pipeline = Pipeline('test')
+    pipeline.add_stage('a', lambda: 2)
+    pipeline.add_stage('b', lambda: 3)
+    pipeline.add_stage('c', lambda a, b: a * b, depends_on=['a', 'b'])
+    
+    run = pipeline.run()
+    
+    assert run.output('c') == 6
+    assert all(record.status == DONE for record in run.records.values())
+
+
+def test_failed_dependency_skips_downstream_stages():
+    def fail():
+        raise ValueError("boom")
+    
+    pipeline = Pipeline('test')
+    pipeline.add_stage('a', fail)
+    pipeline.add_stage('b', lambda a: a, depends_on=['a'])
+    pipeline.add_stage('c', lambda b: b, depends_on=['b'])
+    
+    run = pipeline.run()
+    
+    assert run.records['a'].status == FAILED
+    assert isinstance(run.errors['a'], ValueError)
+    assert run.records['b'].status == SKIPPED
+    assert run.records['c'].status == SKIPPED
+
+
+def test_after_stage_gets_none_for_a_failed_upstream():
+    def fail():
+        raise ValueError("boom")
+    
+    pipeline = Pipeline('test')
+    pipeline.add_stage('a', fail)
+    pipeline.add_stage('b', lambda a: 'ran' if a is None else 'unexpected', after=['a'])
+    
+    run = pipeline.run()
+    
+    assert run.records['b'].status == DONE
+    assert run.output('b') == 'ran'
+
+
+def test_cached_outputs_are_not_run_again():
+    calls = []
+    pipeline = Pipeline('test')
+    pipeline.add_stage('a', lambda: calls.append('a') or 1)
+    pipeline.add_stage('b', lambda a: a + 1, depends_on=['a'])
+    
+    run = pipeline.run(cached={'a': 10})
+    
+    assert calls == []
+    assert run.records['a'].status == CACHED
+    assert run.output('b') == 11
+
+
+def test_independent_stages_run_in_parallel():
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline('test', max_workers=2)
+    pipeline.add_stage('a', barrier.wait)
+    pipeline.add_stage('b', barrier.wait)
+    
+    run = pipeline.run()
+    
+    # Each stage waits for the other, so this only finishes if both ran at once
+    assert run.succeeded('a') and run.succeeded('b')
+
+
+def test_group_limit_caps_concurrency():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+    
+    pipeline = Pipeline('test', max_workers=4, limits={'upload': 1})
+    for name in ('a', 'b', 'c'):
+        pipeline.add_stage(name, work, group='upload')
+    
+    run = pipeline.run()
+    
+    assert all(run.succeeded(name) for name in ('a', 'b', 'c'))
+    assert peak[0] == 1
+
+
+def test_timed_out_stage_is_abandoned_and_skips_dependents():
+    release = threading.Event()
+    pipeline = Pipeline('test')
+    pipeline.add_stage('slow', lambda: release.wait(5), timeout=0.1)
+    pipeline.add_stage('next', lambda slow: slow, depends_on=['slow'])
+    
+    started = time.monotonic()
+    run = pipeline.run()
+    release.set()
+    
+    assert time.monotonic() - started < 2
+    assert run.records['slow'].status == TIMED_OUT
+    assert run.records['next'].status == SKIPPED
+
+
+def test_unknown_dependency_is_rejected():
+    pipeline = Pipeline('test')
+    pipeline.add_stage('a', lambda missing: None, depends_on=['missing'])
+    
+    with pytest.raises(ValueError, match="unknown stage"):
+        pipeline.run()
+
+
+def test_dependency_cycle_is_rejected():
+    pipeline = Pipeline('test')
+    pipeline.add_stage('a', lambda b: None, depends_on=['b'])
+    pipeline.add_stage('b', lambda a: None, depends_on=['a'])
+    
+    with pytest.raises(ValueError, match="cycle"):
+        pipeline.run()
+
+
+def test_duplicate_stage_name_is_rejected():
+    pipeline = Pipeline('test')
+    pipeline.add_stage('a', lambda: None)
+    
+    with pytest.raises(ValueError, match="already defined"):
+        pipeline.add_stage('a', lambda: None)
+
+
+def test_timing_report_lists_every_stage():
+    pipeline = Pipeline('report')
+    pipeline.add_stage('a', lambda: None)
+    pipeline.add_stage('b', lambda a: None, depends_on=['a'])
+    
+    report = pipeline.run().timing_report()
+    
+    assert "Timing breakdown for 'report'" in report
+    assert '  a ' in report and '  b ' in report
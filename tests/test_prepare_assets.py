@@ -0,0 +1,184 @@
+"""
+Tests for season-wide asset preparation (prepare_assets.py).
+"""
+
+import hashlib
+import os
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+import thumbnail_extractor
+from artifact_cache import ArtifactCache
+from prepare_assets import (find_drive_assets, find_local_assets, open_drive_asset, pending_assets,
+                            prepare_all)
+from remote_file import RemoteFile
+from storage import StorageArea
+from thumbnail_extractor import JPEG_QUALITY_RANGE, THUMBNAIL_RENDITIONS
+from upload_manifest import ResultsLog
+
+
+def write_video(path, shade=0):
+    """Write a 3 s 96x160 MP4 with a textured, changing picture."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 10, (96, 160))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MP4 here")
+    rng = np.random.default_rng(shade)
+    for i in range(30):
+        writer.write(rng.integers(40 + i, 200, size=(160, 96, 3), dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+class FakeDrive:
+    """Drive folders and files in memory, with range reads over the file bytes."""
+    
+    def __init__(self, folders, files, contents):
+        self.folders = folders      # parent id -> [{'id', 'name'}]
+        self.files = files          # folder id -> [file dicts]
+        self.contents = contents    # file id -> bytes
+        self.downloads = []
+        self.opened = []
+    
+    def list_folders(self, parent_id=None, name_contains=None):
+        return [f for f in self.folders.get(parent_id, []) if not name_contains or name_contains in f['name']]
+    
+    def find_file_in_folder(self, folder_id, file_pattern=None):
+        for file in self.files.get(folder_id, []):
+            is_cover = '_cover' in file['name']
+            if (file_pattern and file_pattern in file['name']) or (not file_pattern and not is_cover):
+                return file
+        return None
+    
+    def download_file(self, file_id, destination_path):
+        self.downloads.append(file_id)
+        with open(destination_path, 'wb') as f:
+            f.write(self.contents[file_id])
+        return True
+    
+    def open_file(self, file_id, name=None):
+        data = self.contents[file_id]
+        remote = RemoteFile(lambda offset, length: data[offset:offset + length], len(data), name=name or file_id,
+                            block_size=4096)
+        self.opened.append(remote)
+        return remote
+
+
+def drive_file(file_id, name, data):
+    return {'id': file_id, 'name': name, 'md5Checksum': hashlib.md5(data).hexdigest()}
+
+
+def test_local_walk_pairs_videos_with_their_covers(tmp_path):
+    (tmp_path / 'ep1').mkdir()
+    (tmp_path / 'ep2').mkdir()
+    for name in ('ep1/a.mp4', 'ep1/a_cover.jpg', 'ep1/b.mov', 'ep1/notes.txt', 'ep2/only.mp4', 'ep2/x_cover.png'):
+        (tmp_path / name).write_bytes(b'data')
+    
+    assets = find_local_assets(str(tmp_path))
+    
+    assert [(a['label'], a['cover_path'] and os.path.basename(a['cover_path'])) for a in assets] == [
+        (os.path.join('ep1', 'a.mp4'), 'a_cover.jpg'),
+        (os.path.join('ep1', 'b.mov'), None),
+        (os.path.join('ep2', 'only.mp4'), 'x_cover.png'),  # The only video in its directory
+    ]
+    assert assets[0]['id'].startswith(os.path.abspath(assets[0]['video_path']))
+
+
+def test_drive_walk_finds_every_reel_folder():
+    video = drive_file('v1', 'reel.mp4', b'video 1')
+    drive = FakeDrive(
+        folders={
+            None: [{'id': 'f1', 'name': 'Episode_1_reels'}, {'id': 'f2', 'name': 'Episode_2_reels'},
+                   {'id': 'f3', 'name': 'Episode_1_reels_old'}],
+            'f1': [{'id': 'r1', 'name': 'reel_1'}, {'id': 'r2', 'name': 'reel_2'}, {'id': 'rx', 'name': 'reel_x'}],
+            'f2': [{'id': 'r3', 'name': 'reel_1'}],
+        },
+        files={
+            'r1': [video, drive_file('c1', 'reel_cover.jpg', b'cover')],
+            'r2': [],
+            'r3': [drive_file('v3', 'reel.mp4', b'video 3')],
+        },
+        contents={},
+    )
+    
+    assets = find_drive_assets(drive)
+    
+    assert [(a['label'], a['reel_number'], a['cover_file'] and a['cover_file']['id']) for a in assets] == [
+        ('Episode_1_reels/reel_1', 1, 'c1'),
+        ('Episode_2_reels/reel_1', 1, None),
+    ]
+    # A replaced video has a new checksum, so it counts as a new asset
+    assert assets[0]['id'] == f"Episode_1_reels/reel_1:{video['md5Checksum']}"
+    assert [a['folder_name'] for a in find_drive_assets(drive, ['Episode_2'])] == ['Episode_2']
+
+
+def test_index_resume_skips_prepared_reels(tmp_path):
+    index = ResultsLog(str(tmp_path / 'assets_index.jsonl'))
+    index.record({'id': 'a', 'status': 'ok'})
+    index.record({'id': 'b', 'status': 'failed'})
+    assets = [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]
+    
+    assert [a['id'] for a in pending_assets(assets, index)] == ['b', 'c']
+    assert [a['id'] for a in pending_assets(assets, index, force=True)] == ['a', 'b', 'c']
+
+
+def test_process_pool_prepares_local_videos_into_the_cache(tmp_path):
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    for shade in range(3):
+        write_video(exports / f"reel_{shade}.mp4", shade)
+    (exports / 'broken.mp4').write_bytes(b'not a video')
+    index = ResultsLog(str(tmp_path / 'assets_index.jsonl'))
+    cache_dir = str(tmp_path / 'cache')
+    assets = find_local_assets(str(exports))
+    
+    results = prepare_all(assets, index, cache_dir, workers=2)
+    
+    by_label = {r['label']: r for r in results}
+    assert by_label['broken.mp4']['status'] == 'failed'
+    for shade in range(3):
+        result = by_label[f"reel_{shade}.mp4"]
+        assert result['status'] == 'ok'
+        assert (result['probe']['width'], result['probe']['height']) == (96, 160)
+        assert sorted(result['thumbnails']) == sorted(THUMBNAIL_RENDITIONS)
+        assert all(path.startswith(cache_dir) and os.path.exists(path) for path in result['thumbnails'].values())
+    # Re-running only retries the failed reel
+    assert [a['label'] for a in pending_assets(assets, index)] == ['broken.mp4']
+
+
+@pytest.mark.skipif(not shutil.which(thumbnail_extractor.FFMPEG_BINARY), reason="ffmpeg is not installed")
+def test_drive_videos_are_read_remotely_not_downloaded(tmp_path):
+    with open(write_video(tmp_path / 'source.mp4'), 'rb') as f:
+        video_data = f.read()
+    _, cover = cv2.imencode('.jpg', np.full((1920, 1080, 3), 128, dtype=np.uint8))
+    video = drive_file('v1', 'reel.mp4', video_data)
+    drive = FakeDrive(
+        folders={None: [{'id': 'f1', 'name': 'Episode_1_reels'}], 'f1': [{'id': 'r1', 'name': 'reel_1'},
+                                                                          {'id': 'r2', 'name': 'reel_2'}]},
+        files={'r1': [video, drive_file('c1', 'reel_cover.jpg', cover.tobytes())], 'r2': [video]},
+        contents={'v1': video_data, 'c1': cover.tobytes()},
+    )
+    temp_dir = tmp_path / 'temp'
+    temp_dir.mkdir()
+    index = ResultsLog(str(tmp_path / 'assets_index.jsonl'))
+    cache_dir = str(tmp_path / 'cache')
+    
+    results = prepare_all(find_drive_assets(drive), index, cache_dir, workers=1,
+                          fetch=lambda asset: open_drive_asset(drive, asset, str(temp_dir)))
+    
+    assert [r['status'] for r in results] == ['ok', 'ok']
+    assert drive.downloads == ['c1']  # Only the cover
+    assert len(drive.opened) == 2 and all(remote.requests for remote in drive.opened)
+    assert os.listdir(temp_dir) == []  # The downloaded cover is removed
+    
+    # The upload pipeline finds the thumbnails under the key of the downloaded video
+    downloaded = tmp_path / 'downloaded.mp4'
+    downloaded.write_bytes(video_data)
+    cache = ArtifactCache(StorageArea('cache', cache_dir))
+    cache.remember_checksum(str(downloaded), video['md5Checksum'])
+    params = {'renditions': THUMBNAIL_RENDITIONS, 'quality': JPEG_QUALITY_RANGE}
+    key = cache.key(str(downloaded), 'thumbnail', params)
+    reel_2 = next(r for r in results if r['label'].endswith('reel_2'))
+    assert reel_2['thumbnails'] == {name: cache.lookup(key, f"_{name}.jpg") for name in THUMBNAIL_RENDITIONS}
@@ -0,0 +1,111 @@
+"""
+Tests for the shared token-bucket rate limiter (rate_limiter.py).
+"""
+
+import pytest
+
+import rate_limiter
+import retry_policy
+from rate_limiter import READ, WRITE, RateLimiter, TokenBucket
+from retry_policy import SHEETS_HOST, call_with_retries
+
+
+class Clock:
+    """Fake monotonic clock that sleeping advances."""
+    
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+    
+    def monotonic(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_burst_then_paced_at_the_refill_rate(clock):
+    bucket = TokenBucket('sheets.read', per_minute=60, headroom=0.9)
+    
+    # 6 calls of burst, then one call per 1/0.9 s
+    assert [bucket.acquire() for _ in range(6)] == [0] * 6
+    assert bucket.acquire() == pytest.approx(1 / 0.9)
+    assert bucket.acquire() == pytest.approx(1 / 0.9)
+    assert bucket.as_dict() == {'per_minute': 54.0, 'calls': 8, 'waits': 2, 'wait_seconds': round(2 / 0.9, 3)}
+
+
+def test_a_minute_of_calls_stays_under_the_quota(clock):
+    bucket = TokenBucket('sheets.write', per_minute=60, headroom=0.9)
+    started = clock.now
+    
+    calls = 0
+    while clock.now - started < 60:
+        bucket.acquire()
+        calls += 1
+    
+    assert calls <= 60
+
+
+def test_waiting_callers_queue_behind_each_other(clock):
+    bucket = TokenBucket('drive.write', per_minute=60, headroom=0.5)  # 0.5/s, burst of 30
+    for _ in range(30):
+        bucket.reserve()
+    
+    # Reservations without sleeping, as from concurrent threads
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([2.0, 4.0, 6.0])
+
+
+def test_idle_time_refills_up_to_the_burst(clock):
+    bucket = TokenBucket('sheets.read', per_minute=60, headroom=0.9)
+    for _ in range(10):
+        bucket.acquire()
+    
+    clock.now += 3600
+    assert [bucket.acquire() for _ in range(6)] == [0] * 6
+    assert bucket.acquire() > 0
+
+
+def test_unknown_apis_are_not_paced(clock):
+    limiter = RateLimiter({('sheets', WRITE): 60})
+    
+    assert all(limiter.acquire('instagram', WRITE) == 0 for _ in range(100))
+    assert all(limiter.acquire('sheets', READ) == 0 for _ in range(100))
+    assert limiter.stats() == {}
+
+
+def test_quotas_can_be_overridden_from_the_environment(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_SHEETS_WRITE', '300')
+    
+    limiter = RateLimiter(headroom=0.9)
+    
+    assert limiter._buckets[('sheets', WRITE)].rate == pytest.approx(300 * 0.9 / 60)
+    assert limiter._buckets[('sheets', READ)].rate == pytest.approx(60 * 0.9 / 60)
+
+
+def test_every_attempt_takes_a_token_of_its_operation_class(monkeypatch, clock):
+    limiter = RateLimiter({('sheets', READ): 60, ('sheets', WRITE): 60})
+    monkeypatch.setattr(rate_limiter, '_limiter', limiter)
+    monkeypatch.setattr(retry_policy, '_breakers', {})
+    monkeypatch.setattr(retry_policy.time, 'sleep', lambda seconds: None)
+    attempts = []
+    
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return 'ok'
+    
+    assert call_with_retries(SHEETS_HOST, flaky, "update cell", operation=WRITE) == 'ok'
+    assert call_with_retries(SHEETS_HOST, lambda: 'rows', "read sheet") == 'rows'
+    
+    assert limiter.stats()['sheets.write']['calls'] == 2
+    assert limiter.stats()['sheets.read']['calls'] == 1
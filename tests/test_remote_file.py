@@ -0,0 +1,180 @@
+"""
+Tests for range-read remote files and their local HTTP server (remote_file.py),
+against a local server that answers Range requests like Google Drive.
+"""
+
+import http.client
+import io
+import re
+import shutil
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+
+import thumbnail_extractor
+from remote_file import RemoteFile, serve_http
+from thumbnail_extractor import ThumbnailExtractor
+
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        start, end = map(int, re.match(r'bytes=(\d+)-(\d+)$', self.headers['Range']).groups())
+        self.server.ranges.append((start, end))
+        body = self.server.data[start:end + 1]
+        self.send_response(206)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def origin():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OriginHandler)
+    server.data = DATA
+    server.ranges = []
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def open_remote(origin, block_size=1024, cache_blocks=4, size=len(DATA)):
+    url = f"http://127.0.0.1:{origin.server_port}/file"
+    
+    def read_range(offset, length):
+        request = urllib.request.Request(url, headers={'Range': f"bytes={offset}-{offset + length - 1}"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.read()
+    
+    return RemoteFile(read_range, size, name='clip 1.mp4', block_size=block_size, cache_blocks=cache_blocks)
+
+
+def fetch(url, range_header=None, method='GET'):
+    request = urllib.request.Request(url, method=method, headers={'Range': range_header} if range_header else {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), b''
+
+
+def test_read_at_fetches_missing_blocks_in_one_request(origin):
+    remote = open_remote(origin)
+    
+    assert remote.read_at(1000, 1000) == DATA[1000:2000]
+    assert origin.ranges == [(0, 2047)]
+    
+    # Blocks 0-1 are cached, so only block 2 is fetched
+    assert remote.read_at(1500, 1000) == DATA[1500:2500]
+    assert remote.read_at(2040, 100) == DATA[2040:2140]
+    assert origin.ranges == [(0, 2047), (2048, 3071)]
+    assert (remote.requests, remote.bytes_fetched) == (2, 3072)
+
+
+def test_read_at_clamps_to_the_end_of_the_file(origin):
+    remote = open_remote(origin)
+    
+    assert remote.read_at(len(DATA) - 10, 100) == DATA[-10:]
+    assert remote.read_at(len(DATA), 100) == b''
+    assert origin.ranges == [(9216, 10239)]
+
+
+def test_least_recently_used_blocks_are_evicted(origin):
+    remote = open_remote(origin, cache_blocks=2)
+    remote.read_at(0, 1)
+    remote.read_at(1024, 1)
+    remote.read_at(0, 1)  # Block 0 is now the most recently used
+    remote.read_at(2048, 1)  # Evicts block 1
+    
+    remote.read_at(0, 1)
+    remote.read_at(1024, 1)
+    
+    assert origin.ranges == [(0, 1023), (1024, 2047), (2048, 3071), (1024, 2047)]
+
+
+def test_short_read_raises(origin):
+    remote = open_remote(origin, size=len(DATA) + 100)
+    
+    with pytest.raises(IOError, match="Short read"):
+        remote.read_at(len(DATA) - 10, 50)
+
+
+def test_file_interface_seeks_and_reads(origin):
+    remote = open_remote(origin)
+    reader = io.BufferedReader(remote, buffer_size=512)
+    
+    assert reader.read(10) == DATA[:10]
+    reader.seek(-20, io.SEEK_END)
+    assert reader.read() == DATA[-20:]
+    reader.seek(5000)
+    assert reader.tell() == 5000
+    
+    buffer = bytearray(100)
+    remote.seek(3000)
+    assert remote.readinto(buffer) == 100 and bytes(buffer) == DATA[3000:3100]
+    remote.seek(50, io.SEEK_CUR)
+    assert remote.tell() == 3150
+    with pytest.raises(ValueError):
+        remote.seek(-1)
+
+
+def test_served_file_answers_range_requests(origin):
+    remote = open_remote(origin)
+    
+    with serve_http(remote) as url:
+        assert url.endswith('/clip%201.mp4')
+        
+        status, headers, body = fetch(url)
+        assert (status, body, headers['Accept-Ranges']) == (200, DATA, 'bytes')
+        
+        status, headers, body = fetch(url, 'bytes=100-199')
+        assert (status, body, headers['Content-Range']) == (206, DATA[100:200], f"bytes 100-199/{len(DATA)}")
+        
+        assert fetch(url, 'bytes=10000-')[2] == DATA[10000:]
+        assert fetch(url, 'bytes=-16')[2] == DATA[-16:]
+        assert fetch(url, 'bytes=10000-99999')[2] == DATA[10000:]
+        
+        status, headers, body = fetch(url, 'bytes=0-99', method='HEAD')
+        assert (status, headers['Content-Length'], body) == (206, '100', b'')
+        
+        status, headers, _ = fetch(url, f"bytes={len(DATA)}-")
+        assert (status, headers['Content-Range']) == (416, f"bytes */{len(DATA)}")
+
+
+def test_served_file_ends_a_response_the_remote_cannot_fill(origin):
+    remote = open_remote(origin)
+    remote.size += 100  # Larger than the file really is
+    remote.read_at = lambda offset, length: DATA[offset:offset + length]
+    
+    with serve_http(remote) as url:
+        # A short body instead of a server thread looping on empty reads
+        with urllib.request.urlopen(url, timeout=5) as response:
+            with pytest.raises(http.client.IncompleteRead):
+                response.read()
+
+
+@pytest.mark.skipif(not shutil.which(thumbnail_extractor.FFMPEG_BINARY), reason="ffmpeg is not installed")
+def test_ffmpeg_grabs_a_frame_over_the_served_url(origin, tmp_path):
+    path = str(tmp_path / 'video.mp4')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 10, (64, 48))
+    for i in range(50):
+        writer.write(np.full((48, 64, 3), i * 5, dtype=np.uint8))
+    writer.release()
+    with open(path, 'rb') as f:
+        origin.data = f.read()
+    remote = open_remote(origin, size=len(origin.data))
+    
+    with serve_http(remote) as url:
+        frame = ThumbnailExtractor.grab_frame(url, 2.0)
+    
+    assert float(frame.mean()) == pytest.approx(100, abs=8)
@@ -0,0 +1,147 @@
+"""
+Tests for the shared retry policy and circuit breakers (retry_policy.py).
+"""
+
+import socket
+
+import pytest
+import requests
+
+import retry_policy
+from retry_policy import CircuitOpenError, call_with_retries, classify_error
+
+
+class FakeHttpError(Exception):
+    """Shaped like googleapiclient's HttpError: an httplib2-style resp and bytes content."""
+    
+    def __init__(self, status, content=b'', headers=None):
+        super().__init__(f"HTTP {status}")
+        self.resp = Resp(headers or {})
+        self.resp.status = status
+        self.content = content
+
+
+class Resp(dict):
+    status = None
+
+
+def requests_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = b'{}'
+    return requests.HTTPError(f"HTTP {status}", response=response)
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry_policy.time, 'sleep', sleeps.append)
+    monkeypatch.setattr(retry_policy, '_breakers', {})
+    retry_policy.set_run_deadline()
+    return sleeps
+
+
+def failing(*errors, result='ok'):
+    errors = list(errors)
+    calls = []
+    
+    def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    
+    call.calls = calls
+    return call
+
+
+def test_errors_are_classified():
+    assert classify_error(FakeHttpError(503)) == (True, None)
+    assert classify_error(FakeHttpError(429, headers={'retry-after': '7'})) == (True, 7.0)
+    assert classify_error(FakeHttpError(403, b'{"reason": "userRateLimitExceeded"}'))[0]
+    assert not classify_error(FakeHttpError(403, b'{"reason": "quotaExceeded"}'))[0]
+    assert not classify_error(FakeHttpError(404))[0]
+    assert classify_error(requests_error(502, {'Retry-After': '3'})) == (True, 3.0)
+    assert not classify_error(requests_error(400))[0]
+    assert classify_error(requests.ConnectionError("reset"))[0]
+    assert classify_error(socket.timeout("timed out"))[0]
+    assert not classify_error(ValueError("bad value"))[0]
+
+
+def test_transient_errors_are_retried_with_backoff(no_waiting):
+    call = failing(FakeHttpError(500), requests.ConnectionError("reset"))
+    
+    assert call_with_retries('drive', call, "list files") == 'ok'
+    assert len(call.calls) == 3
+    first, second = no_waiting
+    assert 0.5 <= first <= 1.0 and 1.0 <= second <= 2.0
+
+
+def test_retry_after_is_honored(no_waiting):
+    call = failing(FakeHttpError(429, headers={'retry-after': '12'}))
+    
+    assert call_with_retries('sheets', call, "read sheet") == 'ok'
+    assert no_waiting == [12.0]
+
+
+def test_permanent_errors_are_raised_at_once(no_waiting):
+    call = failing(FakeHttpError(404))
+    
+    with pytest.raises(FakeHttpError):
+        call_with_retries('drive', call, "get file")
+    assert len(call.calls) == 1 and no_waiting == []
+
+
+def test_attempts_run_out(no_waiting):
+    call = failing(*[FakeHttpError(503)] * 3)
+    
+    with pytest.raises(FakeHttpError):
+        call_with_retries('drive', call, "list files", attempts=3)
+    assert len(call.calls) == 3
+
+
+def test_no_retry_waits_past_the_run_deadline(no_waiting):
+    retry_policy.set_run_deadline(5)
+    call = failing(FakeHttpError(503, headers={'retry-after': '30'}))
+    
+    with pytest.raises(FakeHttpError):
+        call_with_retries('youtube', call, "upload")
+    assert no_waiting == []
+
+
+def test_breaker_opens_per_host_and_recovers_after_a_trial_call(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retry_policy.time, 'monotonic', lambda: now[0])
+    retry_policy.set_run_deadline()
+    
+    with pytest.raises(FakeHttpError):
+        call_with_retries('drive', failing(*[FakeHttpError(503)] * 10), "list files", attempts=10)
+    assert retry_policy.get_breaker('drive').is_open
+    
+    # Calls to the host fail fast, other hosts are not affected
+    call = failing()
+    with pytest.raises(CircuitOpenError):
+        call_with_retries('drive', call, "list files")
+    assert call.calls == []
+    assert call_with_retries('sheets', failing(), "read sheet") == 'ok'
+    
+    # After the cooldown one trial call goes through and closes the breaker
+    now[0] += retry_policy.BREAKER_COOLDOWN + 1
+    assert call_with_retries('drive', failing(), "list files") == 'ok'
+    assert not retry_policy.get_breaker('drive').is_open
+
+
+def test_failed_trial_call_reopens_the_breaker(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retry_policy.time, 'monotonic', lambda: now[0])
+    retry_policy.set_run_deadline()
+    breaker = retry_policy.get_breaker('drive')
+    for _ in range(retry_policy.BREAKER_THRESHOLD):
+        breaker.record_failure()
+    
+    now[0] += retry_policy.BREAKER_COOLDOWN + 1
+    with pytest.raises(FakeHttpError):
+        call_with_retries('drive', failing(FakeHttpError(503)), "list files")
+    with pytest.raises(CircuitOpenError):
+        call_with_retries('drive', failing(), "list files")
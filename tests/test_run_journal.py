@@ -0,0 +1,128 @@
+"""
+Tests for the checkpoint journal that resumes a reel after a crash (run_journal.py).
+"""
+
+import os
+import time
+
+import pytest
+
+import artifact_cache
+from artifact_cache import ArtifactCache
+from run_journal import RunJournal
+from storage import StorageArea
+
+
+REEL = {'folder_name': 'Episode 12: Guests', 'row_number': 14, 'reel_number': 2}
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = ArtifactCache(StorageArea('cache', str(tmp_path / 'cache')))
+    monkeypatch.setattr(artifact_cache, '_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    (tmp_path / 'journal').mkdir()
+    return str(tmp_path / 'journal' / RunJournal.name_for(REEL))
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'video data')
+    return str(path)
+
+
+def counting(result):
+    calls = []
+    
+    def step():
+        calls.append(1)
+        return result
+    
+    step.calls = calls
+    return step
+
+
+def test_journal_is_named_after_the_row_and_reel():
+    assert RunJournal.name_for(REEL) == 'Episode_12_Guests_row14_reel2.jsonl'
+
+
+def test_rerun_skips_steps_completed_before_a_crash(journal_path, video):
+    first = RunJournal(journal_path)
+    fetch = counting({'video_path': video, 'cover_path': None})
+    youtube = counting('yt_id')
+    first.step('fetch', fetch, files=lambda output: [output['video_path'], output['cover_path']])
+    first.step('upload_youtube', youtube)
+    # The run crashes during the Instagram upload
+    
+    rerun = RunJournal(journal_path)
+    instagram = counting('ig_id')
+    
+    assert rerun.step('fetch', fetch) == {'video_path': video, 'cover_path': None}
+    assert rerun.step('upload_youtube', youtube) == 'yt_id'
+    assert rerun.step('upload_instagram', instagram) == 'ig_id'
+    assert len(fetch.calls) == len(youtube.calls) == len(instagram.calls) == 1
+    assert set(RunJournal(journal_path).completed()) == {'fetch', 'upload_youtube', 'upload_instagram'}
+
+
+def test_failed_steps_are_not_recorded(journal_path):
+    journal = RunJournal(journal_path)
+    
+    assert journal.step('upload_instagram', counting(None)) is None
+    
+    retry = counting('ig_id')
+    assert RunJournal(journal_path).step('upload_instagram', retry) == 'ig_id'
+    assert len(retry.calls) == 1
+
+
+def test_changed_or_missing_files_are_fetched_again(journal_path, video):
+    fetch = counting({'video_path': video})
+    RunJournal(journal_path).step('fetch', fetch, files=lambda output: [output['video_path']])
+    
+    with open(video, 'ab') as f:
+        f.write(b' truncated download')
+    RunJournal(journal_path).step('fetch', fetch, files=lambda output: [output['video_path']])
+    assert len(fetch.calls) == 2
+    
+    os.remove(video)
+    assert RunJournal(journal_path).resume('fetch') is None
+
+
+def test_resumed_files_keep_their_recorded_hash(journal_path, video, cache):
+    cache.remember_checksum(video, 'drivemd5')
+    RunJournal(journal_path).step('fetch', counting({'video_path': video}),
+                                  files=lambda output: [output['video_path']])
+    
+    fresh = ArtifactCache(cache.area)
+    artifact_cache._cache = fresh
+    RunJournal(journal_path).resume('fetch')
+    
+    # The next process finds the download's renditions without hashing it
+    assert fresh.source_hash(video) == 'md5:drivemd5'
+
+
+def test_cleanup_trims_only_old_journals(config, monkeypatch):
+    import config as config_module
+    import main
+    import run_journal
+    
+    monkeypatch.setattr(config_module, '_config', config)
+    monkeypatch.setattr(run_journal, '_journals', {})
+    journal = run_journal.get_journal(REEL)
+    journal.checkpoint('sheet_youtube', True)
+    token = config.state_file('youtube_token.pickle')
+    with open(token, 'wb') as f:
+        f.write(b'token')
+    long_ago = time.time() - 400 * 86400
+    for path in (journal.path, token):
+        os.utime(path, (long_ago, long_ago))
+    
+    main.cleanup_temp_files(config)
+    
+    assert os.path.dirname(journal.path) == config.journal.path
+    assert not os.path.exists(journal.path)
+    assert os.path.exists(token)
@@ -0,0 +1,112 @@
+"""
+Tests for run logging and progress reporting (run_log.py).
+"""
+
+import json
+import threading
+
+import pytest
+
+import run_log
+from run_log import Progress, set_stage, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def start_logging(tmp_path, monkeypatch):
+    # Called from the test itself: pytest swaps sys.stdout between fixture
+    # setup and the test
+    monkeypatch.setenv('RUN_ID', 'test_run')
+    monkeypatch.setattr(run_log, '_run_id', None)
+    yield lambda level='INFO': setup_logging('main', level=level, log_dir=str(tmp_path))
+    shutdown_logging()
+
+
+def records(path):
+    shutdown_logging()
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_printed_lines_become_leveled_json_records(start_logging, capsys):
+    log_file = start_logging()
+    print("Loading configuration...")
+    print("⚠ Warning: No cover image found")
+    print("✗ Upload failed")
+    
+    entries = records(log_file)
+    
+    assert log_file.endswith('main_test_run.jsonl')
+    assert [(e['level'], e['msg']) for e in entries[1:]] == [
+        ('INFO', "Loading configuration..."),
+        ('WARNING', "⚠ Warning: No cover image found"),
+        ('ERROR', "✗ Upload failed"),
+    ]
+    assert all(e['run_id'] == 'test_run' for e in entries)
+    # The console still shows the plain lines
+    assert "✗ Upload failed\n" in capsys.readouterr().out
+
+
+def test_console_level_hides_info_lines_but_the_file_keeps_them(start_logging, capsys):
+    path = start_logging('WARNING')
+    print("Downloaded file")
+    print("⚠ Warning: slow")
+    
+    entries = records(path)
+    
+    out = capsys.readouterr().out
+    assert "Downloaded file" not in out and "⚠ Warning: slow" in out
+    assert [e['msg'] for e in entries][-2:] == ["Downloaded file", "⚠ Warning: slow"]
+
+
+def test_lines_from_threads_are_not_mixed_and_carry_their_stage(start_logging):
+    log_file = start_logging()
+    
+    def stage(name):
+        set_stage(name)
+        for i in range(50):
+            print(f"{name} line", i)
+        set_stage(None)
+    
+    threads = [threading.Thread(target=stage, args=(name,)) for name in ('fetch', 'thumbnail')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    entries = [e for e in records(log_file) if e['stage']]
+    assert len(entries) == 100
+    assert all(e['msg'].startswith(f"{e['stage']} line ") for e in entries)
+
+
+def test_progress_reports_on_percent_steps_not_every_chunk(start_logging):
+    log_file = start_logging()
+    progress = Progress("Download progress", total=1000, step=25, interval=3600)
+    for done in range(10, 1001, 10):
+        progress.update(done)
+    progress.update(1000)
+    
+    entries = [e for e in records(log_file) if e.get('progress')]
+    
+    assert [e['done_bytes'] for e in entries] == [250, 500, 750, 1000]
+    assert entries[-1]['msg'].startswith("Download progress: 100%")
+
+
+def test_progress_reports_after_the_interval(start_logging, monkeypatch):
+    log_file = start_logging()
+    now = [0.0]
+    monkeypatch.setattr(run_log.time, 'monotonic', lambda: now[0])
+    progress = Progress("Upload progress", total=1000, step=50, interval=10)
+    
+    for done in (10, 20, 30):
+        now[0] += 6
+        progress.update(done)
+    
+    entries = [e for e in records(log_file) if e.get('progress')]
+    assert [e['done_bytes'] for e in entries] == [20]
+
+
+def test_progress_without_logging_prints(capsys):
+    progress = Progress("Upload progress", total=100)
+    progress.update(100)
+    
+    assert capsys.readouterr().out.startswith("Upload progress: 100% (0.0 of 0.0 MB")
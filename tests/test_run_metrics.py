@@ -0,0 +1,115 @@
+"""
+Tests for the Prometheus textfile and JSONL history of run metrics (run_metrics.py).
+"""
+
+import json
+import os
+
+import pytest
+
+from http_metrics import get_http_metrics
+from pipeline import Pipeline
+from run_metrics import api_of, export_run_metrics, to_prometheus, youtube_quota
+
+
+@pytest.fixture
+def http():
+    metrics = get_http_metrics()
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+def upload_run(youtube_ok=True):
+    pipeline = Pipeline('reel')
+    pipeline.add_stage('fetch', lambda: 'video.mp4')
+    pipeline.add_stage('upload_youtube', lambda fetch: 'vid' if youtube_ok else None, depends_on=['fetch'])
+    pipeline.add_stage('upload_instagram', lambda fetch: 'media', depends_on=['fetch'])
+    pipeline.add_stage('record', lambda **uploads: {k[len('upload_'):]: v for k, v in uploads.items()},
+                       after=['upload_youtube', 'upload_instagram'])
+    return pipeline.run()
+
+
+def samples(text):
+    return {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in text.splitlines() if not line.startswith('#')}
+
+
+def test_endpoints_are_grouped_by_api():
+    assert api_of('GET www.googleapis.com/drive/v3/files/{id}') == 'drive'
+    assert api_of('POST www.googleapis.com/upload/youtube/v3/videos') == 'youtube'
+    assert api_of('GET sheets.googleapis.com/v4/spreadsheets/{id}/values/A1:Z') == 'sheets'
+    assert api_of('POST i.instagram.com/rupload_igvideo/{id}') == 'instagram'
+    assert api_of('PUT open-upload.tiktokapis.com/upload/') == 'tiktok'
+    assert api_of('GET example.com/') == 'other'
+
+
+def test_youtube_quota_estimate():
+    assert youtube_quota('POST www.googleapis.com/upload/youtube/v3/videos', 2) == 3200
+    assert youtube_quota('PUT www.googleapis.com/upload/youtube/v3/videos', 5) == 0
+    assert youtube_quota('POST www.googleapis.com/upload/youtube/v3/thumbnails/set', 1) == 50
+    assert youtube_quota('GET www.googleapis.com/youtube/v3/videos', 3) == 3
+
+
+def test_export_writes_textfile_and_history(tmp_path, http):
+    http.record('GET', 'https://www.googleapis.com/drive/v3/files/1AbCdEfGhIjKlMnOpQrStUv12', 200, 2.0,
+                bytes_in=8 * 1024 * 1024)
+    http.record('POST', 'https://www.googleapis.com/upload/youtube/v3/videos', 503, 0.5)
+    http.record('POST', 'https://www.googleapis.com/upload/youtube/v3/videos', 200, 4.0,
+                bytes_out=4 * 1024 * 1024)
+    
+    metrics = export_run_metrics('main', [upload_run(youtube_ok=False)], False, started=0,
+                                 metrics_dir=str(tmp_path))
+    
+    assert sorted(os.listdir(tmp_path)) == ['cinrol_main.prom', 'history.jsonl']
+    values = samples((tmp_path / 'cinrol_main.prom').read_text())
+    assert values['cinrol_last_run_success{script="main"}'] == 0
+    assert values['cinrol_last_run_uploads{script="main",platform="youtube",result="failed"}'] == 1
+    assert values['cinrol_last_run_uploads{script="main",platform="instagram",result="ok"}'] == 1
+    assert 'cinrol_last_run_stage_duration_seconds{script="main",stage="fetch"}' in values
+    assert values['cinrol_last_run_http_bytes{script="main",api="drive",direction="in"}'] == 8 * 1024 * 1024
+    assert values['cinrol_last_run_http_retries{script="main",api="youtube"}'] == 1
+    assert values['cinrol_last_run_quota_units{script="main",api="youtube"}'] == 3200
+    # 4 MB sent in 4.5 s of upload requests
+    assert values['cinrol_last_run_upload_throughput_bytes_per_second{script="main",api="youtube"}'] \
+        == round(4 * 1024 * 1024 / 4.5)
+    
+    history = [json.loads(line) for line in (tmp_path / 'history.jsonl').read_text().splitlines()]
+    assert history == [metrics]
+
+
+def test_history_is_appended_and_textfile_replaced(tmp_path, http):
+    export_run_metrics('main', [upload_run()], True, started=0, metrics_dir=str(tmp_path))
+    export_run_metrics('main', [upload_run()], True, started=0, metrics_dir=str(tmp_path))
+    
+    assert len((tmp_path / 'history.jsonl').read_text().splitlines()) == 2
+    text = (tmp_path / 'cinrol_main.prom').read_text()
+    assert text.count('# TYPE cinrol_last_run_success gauge') == 1
+    assert samples(text)['cinrol_last_run_success{script="main"}'] == 1
+
+
+def test_timestamps_keep_full_precision():
+    text = to_prometheus({'script': 'main', 'timestamp': 1760000000.125, 'success': True,
+                          'duration_seconds': 3.5, 'stages': {}, 'uploads': [], 'apis': {}})
+    
+    assert 'cinrol_last_run_timestamp_seconds{script="main"} 1760000000.125' in text
+    assert 'stage_duration' not in text
+
+
+def test_rate_limiter_waits_are_exported():
+    text = to_prometheus({'script': 'main', 'timestamp': 1, 'success': True, 'duration_seconds': 1,
+                          'stages': {}, 'uploads': [], 'apis': {},
+                          'rate_limits': {'sheets.write': {'per_minute': 54.0, 'calls': 9, 'waits': 3,
+                                                           'wait_seconds': 3.333}}})
+    
+    values = samples(text)
+    assert values['cinrol_last_run_rate_limit_waits{script="main",bucket="sheets.write"}'] == 3
+    assert values['cinrol_last_run_rate_limit_wait_seconds{script="main",bucket="sheets.write"}'] == 3.333
+
+
+def test_export_failure_is_only_a_warning(tmp_path, http, capsys):
+    blocked = tmp_path / 'file'
+    blocked.write_text('not a directory')
+    
+    assert export_run_metrics('main', [], True, started=0, metrics_dir=str(blocked)) is None
+    assert "Could not export run metrics" in capsys.readouterr().out
@@ -0,0 +1,108 @@
+"""
+Tests for the per-stage profiles and trace timeline of a run (run_profile.py).
+"""
+
+import json
+import pstats
+import time
+
+import pytest
+
+import run_profile
+from http_metrics import get_http_metrics
+from pipeline import Pipeline
+from run_log import run_id
+
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_profile, 'LOG_DIR', str(tmp_path))
+    yield tmp_path
+    run_profile._profiler = None
+
+
+def busy(seconds=0.02):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return 'ok'
+
+
+def reel_pipeline():
+    def upload(fetch):
+        started = time.perf_counter()
+        time.sleep(0.01)
+        get_http_metrics().record('POST', 'https://www.googleapis.com/upload/youtube/v3/videos', 200,
+                                  time.perf_counter() - started)
+        return 'vid'
+    
+    def broken():
+        raise ValueError("boom")
+    
+    pipeline = Pipeline('reel')
+    pipeline.add_stage('fetch', busy)
+    pipeline.add_stage('upload_youtube', upload, depends_on=['fetch'])
+    pipeline.add_stage('thumbnail', broken)
+    return pipeline
+
+
+def test_nothing_is_recorded_unless_started(log_dir):
+    reel_pipeline().run()
+    
+    assert run_profile.finish_profiling('main') == []
+    assert list(log_dir.iterdir()) == []
+
+
+def test_profile_writes_stats_per_stage(log_dir, capsys):
+    run_profile.start_profiling(profile=True)
+    reel_pipeline().run()
+    reel_pipeline().run()
+    
+    written = run_profile.finish_profiling('main')
+    
+    assert sorted(p.name for p in log_dir.iterdir()) == sorted(
+        f"main_{run_id()}_{stage}.pstats" for stage in ('fetch', 'thumbnail', 'upload_youtube'))
+    assert len(written) == 3
+    stats = pstats.Stats(str(log_dir / f"main_{run_id()}_fetch.pstats"))
+    # Merged over both runs of the stage
+    assert [calls for func, (_, calls, *_) in stats.stats.items() if func[2] == 'busy'] == [2]
+    out = capsys.readouterr().out
+    assert "Profile (own time per function, by stage):" in out
+    assert "test_run_profile.py" in out
+
+
+def test_trace_has_spans_for_pipelines_stages_and_http_calls(log_dir):
+    run_profile.start_profiling(trace=True)
+    run = reel_pipeline().run()
+    
+    run_profile.finish_profiling('main')
+    
+    trace = json.loads((log_dir / f"main_{run_id()}.trace.json").read_text())
+    spans = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+    by_name = {span['name']: span for span in spans}
+    assert {span['cat'] for span in spans} == {'pipeline', 'stage', 'http'}
+    assert by_name['thumbnail']['args'] == {'pipeline': 'reel', 'status': 'failed'}
+    assert by_name['fetch']['dur'] >= 20000
+    http = by_name['POST www.googleapis.com/upload/youtube/v3/videos']
+    upload = by_name['upload_youtube']
+    # The HTTP call is drawn inside its stage, on the same thread
+    assert http['tid'] == upload['tid'] == next(
+        e['tid'] for e in trace['traceEvents'] if e['ph'] == 'M' and e['args']['name'] == run.records['upload_youtube'].thread)
+    assert upload['ts'] <= http['ts'] and http['ts'] + http['dur'] <= upload['ts'] + upload['dur'] + 1
+    assert by_name['reel']['dur'] >= upload['dur']
+
+
+def test_busy_profiler_falls_back_to_an_unprofiled_stage(log_dir, monkeypatch, capsys):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+    
+    monkeypatch.setattr(run_profile.cProfile, 'Profile', BusyProfile)
+    run_profile.start_profiling(profile=True, trace=True)
+    
+    run = reel_pipeline().run()
+    run_profile.finish_profiling('main')
+    
+    assert run.output('upload_youtube') == 'vid'
+    assert "Not profiled while another stage was" in capsys.readouterr().out
+    assert [p.name for p in log_dir.iterdir()] == [f"main_{run_id()}.trace.json"]
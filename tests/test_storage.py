@@ -0,0 +1,113 @@
+"""
+Tests for storage areas and atomic writes (storage.py).
+"""
+
+import os
+import time
+
+import pytest
+
+from storage import StorageArea, atomic_write_bytes, atomic_writer
+
+
+def make_file(area, name, size, age_seconds):
+    path = area.path_for(name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    used = time.time() - age_seconds
+    os.utime(path, (used, used))
+    return path
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = str(tmp_path / 'sub' / 'data.bin')
+    
+    atomic_write_bytes(path, b'one')
+    atomic_write_bytes(path, b'two')
+    
+    with open(path, 'rb') as f:
+        assert f.read() == b'two'
+    assert os.listdir(tmp_path / 'sub') == ['data.bin']
+
+
+def test_failed_atomic_write_leaves_the_old_file(tmp_path):
+    path = str(tmp_path / 'data.bin')
+    atomic_write_bytes(path, b'old')
+    
+    with pytest.raises(RuntimeError):
+        with atomic_writer(path) as f:
+            f.write(b'partial')
+            raise RuntimeError("interrupted")
+    
+    with open(path, 'rb') as f:
+        assert f.read() == b'old'
+    assert os.listdir(tmp_path) == ['data.bin']
+
+
+def test_size_cap_evicts_least_recently_used_first(tmp_path):
+    area = StorageArea('cache', str(tmp_path), max_bytes=250)
+    oldest = make_file(area, 'a/oldest', 100, age_seconds=300)
+    middle = make_file(area, 'b/middle', 100, age_seconds=200)
+    newest = make_file(area, 'newest', 100, age_seconds=100)
+    
+    assert area.enforce() == 1
+    assert not os.path.exists(oldest)
+    assert os.path.exists(middle) and os.path.exists(newest)
+    assert area.size() == 200
+
+
+def test_touch_keeps_a_file_from_being_evicted(tmp_path):
+    area = StorageArea('cache', str(tmp_path), max_bytes=150)
+    used = make_file(area, 'used', 100, age_seconds=300)
+    unused = make_file(area, 'unused', 100, age_seconds=200)
+    
+    StorageArea.touch(used)
+    area.enforce()
+    
+    assert os.path.exists(used)
+    assert not os.path.exists(unused)
+
+
+def test_max_age_removes_files_not_used_recently(tmp_path):
+    area = StorageArea('state', str(tmp_path), max_age_days=1)
+    stale = make_file(area, 'stale', 10, age_seconds=2 * 86400)
+    fresh = make_file(area, 'fresh', 10, age_seconds=60)
+    
+    assert area.enforce() == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+
+
+def test_area_without_limits_keeps_everything(tmp_path):
+    area = StorageArea('state', str(tmp_path))
+    path = make_file(area, 'token', 1000, age_seconds=365 * 86400)
+    
+    assert area.enforce() == 0
+    assert os.path.exists(path)
+
+
+def test_clear_removes_every_file(tmp_path):
+    area = StorageArea('scratch', str(tmp_path))
+    make_file(area, 'a', 1, age_seconds=0)
+    make_file(area, 'sub/b', 1, age_seconds=0)
+    
+    assert area.clear() == 2
+    assert area.size() == 0
+
+
+def test_cleanup_never_evicts_state(config):
+    import main
+    
+    token = config.state_file('youtube_token.pickle')
+    index = config.state_file('fingerprints.jsonl')
+    for path, size in ((token, 1024), (index, 200 * 1024 * 1024)):
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        old = time.time() - 400 * 86400
+        os.utime(path, (old, old))
+    download = make_file(config.scratch, 'video.mp4', 10, 0)
+    
+    main.cleanup_temp_files(config)
+    
+    assert os.path.exists(token) and os.path.exists(index)
+    assert not os.path.exists(download)
@@ -0,0 +1,179 @@
+"""
+Tests for frame grabs, frame scoring and thumbnail encoding (thumbnail_extractor.py).
+"""
+
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+
+import thumbnail_extractor
+from thumbnail_extractor import ThumbnailExtractor
+
+
+FPS = 10
+
+
+@pytest.fixture
+def video(tmp_path):
+    """5 s of 64x48 frames whose brightness is 5 times the frame number."""
+    path = str(tmp_path / 'video.mp4')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), FPS, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MP4 here")
+    for i in range(50):
+        writer.write(np.full((48, 64, 3), i * 5, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def brightness(frame):
+    return float(frame.mean())
+
+
+def test_opencv_grabs_frames_at_their_timestamps(video, monkeypatch):
+    monkeypatch.setattr(thumbnail_extractor, 'FFMPEG_BINARY', 'no-such-ffmpeg')
+    
+    frames = ThumbnailExtractor.grab_frames(video, [0.0, 1.0, 4.0])
+    
+    assert [brightness(f) for f in frames] == pytest.approx([0, 50, 200], abs=8)
+    assert ThumbnailExtractor.grab_frame(video, 1.0, max_width=32).shape == (24, 32, 3)
+
+
+@pytest.mark.skipif(not shutil.which(thumbnail_extractor.FFMPEG_BINARY), reason="ffmpeg is not installed")
+def test_ffmpeg_input_seek_decodes_the_exact_frame(video):
+    frames = ThumbnailExtractor.grab_frames(video, [0.0, 1.0, 2.5, 4.0, 60.0])
+    
+    assert [brightness(f) for f in frames[:4]] == pytest.approx([0, 50, 125, 200], abs=8)
+    assert frames[4] is None  # Past the end
+    assert ThumbnailExtractor.grab_frame(video, 1.0, max_width=32).shape == (24, 32, 3)
+
+
+def test_ffmpeg_seeks_in_the_demuxer(monkeypatch):
+    commands = []
+    
+    def run(command, **kwargs):
+        commands.append(command)
+        _, bmp = cv2.imencode('.bmp', np.zeros((4, 6, 3), dtype=np.uint8))
+        return subprocess.CompletedProcess(command, 0, stdout=bmp.tobytes(), stderr=b'')
+    
+    monkeypatch.setattr(thumbnail_extractor.subprocess, 'run', run)
+    
+    frame = ThumbnailExtractor._ffmpeg_frame('in.mp4', 12.5, keyframes_only=True, max_width=320)
+    ThumbnailExtractor._ffmpeg_frame('https://host/in.mp4', 3, keyframes_only=True, max_width=None)
+    
+    assert frame.shape == (4, 6, 3)
+    local, remote = commands
+    # -ss before -i seeks to the keyframe instead of decoding up to the timestamp
+    assert local.index('-ss') < local.index('-i')
+    assert local[local.index('-ss') + 1] == '12.500'
+    assert '-noaccurate_seek' in local and local[local.index('-skip_frame') + 1] == 'nokey'
+    assert local[local.index('-frames:v') + 1] == '1'
+    assert local[local.index('-vf') + 1] == "scale='min(320,iw)':-2"
+    # Skipping non-key frames reads ahead, which costs requests on a remote file
+    assert '-skip_frame' not in remote and '-vf' not in remote
+
+
+def test_failed_ffmpeg_grab_returns_none(monkeypatch):
+    monkeypatch.setattr(thumbnail_extractor.subprocess, 'run',
+                        lambda command, **kwargs: subprocess.CompletedProcess(command, 1, b'', b'error'))
+    
+    assert ThumbnailExtractor._ffmpeg_frame('in.mp4', 1.0, keyframes_only=False, max_width=None) is None
+
+
+def textured(seed=0):
+    """Mid-grey 64x48 frame with fine detail."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(60, 200, size=(48, 64, 3), dtype=np.uint8)
+
+
+def test_sharp_frames_score_above_blurred_and_black_ones():
+    sharp = textured()
+    blurred = cv2.GaussianBlur(sharp, (0, 0), 3)
+    black = np.zeros_like(sharp)
+    
+    scores = ThumbnailExtractor.score_frames([blurred, sharp, black])
+    
+    assert scores.shape == (3,)
+    assert scores[1] > scores[0] > scores[2]
+    assert scores[2] == pytest.approx(0.0)
+    assert ((0 <= scores) & (scores <= 1)).all()
+
+
+def test_best_frame_is_the_sharpest_keyframe(monkeypatch):
+    grabs = []
+    
+    def grab_frames(video_path, timestamps, keyframes_only=False, max_width=None, workers=4):
+        grabs.append((list(timestamps), keyframes_only, max_width))
+        # The sixth candidate is sharp, the last is undecodable and the rest are blurred
+        blurred = cv2.GaussianBlur(textured(), (0, 0), 3)
+        return [textured() if abs(t - 6.6875) < 0.01 else None if t > 8.5 else blurred for t in timestamps]
+    
+    monkeypatch.setattr(ThumbnailExtractor, 'grab_frames', staticmethod(grab_frames))
+    
+    timestamp, score = ThumbnailExtractor.select_best_frame('video.mp4', candidates=8, budget=10,
+                                                            info={'duration': 10.0})
+    
+    # Evenly spaced over the middle 90%, decoded keyframe-only at scoring size in batches of 4
+    sampled = [t for batch, _, _ in grabs for t in batch]
+    assert sampled == pytest.approx([0.5 + 1.125 * (i + 0.5) for i in range(8)])
+    assert all(keyframes_only and max_width == thumbnail_extractor.THUMBNAIL_SCORING_WIDTH
+               for _, keyframes_only, max_width in grabs)
+    assert timestamp == pytest.approx(6.6875)
+    assert 0 < score <= 1
+
+
+def test_best_frame_selection_stops_at_the_budget(monkeypatch):
+    grabs = []
+    
+    def grab_frames(video_path, timestamps, keyframes_only=False, max_width=None, workers=4):
+        grabs.append(list(timestamps))
+        return [textured(i) for i in range(len(timestamps))]
+    
+    monkeypatch.setattr(ThumbnailExtractor, 'grab_frames', staticmethod(grab_frames))
+    
+    assert ThumbnailExtractor.select_best_frame('video.mp4', candidates=12, budget=0, info={'duration': 10.0})
+    assert len(grabs) == 1
+    assert ThumbnailExtractor.select_best_frame('video.mp4', info={'duration': 0.0}) is None
+
+
+def test_encode_within_keeps_the_highest_quality_that_fits():
+    image = textured()
+    small = ThumbnailExtractor._encode_jpeg(image, thumbnail_extractor.JPEG_QUALITY_RANGE[0])
+    large = ThumbnailExtractor._encode_jpeg(image, thumbnail_extractor.JPEG_QUALITY_RANGE[1])
+    
+    assert ThumbnailExtractor._encode_within(image, len(large)) == large
+    cap = (len(small) + len(large)) // 2
+    data = ThumbnailExtractor._encode_within(image, cap)
+    assert len(small) < len(data) <= cap
+    # Nothing fits: the lowest quality is returned
+    assert ThumbnailExtractor._encode_within(image, 100, warn=False) == small
+
+
+def test_renditions_have_their_frame_size_and_stay_under_the_cap():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(720, 1280, 3), dtype=np.uint8)  # Noise compresses badly
+    renditions = {
+        'landscape': {'size': (640, 360), 'max_bytes': 60 * 1024},
+        'portrait': {'size': (360, 640), 'max_bytes': 30 * 1024},
+    }
+    
+    encoded = ThumbnailExtractor.encode_renditions(frame, renditions)
+    
+    for name, spec in renditions.items():
+        image = cv2.imdecode(np.frombuffer(encoded[name], dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert (image.shape[1], image.shape[0]) == spec['size']
+        assert len(encoded[name]) <= spec['max_bytes']
+
+
+def test_default_renditions_fit_the_platform_limits():
+    frame = cv2.resize(textured(), (1920, 1080), interpolation=cv2.INTER_NEAREST)
+    
+    encoded = ThumbnailExtractor.encode_renditions(frame)
+    
+    for name, spec in thumbnail_extractor.THUMBNAIL_RENDITIONS.items():
+        image = cv2.imdecode(np.frombuffer(encoded[name], dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert (image.shape[1], image.shape[0]) == spec['size']
+        assert len(encoded[name]) <= spec['max_bytes']
@@ -0,0 +1,238 @@
+"""
+Tests for the TikTok Content Posting API client (tiktok_uploader.py), against
+a local stub of the API.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import tiktok_uploader
+from tiktok_uploader import MB, TikTokUploader, plan_chunks
+
+
+class StubTikTok:
+    """Records requests and answers them like the Content Posting API."""
+    
+    def __init__(self):
+        self.requests = []
+        self.chunks = {}
+        self.statuses = ['PROCESSING_UPLOAD', 'PUBLISH_COMPLETE']
+        self.fail_chunks = {}  # first byte -> number of 500s to answer with
+        self.size = None
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+    
+    def paths(self, prefix):
+        return [path for _, path, _ in self.requests if path.startswith(prefix)]
+    
+    def _handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def _reply(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+                stub.requests.append(('POST', self.path, body))
+                ok = {'code': 'ok', 'message': '', 'log_id': 'log'}
+                if self.headers.get('Authorization') != 'Bearer token':
+                    self._reply(401, {'error': {'code': 'access_token_invalid', 'message': 'bad token'}})
+                elif self.path == '/v2/post/publish/creator_info/query/':
+                    self._reply(200, {'data': {'creator_username': 'cinrol',
+                                               'privacy_level_options': ['PUBLIC_TO_EVERYONE', 'SELF_ONLY']},
+                                      'error': ok})
+                elif self.path.endswith('/video/init/'):
+                    stub.size = body['source_info']['video_size']
+                    self._reply(200, {'data': {'publish_id': 'p_1', 'upload_url': f"{stub.url}/upload/p_1"},
+                                      'error': ok})
+                elif self.path == '/v2/post/publish/status/fetch/':
+                    status = stub.statuses.pop(0) if len(stub.statuses) > 1 else stub.statuses[0]
+                    data = {'status': status}
+                    if status == 'PUBLISH_COMPLETE':
+                        data['publicaly_available_post_id'] = [7300000000000000001]
+                    if status == 'FAILED':
+                        data['fail_reason'] = 'file_format_check_failed'
+                    self._reply(200, {'data': data, 'error': ok})
+                else:
+                    self._reply(404, {'error': {'code': 'not_found', 'message': self.path}})
+            
+            def do_PUT(self):
+                data = self.rfile.read(int(self.headers['Content-Length']))
+                content_range = self.headers['Content-Range']
+                stub.requests.append(('PUT', self.path, content_range))
+                first, last = map(int, content_range.split()[1].split('/')[0].split('-'))
+                if stub.fail_chunks.get(first):
+                    stub.fail_chunks[first] -= 1
+                    self._reply(500, {})
+                    return
+                assert len(data) == last - first + 1
+                stub.chunks[first] = data
+                received = sum(len(chunk) for chunk in stub.chunks.values())
+                self._reply(201 if received == stub.size else 206, {})
+        
+        return Handler
+    
+    def received(self):
+        return b''.join(self.chunks[first] for first in sorted(self.chunks))
+
+
+@pytest.fixture
+def stub():
+    server = StubTikTok()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def config(tmp_path, stub, monkeypatch):
+    config = SimpleNamespace(
+        tiktok_api_url=stub.url,
+        tiktok_access_token='token',
+        tiktok_refresh_token=None,
+        tiktok_client_key=None,
+        tiktok_client_secret=None,
+        tiktok_post_mode='direct',
+        tiktok_privacy_level='PUBLIC_TO_EVERYONE',
+        tiktok_chunk_size=1000,
+        tiktok_upload_workers=1,
+        state_file=lambda name: str(tmp_path / 'state' / name),
+        truncate_text=lambda text, max_length: text[:max_length],
+    )
+    (tmp_path / 'state').mkdir()
+    monkeypatch.setattr(tiktok_uploader, 'get_config', lambda: config)
+    # Small chunks and no waiting, so the tests stay fast
+    monkeypatch.setattr(tiktok_uploader, 'MIN_CHUNK_SIZE', 1000)
+    monkeypatch.setattr(tiktok_uploader, 'RETRY_BACKOFF', 0)
+    monkeypatch.setattr(tiktok_uploader, 'STATUS_POLL_INITIAL', 0.01)
+    return config
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'reel.mp4'
+    path.write_bytes(bytes(range(256)) * 18)  # 4608 bytes
+    return path
+
+
+def test_plan_chunks_follows_the_api_rules():
+    assert plan_chunks(3 * MB, 10 * MB) == [(0, 3 * MB - 1)]
+    assert plan_chunks(25 * MB + 7, 10 * MB) == [(0, 10 * MB - 1), (10 * MB, 25 * MB + 6)]
+    assert plan_chunks(20 * MB, 1 * MB)[0] == (0, 5 * MB - 1)
+    assert plan_chunks(200 * MB, 100 * MB)[0] == (0, 64 * MB - 1)
+    with pytest.raises(ValueError):
+        plan_chunks(0, 10 * MB)
+
+
+def test_plan_chunks_never_exceeds_1000_chunks():
+    size = 4 * 1024 * MB - 1
+    chunks = plan_chunks(size, 1)
+    assert len(chunks) <= 1000
+    assert chunks[-1][1] == size - 1
+
+
+def test_upload_sends_every_chunk_and_returns_the_post_url(config, stub, video):
+    url = TikTokUploader().upload_video(str(video), 'Episode 1', hashtags=['podcast'])
+    
+    assert url == 'https://www.tiktok.com/@cinrol/video/7300000000000000001'
+    assert stub.received() == video.read_bytes()
+    init = next(body for method, path, body in stub.requests if path == '/v2/post/publish/video/init/')
+    assert init['post_info'] == {'title': 'Episode 1\n\n#podcast', 'privacy_level': 'PUBLIC_TO_EVERYONE'}
+    assert init['source_info'] == {'source': 'FILE_UPLOAD', 'video_size': 4608,
+                                   'chunk_size': 1000, 'total_chunk_count': 4}
+    # The remainder goes with the last chunk
+    assert [r for m, p, r in stub.requests if m == 'PUT'][-1] == 'bytes 3000-4607/4608'
+    assert len(stub.paths('/v2/post/publish/status/fetch/')) == 2
+
+
+def test_parallel_chunks_send_the_last_chunk_last(config, stub, video):
+    config.tiktok_upload_workers = 3
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1')
+    
+    assert stub.received() == video.read_bytes()
+    assert [r for m, p, r in stub.requests if m == 'PUT'][-1] == 'bytes 3000-4607/4608'
+
+
+def test_transient_chunk_errors_are_retried(config, stub, video):
+    stub.fail_chunks = {1000: 2}
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1')
+    assert stub.received() == video.read_bytes()
+
+
+def test_interrupted_upload_resumes_from_the_next_chunk(config, stub, video, monkeypatch):
+    monkeypatch.setattr(tiktok_uploader, 'REQUEST_RETRIES', 1)
+    stub.fail_chunks = {2000: 1}
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1') is None
+    assert sorted(stub.chunks) == [0, 1000]
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1')
+    assert stub.received() == video.read_bytes()
+    assert len(stub.paths('/v2/post/publish/video/init/')) == 1
+    assert [r for m, p, r in stub.requests if m == 'PUT'].count('bytes 0-999/4608') == 1
+
+
+def test_failed_processing_is_reported_and_not_resumed(config, stub, video):
+    stub.statuses = ['PROCESSING_UPLOAD', 'FAILED']
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1') is None
+    
+    stub.statuses = ['PUBLISH_COMPLETE']
+    assert TikTokUploader().upload_video(str(video), 'Episode 1')
+    assert len(stub.paths('/v2/post/publish/video/init/')) == 2
+
+
+def test_disallowed_privacy_level_is_not_uploaded(config, stub, video):
+    config.tiktok_privacy_level = 'FOLLOWER_OF_CREATOR'
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1') is None
+    assert stub.paths('/v2/post/publish/video/init/') == []
+
+
+def test_inbox_mode_sends_a_draft(config, stub, video):
+    config.tiktok_post_mode = 'inbox'
+    stub.statuses = ['PROCESSING_UPLOAD', 'SEND_TO_USER_INBOX']
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1') == 'p_1'
+    assert stub.paths('/v2/post/publish/inbox/video/init/')
+    assert stub.paths('/v2/post/publish/creator_info/') == []
+
+
+def test_rejected_token_is_refreshed(config, stub, video, monkeypatch):
+    config.tiktok_access_token = 'expired'
+    config.tiktok_refresh_token = 'refresh'
+    config.tiktok_client_key = 'key'
+    config.tiktok_client_secret = 'secret'
+    refreshed = []
+    
+    def refresh(self):
+        refreshed.append(self._token['refresh_token'])
+        self._token = dict(self._token, access_token='token')
+    
+    monkeypatch.setattr(TikTokUploader, '_refresh_token', refresh)
+    
+    assert TikTokUploader().upload_video(str(video), 'Episode 1')
+    assert refreshed == ['refresh']
+
+
+def test_missing_token_is_a_setup_error(config):
+    config.tiktok_access_token = None
+    
+    with pytest.raises(ValueError, match='TIKTOK_ACCESS_TOKEN'):
+        TikTokUploader()
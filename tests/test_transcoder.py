@@ -0,0 +1,198 @@
+"""
+Tests for per-platform renditions and the faststart remux (transcoder.py).
+"""
+
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+
+import transcoder
+from artifact_cache import ArtifactCache
+from media_probe import probe_file
+from storage import StorageArea
+from test_media_probe import FTYP, MDAT, movie
+from transcoder import RENDITIONS, check_rendition, create_renditions, remux_faststart
+
+
+has_ffmpeg = pytest.mark.skipif(not shutil.which(transcoder.FFMPEG_BINARY), reason="ffmpeg is not installed")
+
+VERTICAL_1080P = {
+    'width': 1080, 'height': 1920, 'fps': 30.0, 'video_codec': 'h264', 'audio_codec': 'aac',
+    'bitrate': 8_000_000,
+}
+
+
+def write_video(path, size=(96, 160)):
+    """Write a short MPEG-4 Part 2 video; OpenCV puts its moov box after the media data."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 10, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MP4 here")
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        writer.write(rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+class FakeFFmpeg:
+    """Records ffmpeg command lines and writes their output files."""
+    
+    def __init__(self, monkeypatch):
+        self.commands = []
+        monkeypatch.setattr(transcoder.shutil, 'which', lambda binary: '/usr/bin/ffmpeg')
+        monkeypatch.setattr(transcoder.subprocess, 'run', self.run)
+    
+    def run(self, command, **kwargs):
+        self.commands.append(command)
+        for i, argument in enumerate(command):
+            if argument == '-f':
+                with open(command[i + 2], 'wb') as f:
+                    f.write(b'encoded')
+        return subprocess.CompletedProcess(command, 0, b'', b'')
+
+
+def test_conforming_source_needs_no_rendition():
+    for platform in RENDITIONS:
+        assert check_rendition(VERTICAL_1080P, platform) == []
+
+
+def test_rendition_reasons():
+    info = dict(VERTICAL_1080P, width=2160, height=3840, fps=120.0, video_codec='vp9', audio_codec='opus',
+                bitrate=30_000_000)
+    
+    assert check_rendition(info, 'youtube') == ["frame rate 120.00 is above 60 fps"]
+    assert check_rendition(info, 'instagram') == [
+        "2160x3840 is larger than 1080x1920",
+        "frame rate 120.00 is above 60 fps",
+        "video codec vp9 is not h264/hevc",
+        "audio codec opus is not aac",
+        "bitrate 30.0 Mbit/s is above 25 Mbit/s",
+    ]
+    # Landscape fits the same bounds turned sideways; unknown codecs are not checked
+    assert check_rendition({'width': 1920, 'height': 1080, 'fps': 30.0}, 'tiktok') == []
+
+
+def test_encode_params_follow_the_orientation_and_audio():
+    portrait = transcoder._encode_params(dict(VERTICAL_1080P, fps=120.0), RENDITIONS['instagram'])
+    landscape = transcoder._encode_params(dict(VERTICAL_1080P, width=3840, height=2160, audio_codec='opus'),
+                                          RENDITIONS['tiktok'])
+    
+    assert portrait['box'] == (1080, 1920) and landscape['box'] == (1920, 1080)
+    assert (portrait['fps'], landscape['fps']) == (60, None)
+    assert (portrait['copy_audio'], landscape['copy_audio']) == (True, False)
+    assert portrait['maxrate'] == int(25_000_000 * 0.8)
+
+
+def test_one_ffmpeg_run_encodes_every_rendition(monkeypatch, tmp_path):
+    ffmpeg = FakeFFmpeg(monkeypatch)
+    info = dict(VERTICAL_1080P, width=2160, height=3840, fps=50.0, audio_codec='opus')
+    
+    files = create_renditions('in.mp4', ['youtube', 'instagram', 'tiktok', 'vimeo'], str(tmp_path), info=info,
+                              threads=4)
+    
+    assert files['youtube'] == files['vimeo'] == 'in.mp4'  # Conforms / has no rendition spec
+    assert files['instagram'] != files['tiktok'] and files['instagram'].startswith(str(tmp_path))
+    command, = ffmpeg.commands
+    assert command.count('-i') == 1 and command[command.index('-i') + 1] == 'in.mp4'
+    graph = command[command.index('-filter_complex') + 1]
+    assert graph.startswith('[0:v]split=2[v0][v1];')
+    assert graph.count("scale=w='min(iw,1080)':h='min(ih,1920)'") == 2
+    # Two H.264 outputs that share the thread cap, with the opus audio re-encoded to AAC
+    assert command.count('libx264') == 2
+    assert sorted(command[i + 1] for i, arg in enumerate(command) if arg == '-maxrate') == ['16000000', '20000000']
+    assert [command[i + 1] for i, arg in enumerate(command) if arg == '-threads'] == ['4', '2', '2']
+    assert [command[i + 1] for i, arg in enumerate(command) if arg == '-c:a'] == ['aac', 'aac']
+    assert command.count('+faststart') == 2
+
+
+def test_identical_renditions_are_encoded_once_and_cached(monkeypatch, tmp_path):
+    ffmpeg = FakeFFmpeg(monkeypatch)
+    monkeypatch.setitem(RENDITIONS, 'reels', dict(RENDITIONS['instagram']))
+    source = tmp_path / 'in.mp4'
+    source.write_bytes(b'source')
+    cache = ArtifactCache(StorageArea('cache', str(tmp_path / 'cache')))
+    info = dict(VERTICAL_1080P, fps=120.0)
+    
+    first = create_renditions(str(source), ['instagram', 'reels'], str(tmp_path), cache, info=info)
+    second = create_renditions(str(source), ['instagram', 'reels'], str(tmp_path), cache, info=info)
+    
+    assert first == second
+    assert first['instagram'] == first['reels'] and first['instagram'].startswith(cache.area.path)
+    command, = ffmpeg.commands
+    assert command[command.index('-filter_complex') + 1].startswith('[0:v]split=1[v0];')
+    assert 'fps=60' in command[command.index('-filter_complex') + 1]
+    assert command[command.index('-c:a') + 1] == 'copy'
+
+
+def test_failed_encode_falls_back_to_the_source(monkeypatch, tmp_path):
+    monkeypatch.setattr(transcoder.shutil, 'which', lambda binary: '/usr/bin/ffmpeg')
+    monkeypatch.setattr(transcoder.subprocess, 'run',
+                        lambda command, **kwargs: subprocess.CompletedProcess(command, 1, b'', b'bad input'))
+    
+    files = create_renditions('in.mp4', ['instagram'], str(tmp_path), info=dict(VERTICAL_1080P, fps=120.0))
+    
+    assert files == {'instagram': 'in.mp4'}
+    assert list(tmp_path.iterdir()) == []
+
+
+@has_ffmpeg
+def test_rendition_is_h264_with_faststart(tmp_path):
+    source = write_video(tmp_path / 'source.mp4')
+    
+    files = create_renditions(source, ['instagram'], str(tmp_path))
+    
+    rendition = probe_file(files['instagram'])
+    assert files['instagram'] != source
+    assert (rendition.video_codec, rendition.width, rendition.height) == ('h264', 96, 160)
+    assert rendition.faststart
+
+
+def test_remux_moves_the_moov_box_with_a_stream_copy(monkeypatch, tmp_path):
+    ffmpeg = FakeFFmpeg(monkeypatch)
+    source = tmp_path / 'export.mp4'
+    source.write_bytes(FTYP + MDAT + movie())
+    assert probe_file(str(source)).faststart is False
+    
+    output = remux_faststart(str(source), str(tmp_path))
+    
+    command, = ffmpeg.commands
+    assert output == str(tmp_path / 'export_faststart.mp4')
+    assert command[command.index('-i') + 1] == str(source)
+    assert command[command.index('-c') + 1] == 'copy'
+    assert command[command.index('-movflags') + 1] == '+faststart'
+    assert command[-3:] == ['-f', 'mp4', output]
+
+
+def test_remux_skips_faststart_sources_and_reuses_the_cache(monkeypatch, tmp_path):
+    ffmpeg = FakeFFmpeg(monkeypatch)
+    ready = tmp_path / 'ready.mp4'
+    ready.write_bytes(FTYP + movie() + MDAT)
+    source = tmp_path / 'export.mov'
+    source.write_bytes(FTYP + MDAT + movie())
+    cache = ArtifactCache(StorageArea('cache', str(tmp_path / 'cache')))
+    
+    assert remux_faststart(str(ready), str(tmp_path)) == str(ready)
+    assert ffmpeg.commands == []
+    
+    first = remux_faststart(str(source), str(tmp_path), cache)
+    second = remux_faststart(str(source), str(tmp_path), cache)
+    
+    assert first == second and first.startswith(cache.area.path) and first.endswith('.mov')
+    assert len(ffmpeg.commands) == 1 and ffmpeg.commands[0][-3:-1] == ['-f', 'mov']
+    # The copy is identified by its source, so renditions of it are keyed without hashing it
+    assert cache.source_hash(first).startswith('faststart:')
+
+
+@has_ffmpeg
+def test_remuxed_file_has_moov_before_mdat(tmp_path):
+    source = write_video(tmp_path / 'source.mp4')
+    assert probe_file(source).faststart is False
+    
+    output = remux_faststart(source, str(tmp_path))
+    
+    remuxed = probe_file(output)
+    assert output != source and remuxed.faststart
+    assert (remuxed.width, remuxed.height, remuxed.video_codec) == (96, 160, 'mpeg4')
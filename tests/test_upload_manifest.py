@@ -0,0 +1,126 @@
+"""
+Tests for upload manifests and the results log (upload_manifest.py).
+"""
+
+import json
+
+import pytest
+
+from upload_manifest import ResultsLog, entry_id, load_manifest, parse_platforms
+
+
+def write_lines(path, *entries):
+    path.write_text('\n'.join(json.dumps(e) for e in entries) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_parse_platforms():
+    assert parse_platforms(None) == ['youtube']
+    assert parse_platforms('all') == ['youtube', 'instagram', 'tiktok']
+    assert parse_platforms('Instagram, youtube,instagram') == ['instagram', 'youtube']
+    assert parse_platforms(['tiktok']) == ['tiktok']
+    with pytest.raises(ValueError, match="Unknown platform"):
+        parse_platforms('vimeo')
+
+
+def test_entry_id_is_stable_without_an_id():
+    entry = {'folder': 'f', 'title': 't', 'platforms': ['youtube']}
+    assert entry_id(entry) == entry_id(dict(entry))
+    assert entry_id(entry) != entry_id(dict(entry, title='other'))
+    assert entry_id(dict(entry, id=7)) == '7'
+
+
+def test_load_jsonl_manifest(tmp_path):
+    path = write_lines(
+        tmp_path / 'uploads.jsonl',
+        {'id': 'a', 'folder': 'https://drive/a', 'title': 'A', 'platforms': 'youtube'},
+        {'video': 'b.mp4', 'caption': 'B', 'platforms': 'instagram,tiktok'},
+    )
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('# comment\n\n')
+    
+    entries = load_manifest(path)
+    
+    assert [e['platforms'] for e in entries] == [['youtube'], ['instagram', 'tiktok']]
+    assert entries[0]['id'] == 'a'
+    assert entries[1]['id'] == entry_id(entries[1])
+
+
+def test_load_csv_manifest(tmp_path):
+    path = tmp_path / 'uploads.csv'
+    path.write_text(
+        'id,folder,title,caption,platforms\n'
+        'x, https://drive/x ,Title,Caption,all\n',
+        encoding='utf-8'
+    )
+    
+    entries = load_manifest(str(path))
+    
+    assert entries[0]['folder'] == 'https://drive/x'
+    assert entries[0]['platforms'] == ['youtube', 'instagram', 'tiktok']
+
+
+@pytest.mark.parametrize('entry, message', [
+    ({'title': 'T'}, "either 'folder' or 'video'"),
+    ({'video': 'v.mp4', 'platforms': 'youtube'}, "'title' is required"),
+    ({'video': 'v.mp4', 'platforms': 'instagram'}, "'caption' is required"),
+    ({'video': 'v.mp4', 'title': 'T', 'platforms': 'vimeo'}, "Unknown platform"),
+])
+def test_invalid_entries_are_rejected_with_their_line(tmp_path, entry, message):
+    path = write_lines(tmp_path / 'uploads.jsonl', entry)
+    
+    with pytest.raises(ValueError, match=message) as error:
+        load_manifest(path)
+    assert 'uploads.jsonl:1' in str(error.value)
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    entry = {'id': 'same', 'video': 'v.mp4', 'title': 'T'}
+    path = write_lines(tmp_path / 'uploads.jsonl', entry, entry)
+    
+    with pytest.raises(ValueError, match="duplicate entry ids: same"):
+        load_manifest(path)
+
+
+def test_results_log_tracks_completed_entries(tmp_path):
+    log = ResultsLog(str(tmp_path / 'results.jsonl'))
+    assert log.completed_ids() == set()
+    
+    log.record({'id': 'a', 'status': 'failed'})
+    log.record({'id': 'b', 'status': 'ok'})
+    log.record({'id': 'a', 'status': 'ok'})
+    log.record({'id': 'b', 'status': 'failed'})
+    
+    # The most recent result of each entry counts
+    assert log.completed_ids() == {'a'}
+
+
+def test_completed_platforms_merge_every_run(tmp_path):
+    log = ResultsLog(str(tmp_path / 'results.jsonl'))
+    log.record({'id': 'a', 'status': 'failed', 'platforms': ['youtube', 'tiktok'],
+                'results': {'youtube': 'vid', 'tiktok': None}})
+    log.record({'id': 'a', 'status': 'failed', 'platforms': ['tiktok'],
+                'results': {'tiktok': None}})
+    log.record({'id': 'b', 'status': 'ok', 'platforms': ['instagram']})
+    
+    assert log.completed_platforms() == {'a': {'youtube'}, 'b': {'instagram'}}
+
+
+def test_results_log_survives_a_partial_line(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_text('{"id": "a", "status": "ok"}\n{"id": "b", "sta', encoding='utf-8')
+    log = ResultsLog(str(path))
+    
+    log.record({'id': 'c', 'status': 'ok'})
+    
+    assert log.completed_ids() == {'a', 'c'}
+    assert path.read_text(encoding='utf-8').splitlines()[-1] == '{"id": "c", "status": "ok"}'
+
+
+def test_completed_uploads_keep_the_urls_of_every_run(tmp_path):
+    log = ResultsLog(str(tmp_path / 'results.jsonl'))
+    log.record({'id': 'a', 'status': 'failed', 'platforms': ['youtube', 'tiktok'],
+                'results': {'youtube': 'https://youtu.be/1', 'tiktok': None}})
+    log.record({'id': 'a', 'status': 'ok', 'platforms': ['tiktok'], 'results': {'tiktok': 'posted'}})
+    
+    assert log.completed_uploads() == {'a': {'youtube': 'https://youtu.be/1', 'tiktok': 'posted'}}
@@ -4,128 +4,500 @@ Thumbnail extractor for generating cover images from videos.
 
 import cv2
 import os
-from typing import Optional
-from PIL import Image
+import shutil
+import subprocess
+import time
+import numpy as np
+import media_probe
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from artifact_cache import ArtifactCache
+
+
+# ffmpeg is used for frame grabs when available (it is installed in CI);
+# OpenCV is the fallback
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FRAME_GRAB_TIMEOUT = 60
+
+# Best-frame selection: number of candidate keyframes, the width they are
+# scored at, and the time allowed for sampling and scoring them
+THUMBNAIL_CANDIDATES = 12
+THUMBNAIL_SCORING_WIDTH = 320
+THUMBNAIL_SELECTION_BUDGET = 1.0
+
+# Thumbnail renditions per platform: frame size and maximum file size
+THUMBNAIL_RENDITIONS = {
+    'youtube': {'size': (1280, 720), 'max_bytes': 2 * 1024 * 1024},  # 16:9, 2 MB API limit
+    'instagram': {'size': (1080, 1920), 'max_bytes': 8 * 1024 * 1024},  # 9:16 Reels cover
+}
+JPEG_QUALITY_RANGE = (50, 95)
 
 
 class ThumbnailExtractor:
     """Extracts thumbnail images from video files."""
     
     @staticmethod
-    def extract_frame(video_path: str, output_path: str, timestamp: float = 1.0) -> bool:
+    def grab_frame(video_path: str, timestamp: float = 1.0, keyframes_only: bool = False,
+                   max_width: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Decode a single frame as a BGR NumPy array. See grab_frames.
         """
-        Extract a frame from video at specified timestamp.
+        return ThumbnailExtractor.grab_frames(video_path, [timestamp], keyframes_only, max_width)[0]
+    
+    @staticmethod
+    def grab_frames(video_path: str, timestamps: Sequence[float], keyframes_only: bool = False,
+                    max_width: Optional[int] = None, workers: int = 4) -> List[Optional[np.ndarray]]:
+        """
+        Decode frames at the given timestamps without writing them to disk.
+        
+        With ffmpeg, every grab seeks in the container to the keyframe before
+        the timestamp and decodes from there, so the cost depends on the GOP
+        length rather than on the position in the video. With keyframes_only,
+        the keyframe itself is returned and no other frame is decoded, which
+        is the cheapest way to sample many candidates.
         
         Args:
             video_path: Path to the video file
-            output_path: Path to save the thumbnail image
-            timestamp: Timestamp in seconds to extract frame (default: 1.0)
+            timestamps: Timestamps in seconds
+            keyframes_only: Return the nearest preceding keyframe instead of
+                the exact frame
+            max_width: Optional width to downscale frames to
+            workers: Number of grabs decoded at the same time
         
         Returns:
-            True if successful, False otherwise
+            List of BGR frames (height x width x 3, uint8), with None for
+            timestamps that could not be decoded
         """
-        try:
-            # Open video file
-            video = cv2.VideoCapture(video_path)
+        if shutil.which(FFMPEG_BINARY):
+            def grab(timestamp: float) -> Optional[np.ndarray]:
+                return ThumbnailExtractor._ffmpeg_frame(video_path, timestamp, keyframes_only, max_width)
             
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(timestamps)))) as pool:
+                return list(pool.map(grab, timestamps))
+        
+        return ThumbnailExtractor._opencv_frames(video_path, timestamps, max_width)
+    
+    @staticmethod
+    def score_frames(frames: Sequence[np.ndarray]) -> np.ndarray:
+        """
+        Score candidate thumbnail frames; higher is better.
+        
+        All frames are scored at once on a stacked array. The score combines:
+            sharpness  Variance of the Laplacian, relative to the sharpest candidate
+            exposure   Mean brightness near mid-grey, few clipped pixels
+            contrast   Standard deviation of brightness
+            skin       Share of skin-toned pixels (a cheap stand-in for faces)
+        
+        Args:
+            frames: BGR frames of the same size
+        
+        Returns:
+            Array with one score between 0 and 1 per frame
+        """
+        stack = np.stack(frames).astype(np.float32) / 255.0  # (n, h, w, 3), BGR
+        blue, green, red = stack[..., 0], stack[..., 1], stack[..., 2]
+        luma = 0.299 * red + 0.587 * green + 0.114 * blue
+        
+        # 4-neighbour Laplacian over the interior of every frame
+        laplacian = (4 * luma[:, 1:-1, 1:-1] - luma[:, :-2, 1:-1] - luma[:, 2:, 1:-1]
+                     - luma[:, 1:-1, :-2] - luma[:, 1:-1, 2:])
+        sharpness = laplacian.reshape(len(frames), -1).var(axis=1)
+        sharpness = sharpness / max(float(sharpness.max()), 1e-6)
+        
+        flat = luma.reshape(len(frames), -1)
+        mean = flat.mean(axis=1)
+        clipped = ((flat < 0.02) | (flat > 0.98)).mean(axis=1)
+        exposure = np.clip(1.0 - 2.0 * np.abs(mean - 0.5) - clipped, 0.0, 1.0)
+        contrast = np.clip(flat.std(axis=1) / 0.25, 0.0, 1.0)
+        
+        # Skin tones in YCbCr (Chai & Ngan): 133 <= Cr <= 173, 77 <= Cb <= 127
+        cr = (red - luma) * 0.713 + 0.5
+        cb = (blue - luma) * 0.564 + 0.5
+        skin_mask = (cr >= 133 / 255) & (cr <= 173 / 255) & (cb >= 77 / 255) & (cb <= 127 / 255)
+        skin = np.clip(skin_mask.reshape(len(frames), -1).mean(axis=1) / 0.15, 0.0, 1.0)
+        
+        return 0.4 * sharpness + 0.2 * exposure + 0.2 * contrast + 0.2 * skin
+    
+    @staticmethod
+    def select_best_frame(video_path: str, candidates: int = THUMBNAIL_CANDIDATES,
+                          budget: float = THUMBNAIL_SELECTION_BUDGET,
+                          info: Optional[dict] = None) -> Optional[Tuple[float, float]]:
+        """
+        Pick the best thumbnail timestamp among evenly spaced keyframes.
+        
+        Candidates are decoded keyframe-only at a small size. If sampling
+        runs past the time budget, the candidates decoded so far are scored.
+        
+        Args:
+            video_path: Path to the video file
+            candidates: Number of candidate frames to sample
+            budget: Seconds allowed for sampling and scoring
+            info: Probe result, if already known (e.g. for a remote file)
+        
+        Returns:
+            Tuple of (timestamp, score), or None if no frame could be decoded
+        """
+        started = time.monotonic()
+        info = info or ThumbnailExtractor.probe_video(video_path)
+        if info is None or info['duration'] <= 0:
+            return None
+        
+        # Skip the first and last 5% where fades and titles usually are
+        duration = info['duration']
+        step = duration * 0.9 / candidates
+        timestamps = [duration * 0.05 + step * (i + 0.5) for i in range(candidates)]
+        
+        sampled, frames = [], []
+        batch = 4
+        for i in range(0, len(timestamps), batch):
+            chunk = timestamps[i:i + batch]
+            for timestamp, frame in zip(chunk, ThumbnailExtractor.grab_frames(
+                    video_path, chunk, keyframes_only=True, max_width=THUMBNAIL_SCORING_WIDTH, workers=batch)):
+                if frame is not None and (not frames or frame.shape == frames[0].shape):
+                    sampled.append(timestamp)
+                    frames.append(frame)
+            if frames and time.monotonic() - started > budget:
+                print(f"Thumbnail selection budget reached after {len(frames)} candidates")
+                break
+        
+        if not frames:
+            return None
+        
+        scores = ThumbnailExtractor.score_frames(frames)
+        best = int(np.argmax(scores))
+        print(f"Best thumbnail candidate at {sampled[best]:.2f}s (score {scores[best]:.2f}, "
+              f"{len(frames)} candidates in {time.monotonic() - started:.2f}s)")
+        return sampled[best], float(scores[best])
+    
+    @staticmethod
+    def _ffmpeg_frame(video_path: str, timestamp: float, keyframes_only: bool,
+                      max_width: Optional[int]) -> Optional[np.ndarray]:
+        """Grab one frame through ffmpeg input seeking, piped back as BMP."""
+        command = [FFMPEG_BINARY, '-v', 'error', '-nostdin']
+        if keyframes_only:
+            # Output the keyframe the seek lands on. Skipping non-key frames
+            # saves decoding, but makes ffmpeg read ahead to the next keyframe,
+            # so it is only used for local files (see remote_file.py)
+            command += ['-noaccurate_seek']
+            if '://' not in video_path:
+                command += ['-skip_frame', 'nokey']
+        # -ss before -i seeks in the demuxer instead of decoding up to the timestamp
+        command += ['-ss', f"{max(0.0, timestamp):.3f}", '-i', video_path, '-frames:v', '1', '-an']
+        if max_width:
+            command += ['-vf', f"scale='min({max_width},iw)':-2"]
+        # BMP is uncompressed, so decoding it is a copy, and unlike rawvideo
+        # it carries the frame size (which changes with rotation metadata)
+        command += ['-f', 'image2pipe', '-c:v', 'bmp', '-']
+        
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=FRAME_GRAB_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            print(f"Warning: Frame grab at {timestamp:.2f}s timed out")
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return cv2.imdecode(np.frombuffer(result.stdout, dtype=np.uint8), cv2.IMREAD_COLOR)
+    
+    @staticmethod
+    def _opencv_frames(video_path: str, timestamps: Sequence[float],
+                       max_width: Optional[int]) -> List[Optional[np.ndarray]]:
+        """Grab frames with OpenCV when ffmpeg is not installed."""
+        frames = []
+        video = cv2.VideoCapture(video_path)
+        try:
             if not video.isOpened():
                 print(f"Error: Could not open video file: {video_path}")
-                return False
-            
-            # Get video properties
-            fps = video.get(cv2.CAP_PROP_FPS)
-            total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
-            
-            print(f"Video info: {duration:.2f}s duration, {fps:.2f} fps")
-            
-            # Calculate frame number for the timestamp
-            frame_number = int(timestamp * fps)
-            
-            # Make sure we don't exceed video duration
-            if frame_number >= total_frames:
-                frame_number = min(int(fps), total_frames - 1)  # Use 1 second or last frame
-                print(f"Adjusted frame number to {frame_number}")
-            
-            # Set video position
-            video.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                return [None] * len(timestamps)
             
-            # Read the frame
-            success, frame = video.read()
+            for timestamp in timestamps:
+                video.set(cv2.CAP_PROP_POS_MSEC, max(0.0, timestamp) * 1000)
+                success, frame = video.read()
+                if success and max_width and frame.shape[1] > max_width:
+                    height = int(frame.shape[0] * max_width / frame.shape[1])
+                    frame = cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+                frames.append(frame if success else None)
+        finally:
             video.release()
-            
-            if not success:
-                print(f"Error: Could not read frame at timestamp {timestamp}s")
-                return False
-            
-            # Save the frame as image
-            cv2.imwrite(output_path, frame)
-            print(f"Extracted thumbnail to: {output_path}")
-            
-            # Optimize the image (optional - reduce file size)
-            ThumbnailExtractor._optimize_image(output_path)
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error extracting thumbnail: {e}")
-            return False
+        return frames
     
     @staticmethod
-    def _optimize_image(image_path: str, max_width: int = 1920, quality: int = 85):
+    def probe_video(video_path: str) -> Optional[dict]:
         """
-        Optimize image by resizing and compressing.
+        Read basic stream properties without decoding any frames.
+        
+        MP4/MOV files are probed from their moov box (see media_probe.py);
+        other containers are opened with OpenCV. Both only read the headers,
+        so the result is not cached.
         
         Args:
-            image_path: Path to the image file
-            max_width: Maximum width in pixels
-            quality: JPEG quality (1-100)
+            video_path: Path to the video file
+        
+        Returns:
+            Dict with duration, fps, width, height and frame_count (plus codec
+            details for MP4/MOV), or None if the file could not be opened
         """
+        media = media_probe.probe_file(video_path)
+        if media is not None and media.video_track is not None:
+            return media.as_dict()
+        
+        video = cv2.VideoCapture(video_path)
         try:
-            img = Image.open(image_path)
-            
-            # Resize if too large
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Convert to RGB if necessary (for JPEG)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Save optimized version
-            img.save(image_path, 'JPEG', quality=quality, optimize=True)
-            print(f"Optimized thumbnail image")
+            if not video.isOpened():
+                print(f"Error: Could not open video file: {video_path}")
+                return None
             
-        except Exception as e:
-            print(f"Warning: Could not optimize image: {e}")
+            fps = video.get(cv2.CAP_PROP_FPS)
+            frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            return {
+                'duration': frame_count / fps if fps > 0 else 0.0,
+                'fps': fps,
+                'width': int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                'height': int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                'frame_count': frame_count,
+            }
+        finally:
+            video.release()
     
     @staticmethod
-    def create_thumbnail(video_path: str, cover_path: Optional[str], temp_dir: str) -> Optional[str]:
+    def encode_renditions(image: np.ndarray, renditions: Optional[Dict[str, dict]] = None) -> Dict[str, bytes]:
         """
-        Create or use thumbnail for video upload.
+        Encode every platform rendition of a decoded frame in memory.
         
-        If cover_path is provided, use it. Otherwise, extract from video.
+        Each rendition is cropped (or, for very different aspect ratios, fitted
+        over a blurred fill) to its frame size and encoded once as JPEG, at the
+        highest quality that stays within its size limit.
         
         Args:
-            video_path: Path to the video file
-            cover_path: Path to custom cover image (can be None)
-            temp_dir: Directory to save extracted thumbnail
+            image: BGR frame or image
+            renditions: Rendition specs (default: THUMBNAIL_RENDITIONS)
+        
+        Returns:
+            Dict mapping rendition name to JPEG bytes
+        """
+        renditions = renditions or THUMBNAIL_RENDITIONS
+        encoded = {}
+        for name, spec in renditions.items():
+            fitted = ThumbnailExtractor._fit(image, *spec['size'])
+            encoded[name] = ThumbnailExtractor._encode_within(fitted, spec['max_bytes'])
+        return encoded
+    
+    @staticmethod
+    def _fit(image: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Crop or pad an image to the target aspect ratio and resize it."""
+        source_height, source_width = image.shape[:2]
+        target_aspect = width / height
+        source_aspect = source_width / source_height
+        
+        # Close enough: crop the centre to the target aspect ratio
+        if abs(source_aspect - target_aspect) / target_aspect <= 0.25:
+            if source_aspect > target_aspect:
+                crop = int(round(source_height * target_aspect))
+                x = (source_width - crop) // 2
+                image = image[:, x:x + crop]
+            else:
+                crop = int(round(source_width / target_aspect))
+                y = (source_height - crop) // 2
+                image = image[y:y + crop]
+            return ThumbnailExtractor._resize(image, width, height)
+        
+        # Otherwise fit the whole frame over a blurred, cropped copy of itself
+        background = ThumbnailExtractor._fit_crop(image, width // 8, height // 8)
+        background = cv2.GaussianBlur(background, (0, 0), 6)
+        background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+        scale = min(width / source_width, height / source_height)
+        fg_width, fg_height = int(source_width * scale), int(source_height * scale)
+        foreground = ThumbnailExtractor._resize(image, fg_width, fg_height)
+        x, y = (width - fg_width) // 2, (height - fg_height) // 2
+        background[y:y + fg_height, x:x + fg_width] = foreground
+        return background
+    
+    @staticmethod
+    def _fit_crop(image: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Centre-crop an image to fill the target size, then resize it."""
+        source_height, source_width = image.shape[:2]
+        scale = max(width / source_width, height / source_height)
+        crop_width, crop_height = int(width / scale), int(height / scale)
+        x, y = (source_width - crop_width) // 2, (source_height - crop_height) // 2
+        return ThumbnailExtractor._resize(image[y:y + crop_height, x:x + crop_width], width, height)
+    
+    @staticmethod
+    def _resize(image: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Resize with area averaging when shrinking and Lanczos when enlarging."""
+        if (image.shape[1], image.shape[0]) == (width, height):
+            return image
+        interpolation = cv2.INTER_AREA if width < image.shape[1] else cv2.INTER_LANCZOS4
+        return cv2.resize(image, (width, height), interpolation=interpolation)
+    
+    @staticmethod
+    def _encode_jpeg(image: np.ndarray, quality: int) -> bytes:
+        """Encode a BGR image as an optimized JPEG in memory."""
+        success, buffer = cv2.imencode(
+            '.jpg', image,
+            [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        )
+        if not success:
+            raise ValueError("Could not encode image as JPEG")
+        return buffer.tobytes()
+    
+    @staticmethod
+    def _encode_within(image: np.ndarray, max_bytes: int, warn: bool = True) -> bytes:
+        """
+        Encode at the highest JPEG quality that fits in max_bytes.
+        
+        Binary search over JPEG_QUALITY_RANGE, so at most a handful of encodes.
+        If even the lowest quality is too large, that encode is returned.
+        """
+        low, high = JPEG_QUALITY_RANGE
+        best = ThumbnailExtractor._encode_jpeg(image, high)
+        if len(best) <= max_bytes:
+            return best
+        
+        best = None
+        while low <= high:
+            quality = (low + high) // 2
+            data = ThumbnailExtractor._encode_jpeg(image, quality)
+            if len(data) <= max_bytes:
+                best = data
+                low = quality + 1
+            else:
+                high = quality - 1
+        
+        if best is None:
+            if warn:
+                print(f"Warning: Thumbnail is larger than {max_bytes // 1024} KB even at quality {JPEG_QUALITY_RANGE[0]}")
+            best = ThumbnailExtractor._encode_jpeg(image, JPEG_QUALITY_RANGE[0])
+        return best
+    
+    @staticmethod
+    def create_thumbnail(video_path: str, cover_path: Optional[str], temp_dir: str,
+                         cache: Optional['ArtifactCache'] = None) -> Optional[str]:
+        """
+        Create the YouTube thumbnail for a video. See create_thumbnails.
         
         Returns:
             Path to the thumbnail image, or None if failed
         """
+        return ThumbnailExtractor.create_thumbnails(video_path, cover_path, temp_dir, cache).get('youtube')
+    
+    @staticmethod
+    def create_thumbnails(video_path: str, cover_path: Optional[str], temp_dir: str,
+                          cache: Optional['ArtifactCache'] = None, info: Optional[dict] = None,
+                          source_hash: Optional[str] = None) -> Dict[str, str]:
+        """
+        Create a thumbnail rendition for every platform.
+        
+        If cover_path is provided, it is used unchanged for every platform
+        (re-encoded only where it is over the size limit). Otherwise, the
+        best frame of the video is cropped to each platform's frame size.
+        
+        Args:
+            video_path: Path or URL of the video file (see remote_file.py)
+            cover_path: Path to custom cover image (can be None)
+            temp_dir: Directory to save the thumbnails (when not cached)
+            cache: Optional artifact cache; renditions of a source that was
+                seen before are reused instead of decoded and encoded again.
+                Only for local files, unless source_hash is given.
+            info: Probe result, if already known
+            source_hash: Content hash of the video for the cache key (see
+                ArtifactCache.key), e.g. Drive's checksum of a remote file
+        
+        Returns:
+            Dict mapping platform to thumbnail path (empty if failed)
+        """
         if cover_path and os.path.exists(cover_path):
             print(f"Using custom cover image: {cover_path}")
-            return cover_path
-        
-        # Extract thumbnail from video
+            return ThumbnailExtractor._cover_renditions(cover_path, temp_dir, cache)
         print("No custom cover found, extracting thumbnail from video...")
-        thumbnail_path = os.path.join(temp_dir, "thumbnail.jpg")
         
-        if ThumbnailExtractor.extract_frame(video_path, thumbnail_path, timestamp=1.0):
-            return thumbnail_path
+        def render() -> Dict[str, bytes]:
+            image = ThumbnailExtractor._thumbnail_image(video_path, info)
+            return ThumbnailExtractor.encode_renditions(image) if image is not None else {}
         
-        return None
-
+        thumbnails = {}
+        if cache is not None:
+            params = {'renditions': THUMBNAIL_RENDITIONS, 'quality': JPEG_QUALITY_RANGE}
+            key = cache.key(video_path, 'thumbnail', params, source_hash=source_hash)
+            with cache.lock(key):
+                cached = {name: cache.lookup(key, f"_{name}.jpg") for name in THUMBNAIL_RENDITIONS}
+                if all(cached.values()):
+                    print("Using cached thumbnails")
+                    return cached
+                for name, data in render().items():
+                    thumbnails[name] = cache.put_bytes(key, data, f"_{name}.jpg")
+                    print(f"Created {name} thumbnail: {thumbnails[name]} ({len(data) // 1024} KB)")
+        else:
+            stem = os.path.splitext(os.path.basename(video_path))[0]
+            for name, data in render().items():
+                path = os.path.join(temp_dir, f"{stem}_{name}_thumbnail.jpg")
+                with open(path, 'wb') as f:
+                    f.write(data)
+                print(f"Created {name} thumbnail: {path} ({len(data) // 1024} KB)")
+                thumbnails[name] = path
+        return thumbnails
+    
+    @staticmethod
+    def _cover_renditions(cover_path: str, temp_dir: str,
+                          cache: Optional['ArtifactCache'] = None) -> Dict[str, str]:
+        """
+        Use a custom cover for every platform without cropping or resizing it.
+        
+        Covers are designed by hand, so they are passed on as they are. A cover
+        over a platform's size limit is re-encoded to fit, and scaled down only
+        if the lowest JPEG quality is still too large.
+        """
+        size = os.path.getsize(cover_path)
+        covers = {name: cover_path for name, spec in THUMBNAIL_RENDITIONS.items() if size <= spec['max_bytes']}
+        oversized = {name: spec['max_bytes'] for name, spec in THUMBNAIL_RENDITIONS.items() if name not in covers}
+        if not oversized:
+            return covers
+        
+        image = cv2.imread(cover_path, cv2.IMREAD_COLOR)
+        if image is None:
+            # Not an image OpenCV can read: pass it on unchanged
+            print(f"Warning: Could not read cover image, using it unchanged ({size // 1024} KB)")
+            return {name: cover_path for name in THUMBNAIL_RENDITIONS}
+        
+        stem = os.path.splitext(os.path.basename(cover_path))[0]
+        for name, max_bytes in oversized.items():
+            if cache is not None:
+                key = cache.key(cover_path, 'cover', {'max_bytes': max_bytes, 'quality': JPEG_QUALITY_RANGE})
+                with cache.lock(key):
+                    path = cache.lookup(key, '.jpg')
+                    if not path:
+                        data = ThumbnailExtractor._shrink_within(image, max_bytes)
+                        path = cache.put_bytes(key, data, '.jpg')
+            else:
+                data = ThumbnailExtractor._shrink_within(image, max_bytes)
+                path = os.path.join(temp_dir, f"{stem}_{name}_cover.jpg")
+                with open(path, 'wb') as f:
+                    f.write(data)
+            print(f"Cover is over the {name} limit of {max_bytes // (1024 * 1024)} MB, "
+                  f"re-encoded: {path} ({os.path.getsize(path) // 1024} KB)")
+            covers[name] = path
+        return covers
+    
+    @staticmethod
+    def _shrink_within(image: np.ndarray, max_bytes: int) -> bytes:
+        """Encode within max_bytes at full size, scaling down only when even the lowest quality is too large."""
+        while True:
+            data = ThumbnailExtractor._encode_within(image, max_bytes, warn=False)
+            height, width = image.shape[:2]
+            if len(data) <= max_bytes or min(width, height) <= 360:
+                return data
+            image = ThumbnailExtractor._resize(image, int(width * 0.8), int(height * 0.8))
+    
+    @staticmethod
+    def _thumbnail_image(video_path: str, info: Optional[dict] = None) -> Optional[np.ndarray]:
+        """Decode the best frame of the video."""
+        image = None
+        best = ThumbnailExtractor.select_best_frame(video_path, info=info)
+        if best is not None:
+            # Same keyframe as the scored candidate, now at full size
+            image = ThumbnailExtractor.grab_frame(video_path, best[0], keyframes_only=True)
+        if image is None:
+            image = ThumbnailExtractor.grab_frame(video_path, 1.0)
+        if image is None:
+            print("Error: Could not extract a frame for the thumbnail")
+        return image
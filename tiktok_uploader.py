@@ -1,22 +1,342 @@
 """
-TikTok uploader for posting videos.
-Note: TikTok's official API has limited access. This uses unofficial methods.
+TikTok uploader using the Content Posting API.
+
+An upload is initialized with the file size and chunk layout, the file is sent
+to the returned upload URL in chunks with Content-Range PUTs, and the post's
+status is polled until TikTok has processed it. Progress is kept in the state
+area, so an interrupted upload resumes from the first unacknowledged chunk for
+as long as its upload URL is valid.
 """
 
+import hashlib
+import json
 import os
-from typing import Optional
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
 from config import get_config
+from run_log import Progress
+from storage import atomic_write_bytes
+
+
+MB = 1024 * 1024
+
+# Chunk rules of the media transfer API: chunks are 5-64 MB, the remainder is
+# sent with the last chunk (so it can be up to 128 MB), at most 1000 chunks,
+# and files under 5 MB go in a single chunk
+MIN_CHUNK_SIZE = 5 * MB
+MAX_CHUNK_SIZE = 64 * MB
+MAX_CHUNKS = 1000
+
+# Upload URLs expire an hour after init; don't resume one that is nearly stale
+UPLOAD_URL_TTL = 55 * 60
+
+# Attempts per request (API call or chunk) on connection errors, 429 and 5xx
+REQUEST_RETRIES = 4
+RETRY_BACKOFF = 1.0
+REQUEST_TIMEOUT = 120
+
+# Status polling: first delay, growth factor, longest delay and total wait
+STATUS_POLL_INITIAL = 2.0
+STATUS_POLL_FACTOR = 1.5
+STATUS_POLL_MAX = 30.0
+STATUS_TIMEOUT = 15 * 60
+
+# Longest caption accepted for a post
+CAPTION_MAX = 2200
+
+# Refresh the access token this long before it expires
+TOKEN_REFRESH_MARGIN = 300
+
+
+class TikTokAPIError(Exception):
+    """Raised when the Content Posting API rejects a request."""
+    
+    def __init__(self, code: str, message: str = "", log_id: Optional[str] = None):
+        self.code = code
+        self.log_id = log_id
+        super().__init__(f"{code}: {message}" + (f" (log id {log_id})" if log_id else ""))
+
+
+def plan_chunks(size: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into the chunks the media transfer API accepts.
+    
+    Args:
+        size: File size in bytes
+        chunk_size: Preferred chunk size in bytes (clamped to 5-64 MB, and
+            raised if the file would need more than 1000 chunks)
+    
+    Returns:
+        List of (first byte, last byte) pairs, inclusive
+    """
+    if size <= 0:
+        raise ValueError("Cannot upload an empty file")
+    if size < MIN_CHUNK_SIZE:
+        return [(0, size - 1)]
+    
+    chunk_size = min(max(chunk_size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE, size)
+    chunk_size = max(chunk_size, -(-size // MAX_CHUNKS))
+    count = size // chunk_size
+    chunks = [(i * chunk_size, (i + 1) * chunk_size - 1) for i in range(count)]
+    # The remainder is appended to the last chunk
+    chunks[-1] = (chunks[-1][0], size - 1)
+    return chunks
 
 
 class TikTokUploader:
-    """Handles TikTok video uploads."""
+    """Handles TikTok video uploads through the Content Posting API."""
     
     def __init__(self):
         self.config = get_config()
-        print("⚠️  TikTok API Note:")
-        print("   TikTok's official API requires special approval.")
-        print("   For now, you'll need to use TikTok's web interface to upload.")
-        print("   The video will be downloaded for you to upload manually.")
+        self.api_url = self.config.tiktok_api_url.rstrip('/')
+        self._token_path = self.config.state_file('tiktok_token.json')
+        self._token = self._load_token()
+        if not self._token.get('access_token'):
+            raise ValueError("TIKTOK_ACCESS_TOKEN is required for TikTok uploads")
+        self._token_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        
+        self.session = requests.Session()
+        workers = self.config.tiktok_upload_workers
+        self.session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=workers + 1))
+        self.session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=workers + 1))
+    
+    def _load_token(self) -> dict:
+        """
+        Token saved by an earlier refresh, or the one from the environment.
+        
+        A saved token is ignored once TIKTOK_ACCESS_TOKEN is changed, so a
+        newly authorized token takes effect.
+        """
+        if os.path.exists(self._token_path):
+            with open(self._token_path, encoding='utf-8') as f:
+                token = json.load(f)
+            if token.get('env_access_token') == self.config.tiktok_access_token:
+                return token
+        return {
+            'access_token': self.config.tiktok_access_token,
+            'refresh_token': self.config.tiktok_refresh_token,
+            'expires_at': None,
+        }
+    
+    def _can_refresh(self) -> bool:
+        return bool(self._token.get('refresh_token') and self.config.tiktok_client_key
+                    and self.config.tiktok_client_secret)
+    
+    def _access_token(self, force_refresh: bool = False) -> str:
+        """Current access token, refreshed first if it is about to expire."""
+        with self._token_lock:
+            expires_at = self._token.get('expires_at')
+            expiring = expires_at is not None and time.time() > expires_at - TOKEN_REFRESH_MARGIN
+            if (force_refresh or expiring) and self._can_refresh():
+                self._refresh_token()
+            return self._token['access_token']
+    
+    def _refresh_token(self):
+        """Exchange the refresh token for a new access token. Caller holds the token lock."""
+        print("Refreshing TikTok access token...")
+        response = self._send('POST', f"{self.api_url}/v2/oauth/token/", data={
+            'client_key': self.config.tiktok_client_key,
+            'client_secret': self.config.tiktok_client_secret,
+            'grant_type': 'refresh_token',
+            'refresh_token': self._token['refresh_token'],
+        })
+        result = response.json()
+        if 'access_token' not in result:
+            raise TikTokAPIError(result.get('error', 'token_refresh_failed'), result.get('error_description', ''),
+                                 result.get('log_id'))
+        self._token = {
+            'access_token': result['access_token'],
+            'refresh_token': result.get('refresh_token') or self._token['refresh_token'],
+            'expires_at': time.time() + result.get('expires_in', 86400),
+            'env_access_token': self.config.tiktok_access_token,
+        }
+        atomic_write_bytes(self._token_path, json.dumps(self._token).encode('utf-8'))
+    
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying connection errors, 429 and 5xx responses
+        with exponential backoff.
+        """
+        for attempt in range(REQUEST_RETRIES):
+            try:
+                response = self.session.request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+                if response.status_code != 429 and response.status_code < 500:
+                    return response
+                problem = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, problem = None, str(e)
+            
+            if attempt == REQUEST_RETRIES - 1:
+                break
+            delay = RETRY_BACKOFF * 2 ** attempt * (1 + random.random())
+            print(f"⚠ TikTok request failed ({problem}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+        
+        if response is None:
+            raise ConnectionError(f"TikTok request failed after {REQUEST_RETRIES} attempts: {problem}")
+        return response
+    
+    def _api(self, path: str, body: Optional[dict] = None) -> dict:
+        """
+        Call a Content Posting API endpoint.
+        
+        Returns:
+            The response's 'data' object
+        
+        Raises:
+            TikTokAPIError: If the API reports an error
+        """
+        for retry_auth in (False, True):
+            response = self._send('POST', f"{self.api_url}{path}", json=body or {}, headers={
+                'Authorization': f"Bearer {self._access_token(force_refresh=retry_auth)}",
+                'Content-Type': 'application/json; charset=UTF-8',
+            })
+            if response.status_code == 401 and not retry_auth and self._can_refresh():
+                continue
+            break
+        
+        try:
+            result = response.json()
+        except ValueError:
+            raise TikTokAPIError(f"http_{response.status_code}", response.text[:200])
+        error = result.get('error') or {}
+        if error.get('code', 'ok') != 'ok' or response.status_code >= 400:
+            raise TikTokAPIError(error.get('code', f"http_{response.status_code}"), error.get('message', ''),
+                                 error.get('log_id'))
+        return result.get('data') or {}
+    
+    def _state_path(self, video_path: str, post_info: dict) -> str:
+        """State file for one upload of a file with given post settings."""
+        stat = os.stat(video_path)
+        key = json.dumps([os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns, post_info], sort_keys=True)
+        return self.config.state_file(f"tiktok_upload_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.json")
+    
+    def _load_state(self, path: str) -> Optional[dict]:
+        """Saved progress of an earlier attempt, if it can still be resumed."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not state.get('uploaded') and time.time() - state.get('started_at', 0) > UPLOAD_URL_TTL:
+            os.remove(path)
+            return None
+        return state
+    
+    def _save_state(self, path: str, state: dict):
+        with self._state_lock:
+            atomic_write_bytes(path, json.dumps(state).encode('utf-8'))
+    
+    def _creator_info(self) -> dict:
+        """Posting options of the authorized account (privacy levels, username)."""
+        return self._api('/v2/post/publish/creator_info/query/')
+    
+    def _init_upload(self, post_info: Optional[dict], chunks: List[Tuple[int, int]], size: int) -> dict:
+        """Start an upload; returns its publish_id and upload_url."""
+        source_info = {
+            'source': 'FILE_UPLOAD',
+            'video_size': size,
+            'chunk_size': chunks[0][1] + 1,
+            'total_chunk_count': len(chunks),
+        }
+        if post_info is None:
+            return self._api('/v2/post/publish/inbox/video/init/', {'source_info': source_info})
+        return self._api('/v2/post/publish/video/init/', {'post_info': post_info, 'source_info': source_info})
+    
+    def _put_chunk(self, upload_url: str, video_path: str, first: int, last: int, size: int):
+        """Send one chunk of the file."""
+        with open(video_path, 'rb') as f:
+            f.seek(first)
+            data = f.read(last - first + 1)
+        response = self._send('PUT', upload_url, data=data, headers={
+            'Content-Type': 'video/mp4',
+            'Content-Length': str(len(data)),
+            'Content-Range': f"bytes {first}-{last}/{size}",
+        })
+        if response.status_code not in (200, 201, 206):
+            raise TikTokAPIError(f"http_{response.status_code}",
+                                 f"chunk {first}-{last} rejected: {response.text[:200]}")
+    
+    def _upload_chunks(self, video_path: str, state: dict, state_path: str, size: int):
+        """
+        Send every chunk not acknowledged yet.
+        
+        All but the last chunk are sent by up to TIKTOK_UPLOAD_WORKERS threads;
+        the last one is sent once the others are in, since TikTok completes
+        the upload when it arrives.
+        """
+        chunks = [tuple(chunk) for chunk in state['chunks']]
+        done = set(state['done'])
+        started = time.monotonic()
+        progress = Progress("TikTok upload progress", size)
+        
+        def send(index: int):
+            first, last = chunks[index]
+            self._put_chunk(state['upload_url'], video_path, first, last, size)
+            with self._state_lock:
+                done.add(index)
+                state['done'] = sorted(done)
+                sent = sum(chunks[i][1] - chunks[i][0] + 1 for i in done)
+                progress.update(sent, detail=f"{len(done)}/{len(chunks)} chunks")
+            self._save_state(state_path, state)
+        
+        pending = [i for i in range(len(chunks) - 1) if i not in done]
+        if done:
+            print(f"Resuming TikTok upload at chunk {min(pending or [len(chunks) - 1]) + 1}/{len(chunks)}")
+        workers = min(self.config.tiktok_upload_workers, len(pending)) if pending else 1
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tiktok-chunk') as pool:
+                list(pool.map(send, pending))
+        else:
+            for index in pending:
+                send(index)
+        if len(chunks) - 1 not in done:
+            send(len(chunks) - 1)
+        
+        elapsed = time.monotonic() - started
+        print(f"✓ Sent {size / MB:.1f} MB to TikTok in {elapsed:.1f}s")
+    
+    def wait_for_publish(self, publish_id: str, inbox: bool = False) -> dict:
+        """
+        Poll a post's status with backoff until TikTok has processed it.
+        
+        Args:
+            publish_id: ID returned when the upload was initialized
+            inbox: Whether the video was sent to the creator's inbox as a draft
+        
+        Returns:
+            The final status data
+        
+        Raises:
+            TikTokAPIError: If processing failed
+            TimeoutError: If it did not finish within STATUS_TIMEOUT
+        """
+        done = {'SEND_TO_USER_INBOX'} if inbox else {'PUBLISH_COMPLETE'}
+        deadline = time.monotonic() + STATUS_TIMEOUT
+        delay = STATUS_POLL_INITIAL
+        last_status = None
+        while True:
+            data = self._api('/v2/post/publish/status/fetch/', {'publish_id': publish_id})
+            status = data.get('status')
+            if status != last_status:
+                print(f"TikTok status: {status}")
+                last_status = status
+            if status in done or status == 'PUBLISH_COMPLETE':
+                return data
+            if status == 'FAILED':
+                raise TikTokAPIError('publish_failed', data.get('fail_reason', 'unknown reason'))
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"TikTok post {publish_id} still {status} after {STATUS_TIMEOUT}s")
+            time.sleep(delay)
+            delay = min(delay * STATUS_POLL_FACTOR, STATUS_POLL_MAX)
     
     def upload_video(
         self,
@@ -26,16 +346,20 @@ class TikTokUploader:
         hashtags: list = None
     ) -> Optional[str]:
         """
-        Prepare video for TikTok upload.
+        Upload a video to TikTok.
+        
+        With TIKTOK_POST_MODE=inbox the video is sent to the creator's inbox
+        as a draft instead of being posted.
         
         Args:
             video_path: Path to the video file
-            title: Video title
+            title: Video title (the start of the caption)
             description: Video description
             hashtags: List of hashtags
         
         Returns:
-            Message about manual upload needed
+            Post URL (or publish ID if TikTok gave no post ID) if successful,
+            None otherwise
         """
         if not os.path.exists(video_path):
             print(f"Error: Video file not found: {video_path}")
@@ -47,23 +371,66 @@ class TikTokUploader:
             caption += f"\n\n{description}"
         if hashtags:
             caption += "\n\n" + " ".join([f"#{tag}" for tag in hashtags])
+        caption = self.config.truncate_text(caption, CAPTION_MAX)
         
-        print("\n" + "="*80)
-        print("TIKTOK UPLOAD PREPARATION")
-        print("="*80)
-        print(f"Video ready: {video_path}")
-        print(f"\nCaption to use:")
-        print("-" * 40)
-        print(caption)
-        print("-" * 40)
-        print("\n⚠️  Manual Upload Required:")
-        print("   1. Open TikTok app or https://www.tiktok.com/upload")
-        print("   2. Upload the video file above")
-        print("   3. Copy and paste the caption")
-        print("   4. Post!")
-        print("="*80)
-        
-        return "manual_upload_required"
+        inbox = self.config.tiktok_post_mode == 'inbox'
+        try:
+            username = None
+            post_info = None
+            if not inbox:
+                creator = self._creator_info()
+                username = creator.get('creator_username')
+                privacy = self.config.tiktok_privacy_level
+                options = creator.get('privacy_level_options') or [privacy]
+                if privacy not in options:
+                    print(f"✗ TikTok account does not allow privacy level {privacy} (allowed: {', '.join(options)})")
+                    print("   Set TIKTOK_PRIVACY_LEVEL in .env")
+                    return None
+                post_info = {'title': caption, 'privacy_level': privacy}
+            
+            size = os.path.getsize(video_path)
+            state_path = self._state_path(video_path, post_info or {'inbox': True})
+            state = self._load_state(state_path)
+            if state is None:
+                chunks = plan_chunks(size, self.config.tiktok_chunk_size)
+                print(f"Uploading to TikTok: {size / MB:.1f} MB in {len(chunks)} chunk(s)")
+                data = self._init_upload(post_info, chunks, size)
+                state = {
+                    'publish_id': data['publish_id'],
+                    'upload_url': data['upload_url'],
+                    'chunks': chunks,
+                    'done': [],
+                    'uploaded': False,
+                    'started_at': time.time(),
+                }
+                self._save_state(state_path, state)
+            
+            if not state['uploaded']:
+                self._upload_chunks(video_path, state, state_path, size)
+                state['uploaded'] = True
+                self._save_state(state_path, state)
+            
+            try:
+                result = self.wait_for_publish(state['publish_id'], inbox=inbox)
+            except TikTokAPIError:
+                # Processing failed: the next attempt starts a new upload
+                os.remove(state_path)
+                raise
+            os.remove(state_path)
+        except Exception as e:
+            print(f"Error uploading video to TikTok: {e}")
+            return None
+        
+        if inbox:
+            print("✓ Video sent to the TikTok inbox; finish posting it in the TikTok app")
+            return state['publish_id']
+        post_ids = result.get('publicaly_available_post_id') or []
+        if post_ids and username:
+            url = f"https://www.tiktok.com/@{username}/video/{post_ids[0]}"
+            print(f"Video posted to TikTok! URL: {url}")
+            return url
+        print(f"Video posted to TikTok! Publish ID: {state['publish_id']}")
+        return str(post_ids[0]) if post_ids else state['publish_id']
     
     def upload_with_retry(
         self,
@@ -76,6 +443,9 @@ class TikTokUploader:
         """
         Upload video with retry logic.
         
+        Each attempt resumes the previous one's chunks while its upload URL
+        is still valid.
+        
         Args:
             video_path: Path to video file
             title: Video title
@@ -86,5 +456,10 @@ class TikTokUploader:
         Returns:
             Upload result
         """
-        return self.upload_video(video_path, title, description, hashtags)
-
+        for attempt in range(1, max_retries + 1):
+            result = self.upload_video(video_path, title, description, hashtags)
+            if result:
+                return result
+            if attempt < max_retries:
+                print(f"Retrying TikTok upload ({attempt + 1}/{max_retries})...")
+        return None
@@ -0,0 +1,361 @@
+"""
+Per-platform video renditions from a single decode.
+
+The same master file goes to YouTube, Instagram and TikTok, which accept
+different resolutions, frame rates, codecs and bitrates. Renditions that a
+platform would reject or re-process are encoded in one ffmpeg run: the source
+is decoded once and a split filter graph feeds one encoder per rendition, so
+adding a platform costs an encode but not another decode.
+
+Platforms whose requirements the source already meets are not encoded; they
+get the source file itself. Encoded renditions are stored in the artifact
+cache under the source hash and the rendition parameters.
+
+Sources with the moov box at the end (common in podcast exports) can first be
+remuxed with remux_faststart(), a stream copy that moves the moov box to the
+front so the platforms can start processing before the upload completes.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from artifact_cache import ArtifactCache
+
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+
+# Threads per transcoding job (shared by the decoder, filters and encoders),
+# so concurrent reels in batch mode don't oversubscribe the machine
+TRANSCODE_THREADS = max(1, int(os.getenv('TRANSCODE_THREADS', '4')))
+TRANSCODE_TIMEOUT = 1800
+REMUX_TIMEOUT = 600
+
+# What each platform accepts without re-processing, and what we encode when
+# the source doesn't conform. Renditions with identical parameters are
+# encoded once and shared.
+RENDITIONS = {
+    # YouTube Shorts: up to 4K, most modern codecs
+    'youtube': {
+        'max_width': 2160, 'max_height': 3840, 'max_fps': 60,
+        'video_codecs': ('h264', 'hevc', 'vp9', 'av1'), 'audio_codecs': ('aac', 'opus'),
+        'max_bitrate': 60_000_000,
+    },
+    # Instagram Reels: 1080p, H.264/HEVC with AAC audio
+    'instagram': {
+        'max_width': 1080, 'max_height': 1920, 'max_fps': 60,
+        'video_codecs': ('h264', 'hevc'), 'audio_codecs': ('aac',),
+        'max_bitrate': 25_000_000,
+    },
+    # TikTok: 1080p, H.264/HEVC with AAC audio
+    'tiktok': {
+        'max_width': 1080, 'max_height': 1920, 'max_fps': 60,
+        'video_codecs': ('h264', 'hevc'), 'audio_codecs': ('aac',),
+        'max_bitrate': 20_000_000,
+    },
+}
+
+# Encoder settings for renditions that are encoded (H.264 + AAC in MP4)
+VIDEO_CRF = 20
+VIDEO_PRESET = 'medium'
+AUDIO_BITRATE = '128k'
+
+
+def check_rendition(info: dict, platform: str) -> List[str]:
+    """
+    Check whether a video can be uploaded to a platform as it is.
+    
+    Args:
+        info: Probe result (see ThumbnailExtractor.probe_video)
+        platform: Key of RENDITIONS
+    
+    Returns:
+        List of reasons the video needs transcoding; empty if it conforms.
+        Codec and bitrate checks are skipped when the probe did not report them.
+    """
+    spec = RENDITIONS[platform]
+    reasons = []
+    
+    width, height = info.get('width') or 0, info.get('height') or 0
+    fps, bitrate = info.get('fps') or 0.0, info.get('bitrate') or 0
+    video_codec, audio_codec = info.get('video_codec'), info.get('audio_codec')
+    
+    if not _fits(width, height, spec):
+        reasons.append(f"{width}x{height} is larger than {spec['max_width']}x{spec['max_height']}")
+    if fps > spec['max_fps'] + 0.5:
+        reasons.append(f"frame rate {fps:.2f} is above {spec['max_fps']} fps")
+    if video_codec and video_codec not in spec['video_codecs']:
+        reasons.append(f"video codec {video_codec} is not {'/'.join(spec['video_codecs'])}")
+    if audio_codec and audio_codec not in spec['audio_codecs']:
+        reasons.append(f"audio codec {audio_codec} is not {'/'.join(spec['audio_codecs'])}")
+    if bitrate > spec['max_bitrate']:
+        reasons.append(f"bitrate {bitrate / 1e6:.1f} Mbit/s is above {spec['max_bitrate'] / 1e6:.0f} Mbit/s")
+    return reasons
+
+
+def create_renditions(video_path: str, platforms: List[str], temp_dir: str,
+                      cache: Optional['ArtifactCache'] = None, info: Optional[dict] = None,
+                      threads: int = TRANSCODE_THREADS) -> Dict[str, str]:
+    """
+    Return a video file for every platform, encoding the ones that need it.
+    
+    Args:
+        video_path: Path to the source video
+        platforms: Platforms to prepare; names not in RENDITIONS get the source
+        temp_dir: Directory to write renditions to (when not cached)
+        cache: Optional artifact cache; renditions encoded before are reused
+        info: Probe result, if already known
+        threads: Thread cap for the ffmpeg job
+    
+    Returns:
+        Dict mapping platform to the file to upload (the source itself for
+        platforms it already conforms to, or when transcoding fails)
+    """
+    if info is None:
+        from thumbnail_extractor import ThumbnailExtractor
+        info = ThumbnailExtractor.probe_video(video_path)
+    
+    files = {platform: video_path for platform in platforms}
+    if not info:
+        print("⚠ Warning: Could not probe video, uploading the source to every platform")
+        return files
+    
+    # Platforms that need a rendition, grouped by identical encode parameters
+    jobs: Dict[str, dict] = {}
+    for platform in platforms:
+        if platform not in RENDITIONS:
+            continue
+        reasons = check_rendition(info, platform)
+        if not reasons:
+            print(f"✓ Source conforms to {platform}, no transcode needed")
+            continue
+        print(f"{platform} needs a rendition: {'; '.join(reasons)}")
+        params = _encode_params(info, RENDITIONS[platform])
+        name = _params_id(params)
+        jobs.setdefault(name, {'params': params, 'platforms': []})['platforms'].append(platform)
+    if not jobs:
+        return files
+    
+    if not shutil.which(FFMPEG_BINARY):
+        print(f"⚠ Warning: {FFMPEG_BINARY} not found, uploading the source to every platform")
+        return files
+    
+    with ExitStack() as stack:
+        outputs = {}
+        if cache is not None:
+            for name, job in sorted(jobs.items()):
+                key = cache.key(video_path, 'rendition', job['params'])
+                stack.enter_context(cache.lock(key))
+                cached = cache.lookup(key, '.mp4')
+                if cached:
+                    print(f"Using cached rendition for {', '.join(job['platforms'])}")
+                    for platform in job['platforms']:
+                        files[platform] = cached
+                else:
+                    job['key'] = key
+                    outputs[name] = _temp_output(cache.path(key, '.mp4'))
+        else:
+            stem = os.path.splitext(os.path.basename(video_path))[0]
+            for name, job in jobs.items():
+                outputs[name] = os.path.join(temp_dir, f"{stem}_{'_'.join(job['platforms'])}.mp4")
+        
+        if not outputs:
+            return files
+        
+        started = time.monotonic()
+        if not _encode(video_path, {name: jobs[name]['params'] for name in outputs}, outputs, threads):
+            for path in outputs.values():
+                if os.path.exists(path):
+                    os.remove(path)
+            print("⚠ Warning: Transcoding failed, uploading the source instead")
+            return files
+        print(f"✓ Encoded {len(outputs)} rendition(s) in one pass ({time.monotonic() - started:.1f}s)")
+        
+        for name, path in outputs.items():
+            job = jobs[name]
+            if 'key' in job:
+                path = cache.put_file(job['key'], path, '.mp4')
+            print(f"Created rendition for {', '.join(job['platforms'])}: {path} "
+                  f"({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+            for platform in job['platforms']:
+                files[platform] = path
+    return files
+
+
+def remux_faststart(video_path: str, temp_dir: str, cache: Optional['ArtifactCache'] = None,
+                    info: Optional[dict] = None) -> str:
+    """
+    Return a copy of an MP4/MOV file with the moov box before the media data.
+    
+    The streams are copied, not re-encoded, so this takes about as long as
+    copying the file. Files that already have faststart, and containers the
+    MP4 probe cannot read, are returned unchanged.
+    
+    Args:
+        video_path: Path to the source video
+        temp_dir: Directory to write the remuxed file to (when not cached)
+        cache: Optional artifact cache; a file remuxed before is reused
+        info: Probe result, if already known
+    
+    Returns:
+        Path of the faststart file (the source itself if no remux was needed
+        or the remux failed)
+    """
+    if info is None:
+        from thumbnail_extractor import ThumbnailExtractor
+        info = ThumbnailExtractor.probe_video(video_path)
+    
+    # Only the MP4 probe reports 'faststart'; other containers have no moov box
+    if not info or info.get('faststart') is not False:
+        return video_path
+    if not shutil.which(FFMPEG_BINARY):
+        print(f"⚠ Warning: {FFMPEG_BINARY} not found, uploading the source without faststart")
+        return video_path
+    
+    extension = os.path.splitext(video_path)[1].lower() or '.mp4'
+    output_format = 'mov' if extension == '.mov' else 'mp4'
+    
+    with ExitStack() as stack:
+        if cache is not None:
+            key = cache.key(video_path, 'faststart', {'format': output_format})
+            stack.enter_context(cache.lock(key))
+            cached = cache.lookup(key, extension)
+            if cached:
+                print("Using cached faststart copy")
+                # Identified by its source, so later cache keys don't hash it
+                cache.remember_checksum(cached, key, algorithm='faststart')
+                return cached
+            output = _temp_output(cache.path(key, extension))
+        else:
+            stem = os.path.splitext(os.path.basename(video_path))[0]
+            output = os.path.join(temp_dir, f"{stem}_faststart{extension}")
+        
+        started = time.monotonic()
+        command = [
+            FFMPEG_BINARY, '-v', 'error', '-nostdin', '-y',
+            '-i', video_path,
+            '-map', '0:v', '-map', '0:a?', '-c', 'copy', '-map_metadata', '0',
+            '-movflags', '+faststart', '-f', output_format, output,
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=REMUX_TIMEOUT)
+            error = result.stderr.decode(errors='replace').strip()[-500:] if result.returncode else None
+        except (OSError, subprocess.TimeoutExpired) as e:
+            error = str(e)
+        if error is not None:
+            if os.path.exists(output):
+                os.remove(output)
+            print(f"⚠ Warning: Faststart remux failed, uploading the source instead: {error}")
+            return video_path
+        
+        if cache is not None:
+            output = cache.put_file(key, output, extension)
+            cache.remember_checksum(output, key, algorithm='faststart')
+        print(f"✓ Moved moov box to the front ({time.monotonic() - started:.1f}s): {output}")
+        return output
+
+
+def _fits(width: int, height: int, spec: dict) -> bool:
+    """Whether a frame fits the rendition's bounds (in either orientation)."""
+    long_side, short_side = max(width, height), min(width, height)
+    return long_side <= max(spec['max_width'], spec['max_height']) and \
+        short_side <= min(spec['max_width'], spec['max_height'])
+
+
+def _encode_params(info: dict, spec: dict) -> dict:
+    """Return the encode parameters of a rendition of this source."""
+    width, height = info.get('width') or 0, info.get('height') or 0
+    long_bound = max(spec['max_width'], spec['max_height'])
+    short_bound = min(spec['max_width'], spec['max_height'])
+    if width >= height:
+        box = (long_bound, short_bound)
+    else:
+        box = (short_bound, long_bound)
+    
+    # Audio that the platform accepts is copied rather than re-encoded
+    audio_codec = info.get('audio_codec')
+    return {
+        'box': box,
+        'fps': spec['max_fps'] if (info.get('fps') or 0) > spec['max_fps'] + 0.5 else None,
+        'maxrate': int(spec['max_bitrate'] * 0.8),
+        'copy_audio': bool(audio_codec and audio_codec in spec['audio_codecs']),
+        'crf': VIDEO_CRF,
+        'preset': VIDEO_PRESET,
+        'audio_bitrate': AUDIO_BITRATE,
+    }
+
+
+def _params_id(params: dict) -> str:
+    """Short stable name for a parameter set (used to group platforms)."""
+    return '_'.join(str(params[k]) for k in sorted(params))
+
+
+def _temp_output(final_path: str) -> str:
+    """Reserve a temporary file next to a cache entry for ffmpeg to write."""
+    fd, path = tempfile.mkstemp(prefix=f".{os.path.basename(final_path)}.", suffix='.tmp',
+                                dir=os.path.dirname(final_path))
+    os.close(fd)
+    return path
+
+
+def _encode(video_path: str, renditions: Dict[str, dict], outputs: Dict[str, str],
+            threads: int) -> bool:
+    """
+    Encode several renditions with one decode of the source.
+    
+    The decoded video is split into one branch per rendition; each branch is
+    scaled (never upscaled), rate-limited if needed and sent to its own H.264
+    encoder. Returns True if ffmpeg succeeded.
+    """
+    names = list(renditions)
+    branches = [f"[v{i}]" for i in range(len(names))]
+    graph = [f"[0:v]split={len(names)}{''.join(branches)}"]
+    for i, name in enumerate(names):
+        params = renditions[name]
+        box_width, box_height = params['box']
+        filters = [
+            f"scale=w='min(iw,{box_width})':h='min(ih,{box_height})'"
+            f":force_original_aspect_ratio=decrease:force_divisible_by=2"
+        ]
+        if params['fps']:
+            filters.append(f"fps={params['fps']}")
+        filters.append('format=yuv420p')
+        graph.append(f"[v{i}]{','.join(filters)}[out{i}]")
+    
+    command = [
+        FFMPEG_BINARY, '-v', 'error', '-nostdin', '-y',
+        '-threads', str(threads),
+        '-filter_complex_threads', str(threads),
+        '-i', video_path,
+        '-filter_complex', ';'.join(graph),
+    ]
+    # The encoders of all outputs run at the same time and share the cap
+    encoder_threads = max(1, threads // len(names))
+    for i, name in enumerate(names):
+        params = renditions[name]
+        command += [
+            '-map', f'[out{i}]', '-map', '0:a:0?',
+            '-c:v', 'libx264', '-preset', params['preset'], '-crf', str(params['crf']),
+            '-maxrate', str(params['maxrate']), '-bufsize', str(params['maxrate'] * 2),
+            '-threads', str(encoder_threads),
+        ]
+        if params['copy_audio']:
+            command += ['-c:a', 'copy']
+        else:
+            command += ['-c:a', 'aac', '-b:a', params['audio_bitrate'], '-ar', '48000', '-ac', '2']
+        command += ['-movflags', '+faststart', '-f', 'mp4', outputs[name]]
+    
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=TRANSCODE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Error running {FFMPEG_BINARY}: {e}")
+        return False
+    if result.returncode != 0:
+        print(f"Error transcoding {video_path}: {result.stderr.decode(errors='replace').strip()[-500:]}")
+        return False
+    return True
@@ -8,6 +8,8 @@ import sys
 import gspread
 from config import get_config
 from datetime import datetime
+from rate_limiter import WRITE
+from retry_policy import SHEETS_HOST, call_with_retries
 
 
 def update_sheet_status(youtube_url: str, instagram_url: str = None):
@@ -22,11 +24,11 @@ def update_sheet_status(youtube_url: str, instagram_url: str = None):
     gc = gspread.service_account_from_dict(config.get_google_credentials())
     
     sheet_id = "11Oo5xYZo6rIqMSvsuFtULn9k-IjTOgm3LjymiFVa0Fo"
-    spreadsheet = gc.open_by_key(sheet_id)
+    spreadsheet = call_with_retries(SHEETS_HOST, lambda: gc.open_by_key(sheet_id), "open tracker sheet")
     
     # Find the Posting Schedule sheet
     schedule_sheet = None
-    for ws in spreadsheet.worksheets():
+    for ws in call_with_retries(SHEETS_HOST, spreadsheet.worksheets, "list worksheets"):
         if "posting" in ws.title.lower() and "schedule" in ws.title.lower():
             schedule_sheet = ws
             break
@@ -36,7 +38,7 @@ def update_sheet_status(youtube_url: str, instagram_url: str = None):
         return False
     
     # Get all values
-    all_values = schedule_sheet.get_all_values()
+    all_values = call_with_retries(SHEETS_HOST, schedule_sheet.get_all_values, "read tracker sheet")
     
     # Find the row with this YouTube URL
     row_num = None
@@ -52,9 +54,11 @@ def update_sheet_status(youtube_url: str, instagram_url: str = None):
         # We'll leave other columns empty for now - user can fill them in manually
         new_row = [''] * 13  # Ensure we have enough columns (A through M)
         new_row[9] = youtube_url  # Column J (index 9) - YouTube URL
-        schedule_sheet.append_row(new_row)
+        # One attempt: a retry after a lost response would add the row twice
+        call_with_retries(SHEETS_HOST, lambda: schedule_sheet.append_row(new_row), "add tracker row",
+                          attempts=1, operation=WRITE)
         # Get the row number of the newly added row
-        all_values = schedule_sheet.get_all_values()
+        all_values = call_with_retries(SHEETS_HOST, schedule_sheet.get_all_values, "read tracker sheet")
         row_num = len(all_values)  # New row is at the end
         print(f"✓ Added new row {row_num} to tracker")
     
@@ -63,16 +67,20 @@ def update_sheet_status(youtube_url: str, instagram_url: str = None):
     
     # Column K (Instagram Link) - index 10
     if instagram_url:
-        schedule_sheet.update(values=[[instagram_url]], range_name=f'K{row_num}')
+        call_with_retries(SHEETS_HOST, lambda: schedule_sheet.update(values=[[instagram_url]], range_name=f'K{row_num}'),
+                          "write Instagram link", operation=WRITE)
         print(f"✓ Added Instagram link to row {row_num}")
     
     # Column L (Status) - index 11
-    schedule_sheet.update(values=[["Posted"]], range_name=f'L{row_num}')
+    call_with_retries(SHEETS_HOST, lambda: schedule_sheet.update(values=[["Posted"]], range_name=f'L{row_num}'),
+                      "write status", operation=WRITE)
     print(f"✓ Updated status to 'Posted' for row {row_num}")
     
     # Column M (Notes) - add timestamp
     timestamp = datetime.now().strftime("%Y-%m-%d %I:%M %p EST")
-    schedule_sheet.update(values=[[f"Posted on {timestamp}"]], range_name=f'M{row_num}')
+    call_with_retries(SHEETS_HOST, lambda: schedule_sheet.update(values=[[f"Posted on {timestamp}"]],
+                                                                 range_name=f'M{row_num}'),
+                      "write timestamp", operation=WRITE)
     print(f"✓ Added timestamp: {timestamp}")
     
     return True
@@ -0,0 +1,203 @@
+"""
+Upload manifests for running many manual uploads in a single process.
+
+A manifest is a JSONL file (one JSON object per line) or a CSV file with a
+header row. Each entry describes one upload using the same fields as the
+manual_upload.py command line:
+
+    id           Optional stable key for the entry (used for resuming)
+    folder       Google Drive folder link containing video and cover
+    video        Video path (local or drive://folder/file) if no folder
+    thumbnail    Optional thumbnail path (local or drive://)
+    title        YouTube title
+    description  YouTube description
+    caption      Instagram/TikTok caption
+    platforms    youtube, instagram, tiktok, all, or a comma-separated list
+    schedule     Optional 'YYYY-MM-DD HH:MM' (EST) YouTube publish time
+    privacy      Optional YouTube privacy (public, private, unlisted)
+
+Results are appended to a JSONL results file as each entry finishes, so an
+interrupted run can be resumed: platforms an entry was already uploaded to
+are skipped, and entries uploaded everywhere are not run again.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Set
+
+
+FIELDS = (
+    'id', 'folder', 'video', 'thumbnail', 'title', 'description',
+    'caption', 'platforms', 'schedule', 'privacy',
+)
+
+ALL_PLATFORMS = ['youtube', 'instagram', 'tiktok']
+
+
+def parse_platforms(value) -> List[str]:
+    """
+    Normalize a platforms field to a list of platform names.
+    
+    Args:
+        value: 'all', a platform name, a comma-separated string or a list
+    
+    Returns:
+        List of platform names (defaults to ['youtube'] when empty)
+    """
+    if not value:
+        return ['youtube']
+    if isinstance(value, str):
+        value = value.split(',')
+    
+    platforms = []
+    for name in value:
+        name = name.strip().lower()
+        if name == 'all':
+            return list(ALL_PLATFORMS)
+        if name not in ALL_PLATFORMS:
+            raise ValueError(f"Unknown platform '{name}'")
+        if name not in platforms:
+            platforms.append(name)
+    return platforms
+
+
+def entry_id(entry: Dict) -> str:
+    """Return the entry's 'id', or a hash of its contents if it has none."""
+    if entry.get('id'):
+        return str(entry['id'])
+    canonical = json.dumps({k: entry.get(k) for k in FIELDS if k != 'id'}, sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:12]
+
+
+def load_manifest(path: str) -> List[Dict]:
+    """
+    Load and validate a JSONL or CSV manifest.
+    
+    Args:
+        path: Path to a .jsonl/.json or .csv manifest
+    
+    Returns:
+        List of entries with 'id' and 'platforms' filled in
+    
+    Raises:
+        ValueError: If an entry is malformed or misses a required field
+    """
+    entries = []
+    
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = [(i, row) for i, row in enumerate(csv.DictReader(f), start=2)]
+    else:
+        rows = []
+        with open(path, encoding='utf-8') as f:
+            for i, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    rows.append((i, json.loads(line)))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{i}: invalid JSON: {e}")
+    
+    for line_number, row in rows:
+        entry = {}
+        for key in FIELDS:
+            value = row.get(key)
+            if isinstance(value, str):
+                value = value.strip()
+            entry[key] = value or None
+        
+        where = f"{path}:{line_number}"
+        try:
+            entry['platforms'] = parse_platforms(entry['platforms'])
+        except ValueError as e:
+            raise ValueError(f"{where}: {e}")
+        
+        if not entry['folder'] and not entry['video']:
+            raise ValueError(f"{where}: either 'folder' or 'video' is required")
+        if 'youtube' in entry['platforms'] and not entry['title']:
+            raise ValueError(f"{where}: 'title' is required for YouTube uploads")
+        if ('instagram' in entry['platforms'] or 'tiktok' in entry['platforms']) and not entry['caption']:
+            raise ValueError(f"{where}: 'caption' is required for Instagram and TikTok uploads")
+        
+        entry['id'] = entry_id(entry)
+        entries.append(entry)
+    
+    ids = [e['id'] for e in entries]
+    duplicates = sorted({i for i in ids if ids.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"{path}: duplicate entry ids: {', '.join(duplicates)}")
+    
+    return entries
+
+
+class ResultsLog:
+    """Append-only JSONL log of manifest results, safe to write from several threads."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def _results(self) -> Iterator[Dict]:
+        """Yield every recorded result, oldest first."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line from an interrupted run
+                if isinstance(result, dict) and 'id' in result:
+                    yield result
+    
+    def completed_ids(self) -> Set[str]:
+        """Return the ids of entries whose most recent result is 'ok'."""
+        latest = {result['id']: result.get('status') for result in self._results()}
+        return {key for key, status in latest.items() if status == 'ok'}
+    
+    def completed_platforms(self) -> Dict[str, Set[str]]:
+        """
+        Return, per entry id, the platforms that already have a successful upload.
+        
+        Results of every earlier run count, so a platform that succeeded once
+        is not uploaded again when the entry is retried for another platform.
+        """
+        done: Dict[str, Set[str]] = {}
+        for result in self._results():
+            platforms = done.setdefault(result['id'], set())
+            if result.get('status') == 'ok':
+                platforms.update(result.get('platforms') or [])
+            platforms.update(p for p, value in (result.get('results') or {}).items() if value)
+        return done
+    
+    def completed_uploads(self) -> Dict[str, Dict[str, str]]:
+        """
+        Return, per entry id, the post ID/URL of every successful upload.
+        
+        The latest successful result per platform wins, so a resumed entry
+        knows the URLs of the platforms an earlier run already posted to.
+        """
+        uploads: Dict[str, Dict[str, str]] = {}
+        for result in self._results():
+            posted = uploads.setdefault(result['id'], {})
+            posted.update((p, value) for p, value in (result.get('results') or {}).items() if value)
+        return uploads
+    
+    def record(self, result: Dict):
+        """Append one result and flush it to disk before returning."""
+        line = json.dumps(result, default=str, ensure_ascii=False)
+        with self._lock:
+            # Start on a fresh line if an interrupted run left a partial one
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        line = '\n' + line
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
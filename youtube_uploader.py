@@ -4,12 +4,17 @@ YouTube uploader for uploading videos with metadata.
 
 import os
 import pickle
+import threading
 from typing import Optional
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from config import get_config
+from rate_limiter import WRITE
+from retry_policy import YOUTUBE_HOST, call_with_retries
+from run_log import Progress
+from storage import atomic_write_bytes
 
 
 class YouTubeUploader:
@@ -25,12 +30,27 @@ class YouTubeUploader:
     
     def __init__(self):
         self.config = get_config()
-        self.youtube = self._authenticate()
+        self.credentials = self._authenticate()
+        self._local = threading.local()
+    
+    @property
+    def youtube(self):
+        """
+        YouTube API service for the calling thread.
+        
+        The underlying httplib2 transport is not thread-safe, so each thread
+        gets its own service object built on the shared credentials.
+        """
+        service = getattr(self._local, 'youtube', None)
+        if service is None:
+            service = build('youtube', 'v3', credentials=self.credentials, cache_discovery=False)
+            self._local.youtube = service
+        return service
     
     def _authenticate(self):
         """Authenticate with YouTube API using OAuth 2.0."""
         credentials = None
-        token_path = os.path.join(self.config.temp_dir, 'youtube_token.pickle')
+        token_path = self.config.state_file('youtube_token.pickle')
         
         # Try to load saved credentials
         if os.path.exists(token_path):
@@ -68,10 +88,9 @@ class YouTubeUploader:
                     raise
             
             # Save credentials for future use
-            with open(token_path, 'wb') as token:
-                pickle.dump(credentials, token)
+            atomic_write_bytes(token_path, pickle.dumps(credentials))
         
-        return build('youtube', 'v3', credentials=credentials)
+        return credentials
     
     def upload_video(
         self,
@@ -149,11 +168,15 @@ class YouTubeUploader:
             )
             
             response = None
+            progress = Progress("Upload progress", os.path.getsize(video_path))
             while response is None:
-                status, response = request.next_chunk()
+                # After a failure the resumable upload asks YouTube how much
+                # it received and continues from there, so retrying a chunk
+                # cannot create a second video
+                status, response = call_with_retries(YOUTUBE_HOST, request.next_chunk, "YouTube upload",
+                                                     operation=WRITE)
                 if status:
-                    progress = int(status.progress() * 100)
-                    print(f"Upload progress: {progress}%")
+                    progress.update(status.resumable_progress)
             
             video_id = response['id']
             print(f"Video uploaded successfully! Video ID: {video_id}")
@@ -183,10 +206,10 @@ class YouTubeUploader:
         try:
             print(f"Uploading thumbnail for video {video_id}...")
             
-            self.youtube.thumbnails().set(
+            call_with_retries(YOUTUBE_HOST, self.youtube.thumbnails().set(
                 videoId=video_id,
                 media_body=MediaFileUpload(thumbnail_path)
-            ).execute()
+            ).execute, "YouTube thumbnail upload", operation=WRITE)
             
             print("Thumbnail uploaded successfully!")
             return True